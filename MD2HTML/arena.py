@@ -0,0 +1,204 @@
+from array import array
+from parser import Structure, Parser
+"""
+A compact representation of parsed documents. Instead of a tree of {@link Structure} objects, the structures of a document are stored in a few parallel
+arrays indexed by the number of the structure, and the text of all the TEXT structures is kept in a single string.
+
+Example usage:
+
+    arena = StructureArena(parser.parse_stream(tokenizer.tokenize(text)))
+    html = translator.translate(arena)
+"""
+
+class StructureArena:
+    """
+    This class holds the structures of a document in parallel arrays. The structures are numbered in document order (a structure comes before the
+    structures inside it) and they are linked to each other by their numbers: every structure knows its parent, its first child and its next sibling.
+    A missing link is -1.
+
+    The arena is filled from top-level structures, which may come from a generator such as Parser#parse_stream(), so the objects of only a single
+    top-level structure need to exist at a time. The structures are accessed through {@link StructureView}s.
+    """
+    # Structure types by their values, so that the types can be stored as numbers
+    types = {kind.value: kind for kind in Structure.Type}
+    scopes = {scope.value: scope for scope in Structure.Scope}
+
+    def __init__(self, structures=()):
+        """
+        @structures is an iterable of top-level structures to store in the arena
+        """
+        self.kinds = array("B")
+        self.scope_codes = array("b") # The value of the scope, -1 for no scope
+        self.parents = array("q")
+        self.first_children = array("q")
+        self.next_siblings = array("q")
+        self.text_offsets = array("q") # The position of the text of a TEXT structure in the text of the arena
+        self.text_lengths = array("q")
+        self.roots = array("q") # The numbers of the top-level structures
+        self.addresses = {} # Maps the number of a LINK structure to its address and the number of a heading to its anchor, if it has one
+        self.titles = {} # Maps the number of a LINK structure to its title, if it has one
+        self.text_pieces = []
+        self.text_length = 0
+        self.joined_text = ""
+        for structure in structures:
+            self.append(structure)
+
+    @property
+    def text(self):
+        """
+        The text of all the TEXT structures. The pieces are only joined when the text is needed.
+        """
+        if len(self.text_pieces) != 0:
+            self.text_pieces.insert(0, self.joined_text)
+            self.joined_text = "".join(self.text_pieces)
+            self.text_pieces.clear()
+        return self.joined_text
+
+    def append(self, structure):
+        """
+        Stores the top-level @structure along with all the structures inside it. The structure tree is walked without recursion.
+        """
+        last_children = {} # Maps the number of a structure to the number of its last stored child
+        stack = [(structure, -1)]
+        while len(stack) != 0:
+            structure, parent = stack.pop()
+            index = len(self.kinds)
+            self.kinds.append(structure.kind.value)
+            self.scope_codes.append(-1 if structure.scope is None else structure.scope.value)
+            self.parents.append(parent)
+            self.first_children.append(-1)
+            self.next_siblings.append(-1)
+            if parent == -1:
+                if len(self.roots) != 0:
+                    self.next_siblings[self.roots[-1]] = index
+                self.roots.append(index)
+            elif parent in last_children:
+                self.next_siblings[last_children[parent]] = index
+            else:
+                self.first_children[parent] = index
+            last_children[parent] = index
+            if structure.kind is Structure.Type.LINK:
+                self.addresses[index] = getattr(structure, "address", None)
+                if hasattr(structure, "title"):
+                    self.titles[index] = structure.title
+            elif structure.kind in Parser.heading_levels and hasattr(structure, "address"):
+                self.addresses[index] = structure.address
+            if isinstance(structure.content, str):
+                self.text_offsets.append(self.text_length)
+                self.text_lengths.append(len(structure.content))
+                self.text_pieces.append(structure.content)
+                self.text_length += len(structure.content)
+                continue
+            self.text_offsets.append(0)
+            self.text_lengths.append(-1 if structure.content is None else 0)
+            if structure.content is not None:
+                stack.extend((child, index) for child in reversed(structure.content))
+
+    def children(self, index):
+        """
+        Returns a list of the numbers of the structures inside the structure number @index.
+        """
+        children = []
+        child = self.first_children[index]
+        while child != -1:
+            children.append(child)
+            child = self.next_siblings[child]
+        return children
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __iter__(self):
+        """
+        Returns an iterator of {@link StructureView}s of the top-level structures.
+        """
+        return (StructureView(self, index) for index in self.roots)
+
+    def __getitem__(self, index):
+        """
+        Returns a {@link StructureView} of the structure number @index.
+        """
+        if index < 0 or index >= len(self.kinds):
+            raise IndexError("structure index out of range")
+        return StructureView(self, index)
+
+class StructureView:
+    """
+    This class gives access to a single structure stored in a {@link StructureArena}. It has the same attributes as a {@link Structure}, so it can be used
+    in its place for reading, and it compares equal to the structure it was created from.
+    """
+    __slots__ = ("arena", "index")
+
+    def __init__(self, arena, index):
+        self.arena = arena
+        self.index = index
+
+    @property
+    def kind(self):
+        return StructureArena.types[self.arena.kinds[self.index]]
+
+    @property
+    def scope(self):
+        code = self.arena.scope_codes[self.index]
+        return None if code == -1 else StructureArena.scopes[code]
+
+    @property
+    def parent(self):
+        parent = self.arena.parents[self.index]
+        return None if parent == -1 else StructureView(self.arena, parent)
+
+    @property
+    def content(self):
+        """
+        The text of a TEXT structure, None for a structure that can not hold any content or a list of the {@link StructureView}s of the structures inside.
+        """
+        length = self.arena.text_lengths[self.index]
+        if length == -1:
+            return None
+        if self.arena.kinds[self.index] == Structure.Type.TEXT.value:
+            offset = self.arena.text_offsets[self.index]
+            return self.arena.text[offset:offset + length]
+        return [StructureView(self.arena, child) for child in self.arena.children(self.index)]
+
+    @property
+    def address(self):
+        return self.arena.addresses.get(self.index)
+
+    @address.setter
+    def address(self, value):
+        self.arena.addresses[self.index] = value
+
+    def __getattr__(self, name):
+        # Only LINK structures may have a title
+        if name == "title" and self.index in self.arena.titles:
+            return self.arena.titles[self.index]
+        raise AttributeError(name)
+
+    def __eq__(self, other):
+        if other is None:
+            return False
+        if self.kind is not other.kind:
+            return False
+        content = self.content
+        other_content = other.content
+        if content is None or other_content is None:
+            return content is None and other_content is None
+        if len(content) != len(other_content):
+            return False
+        for i in range(len(content)):
+            if content[i] != other_content[i]:
+                return False
+        return True
+
+    def __str__(self):
+        content = self.content
+        if isinstance(content, str):
+            content = "'" + content + "'"
+        elif content is None:
+            content = "None"
+        else:
+            content = "[" + ", ".join(str(x) for x in content) + "]"
+        return f"{{ content: {content}, type: {str(self.kind)} }}"
+
+    def __repr__(self):
+        return str(self)
@@ -0,0 +1,150 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from main import convert
+from cache import BuildManifest
+"""
+Batch conversion of whole directory trees of Markdown files. The files are converted in parallel by a pool of worker processes, one per available
+processor core, and the HTML files are written to a directory tree that mirrors the source tree. Files that have not changed since the previous batch are
+skipped, see cache.py.
+
+Example usage:
+
+    python main.py --batch documents/ out/
+    python main.py --batch documents/ out/ --force
+"""
+
+class FileResult:
+    """
+    This class holds the outcome of the conversion of a single file.
+    """
+    def __init__(self, source, target, seconds, size, error=None, cached=False):
+        """
+        @source is the path of the Markdown file
+        @target is the path of the HTML file
+        @seconds is the time the conversion took
+        @size is the size of the Markdown file in bytes
+        @error is the description of the error that stopped the conversion, None if the conversion succeeded
+        @cached is True if the file was skipped because its output was up to date
+        """
+        self.source = source
+        self.target = target
+        self.seconds = seconds
+        self.size = size
+        self.error = error
+        self.cached = cached
+
+def get_worker_count():
+    """
+    Determines the number of processor cores available to this process.
+    Returns an integer.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def find_sources(source_dir, target_dir):
+    """
+    Walks the directory tree at @source_dir and pairs every Markdown file with the path of its HTML file inside @target_dir. The HTML file has the same
+    relative path as the Markdown file, only with the .html extension.
+    Returns a list of tuples (source, target).
+    """
+    jobs = []
+    for directory, directories, files in os.walk(source_dir):
+        directories.sort()
+        for name in sorted(files):
+            if not name.endswith(".md"):
+                continue
+            source = os.path.join(directory, name)
+            relative_path = os.path.relpath(source, source_dir)
+            jobs.append((source, os.path.join(target_dir, os.path.splitext(relative_path)[0] + ".html")))
+    return jobs
+
+def convert_file(job):
+    """
+    Converts a single (source, target) @job, creating the target directory if necessary. This function is run by the worker processes.
+    Returns a {@link FileResult}.
+    """
+    source, target = job
+    start = time.perf_counter()
+    try:
+        size = os.path.getsize(source)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        convert(source, target)
+    except Exception as e:
+        return FileResult(source, target, time.perf_counter() - start, 0, f"{type(e).__name__}: {e}")
+    return FileResult(source, target, time.perf_counter() - start, size)
+
+def convert_tree(source_dir, target_dir, workers=None, force=False):
+    """
+    Converts all Markdown files in the directory tree at @source_dir into HTML files in the directory tree at @target_dir. The conversions are spread over
+    @workers processes, by default one per available processor core. Files that have not changed since the previous call are skipped, unless @force is True.
+    Returns a list of {@link FileResult}
+    """
+    if not os.path.isdir(source_dir):
+        raise ValueError(f"{source_dir} is not a directory")
+    target_dir = os.path.abspath(target_dir)
+    jobs = find_sources(os.path.abspath(source_dir), target_dir)
+    manifest = BuildManifest(os.path.join(target_dir, BuildManifest.file_name))
+    if force:
+        manifest.clear()
+    manifest.retain([source for source, target in jobs])
+    results = []
+    stale_jobs = []
+    for source, target in jobs:
+        if manifest.is_up_to_date(source, target):
+            results.append(FileResult(source, target, 0.0, 0, cached=True))
+        else:
+            stale_jobs.append((source, target))
+    if len(stale_jobs) > 0:
+        if workers is None:
+            workers = get_worker_count()
+        workers = max(1, min(workers, len(stale_jobs)))
+        # Sending the jobs to the workers in chunks saves a lot of inter-process communication on trees with thousands of small files
+        chunksize = max(1, len(stale_jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(convert_file, stale_jobs, chunksize=chunksize):
+                if result.error is None:
+                    manifest.update(result.source)
+                results.append(result)
+    if len(jobs) > 0:
+        manifest.save()
+    return results
+
+def print_summary(results, seconds, workers):
+    """
+    Prints the time and throughput of each converted file followed by the totals for the whole batch. The batch took @seconds of wall time using @workers
+    processes.
+    """
+    for result in results:
+        if result.cached:
+            continue
+        if result.error is not None:
+            print(f"FAILED  {result.source}: {result.error}")
+            continue
+        print(f"{result.seconds * 1000:10.2f} ms {throughput(result.size, result.seconds):10.2f} MB/s  {result.source}")
+    cached = sum(1 for result in results if result.cached)
+    converted = [result for result in results if result.error is None and not result.cached]
+    size = sum(result.size for result in converted)
+    busy = sum(result.seconds for result in converted)
+    print(f"Cache: {cached} files up to date, {len(results) - cached} files rebuilt")
+    print(f"Converted {len(converted)} of {len(results) - cached} files ({size / 1000000:.2f} MB) in {seconds:.2f} s using {workers} processes")
+    print(f"Throughput: {throughput(size, seconds):.2f} MB/s overall, {throughput(size, busy):.2f} MB/s per process")
+
+def throughput(size, seconds):
+    """
+    Returns the throughput in megabytes per second of processing @size bytes in @seconds.
+    """
+    if seconds <= 0:
+        return 0.0
+    return size / seconds / 1000000
+
+def main(source_dir, target_dir, force=False):
+    """
+    The entry point of the --batch command line mode. @force makes all files be converted again, regardless of the build manifest.
+    """
+    workers = get_worker_count()
+    start = time.perf_counter()
+    results = convert_tree(source_dir, target_dir, workers, force)
+    print_summary(results, time.perf_counter() - start, workers)
+    return all(result.error is None for result in results)
@@ -0,0 +1,37 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from translator import Translator
+import timeit
+"""
+Measures the throughput of the HTML escaping done by the Translator on plain text and on entity-dense text.
+
+Example usage:
+
+    python benchmarks/bench_escape.py
+"""
+inputs = {
+    "plain": "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore. " * 10000,
+    "entity-dense": "AT&T &amp; <b>bold</b> &copy; x > y && z &#169; &nbsp;&lt;&& " * 10000,
+    "ampersands": "&" * 1000000,
+}
+
+def measure(function, text, repeat=5):
+    """
+    Runs @function on @text @repeat times and takes the best time.
+    Returns the throughput in megabytes per second.
+    """
+    seconds = min(timeit.repeat(lambda: function(text), number=1, repeat=repeat))
+    return len(text.encode("utf-8")) / seconds / 1000000
+
+def main():
+    translator = Translator()
+    escapers = {"escape": translator._Translator__escape, "auto_escape": translator._Translator__auto_escape}
+    for name, escaper in escapers.items():
+        for label, text in inputs.items():
+            print(f"{name:<12} {label:<13} {measure(escaper, text):10.1f} MB/s")
+
+if __name__ == "__main__":
+    main()
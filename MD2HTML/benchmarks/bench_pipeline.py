@@ -0,0 +1,155 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import convert
+from stats import ConversionStats
+import corpus
+import argparse
+import tempfile
+import platform
+import time
+import json
+"""
+Measures each stage of main.convert() on the synthetic documents of corpus.py and records the results to a JSON history file. The compare mode checks
+the new results against the previous run with the same settings and reports the stages that got slower by more than a threshold, so that a change
+that makes the converter slower gets noticed.
+
+Example usage:
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --kinds emphasis,links --size 500000 --compare --threshold 0.15
+"""
+default_history = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.json")
+
+def measure(path, repeat):
+    """
+    Converts the file at @path @repeat times and takes the best time of each stage.
+    Returns a dictionary that maps "wall" and "cpu" to dictionaries of the times of the stages and the total time in seconds.
+    """
+    best = {"wall": {}, "cpu": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        target = os.path.join(directory, "out.html")
+        for _ in range(repeat):
+            stats = ConversionStats()
+            convert(path, target, stats)
+            for metric, times, total in [("wall", stats.wall, stats.total_wall), ("cpu", stats.cpu, stats.total_cpu)]:
+                for stage, seconds in list(times.items()) + [("total", total)]:
+                    best[metric][stage] = min(best[metric].get(stage, seconds), seconds)
+    return best
+
+def run(kinds, size, seed, repeat):
+    """
+    Generates a document of each of the @kinds and measures its conversion.
+    Returns a dictionary that maps the kinds to their results (see measure()), with the size of the document in bytes added.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for kind in kinds:
+            path = os.path.join(directory, f"{kind}.md")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(corpus.generate(kind, size, seed))
+            results[kind] = measure(path, repeat)
+            results[kind]["bytes"] = os.path.getsize(path)
+    return results
+
+def print_results(results, metric):
+    print(f"{'document':<12}" + "".join(f"{stage:>12}" for stage in ConversionStats.stages + ["total"]) + f"{'MB/s':>10}")
+    for kind, result in results.items():
+        times = result[metric]
+        throughput = result["bytes"] / times["total"] / 1000000 if times["total"] > 0 else 0
+        print(f"{kind:<12}" + "".join(f"{times[stage] * 1000:10.1f}ms" for stage in ConversionStats.stages + ["total"]) + f"{throughput:10.2f}")
+
+def load_history(path):
+    """
+    Reads the history file at @path. A missing file is an empty history.
+    Returns a list of the recorded runs, from the oldest one.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+def save_history(path, history):
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        json.dump(history, file, indent=2)
+    os.replace(temporary_path, path)
+
+def find_baseline(history, entry):
+    """
+    Finds the latest run in the @history that was done with the same settings (size and seed of the documents) as the @entry.
+    Returns the run or None.
+    """
+    for previous in reversed(history):
+        if previous["size"] == entry["size"] and previous["seed"] == entry["seed"]:
+            return previous
+    return None
+
+def compare(baseline, entry, metric, threshold):
+    """
+    Compares the results of the @entry to the results of the @baseline run. A stage is a regression when it takes more than (1 + @threshold) times
+    the time it took in the baseline.
+    Returns a list of tuples (document kind, stage, baseline seconds, new seconds) of the regressions.
+    """
+    regressions = []
+    for kind, result in entry["results"].items():
+        if kind not in baseline["results"]:
+            continue
+        for stage, seconds in result[metric].items():
+            previous = baseline["results"][kind][metric].get(stage)
+            if previous is not None and seconds > previous * (1 + threshold):
+                regressions.append((kind, stage, previous, seconds))
+    return regressions
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmarks each stage of the conversion on synthetic documents.")
+    parser.add_argument("--kinds", default=",".join(corpus.kinds), help="comma separated kinds of documents, see corpus.py")
+    parser.add_argument("--size", type=int, default=200000, help="size of each document in characters")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="the best of this many conversions is taken")
+    parser.add_argument("--history", default=default_history, help="the JSON file the results are recorded to")
+    parser.add_argument("--label", default="", help="a note recorded with the results, such as the commit")
+    parser.add_argument("--metric", choices=["cpu", "wall"], default="cpu", help="the time shown and compared (CPU time is less affected by other processes)")
+    parser.add_argument("--compare", action="store_true", help="compare with the previous run with the same settings and fail on a regression")
+    parser.add_argument("--threshold", type=float, default=0.1, help="the relative slowdown reported as a regression")
+    parser.add_argument("--no-record", action="store_true", help="do not add the results to the history")
+    arguments = parser.parse_args(arguments)
+
+    kinds = [kind for kind in arguments.kinds.split(",") if len(kind) != 0]
+    for kind in kinds:
+        if kind not in corpus.kinds:
+            parser.error(f"unknown kind of document: {kind}")
+    entry = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "label": arguments.label,
+        "python": platform.python_version(),
+        "size": arguments.size,
+        "seed": arguments.seed,
+        "results": run(kinds, arguments.size, arguments.seed, arguments.repeat),
+    }
+    print_results(entry["results"], arguments.metric)
+
+    history = load_history(arguments.history)
+    failed = False
+    if arguments.compare:
+        baseline = find_baseline(history, entry)
+        if baseline is None:
+            print("Nothing to compare with, no previous run with the same settings")
+        else:
+            print(f"Compared with the run of {baseline['time']} {baseline['label']}".rstrip())
+            regressions = compare(baseline, entry, arguments.metric, arguments.threshold)
+            for kind, stage, previous, seconds in regressions:
+                print(f"REGRESSION {kind} {stage}: {previous * 1000:.1f} ms -> {seconds * 1000:.1f} ms ({seconds / previous - 1:+.0%})")
+            if len(regressions) == 0:
+                print(f"No stage is more than {arguments.threshold:.0%} slower")
+            failed = len(regressions) != 0
+    if not arguments.no_record:
+        history.append(entry)
+        save_history(arguments.history, history)
+    return not failed
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -0,0 +1,61 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tokenizer import RegexTokenizer
+from parser import Parser
+from arena import StructureArena
+import serializer
+import tempfile
+import mmap
+import time
+"""
+Compares loading a serialized document (see serializer.py) to parsing it again, on the documents/docs.md sample repeated 1000 times.
+
+Example usage:
+
+    python benchmarks/bench_serializer.py
+"""
+scale = 1000
+
+def measure(function, repeat=3):
+    """
+    Runs @function @repeat times and takes the best time.
+    Returns the time in seconds and the result of the last run.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+def load(path):
+    with open(path, "rb") as file:
+        return serializer.load(file)
+
+def load_mapped(path):
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return serializer.loads(data)
+
+def main():
+    with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "documents", "docs.md")) as file:
+        text = file.read() * scale
+    parse_time, arena = measure(lambda: StructureArena(Parser().parse_stream(RegexTokenizer().tokenize(text))), repeat=1)
+    dump_time, data = measure(lambda: serializer.dumps(arena))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "docs.ast")
+        with open(path, "wb") as file:
+            file.write(data)
+        load_time, _ = measure(lambda: load(path))
+        mapped_time, _ = measure(lambda: load_mapped(path))
+    print(f"docs.md x{scale}: {len(text.encode('utf-8')) / 1000000:.1f} MB of markdown, {len(arena)} structures, {len(data) / 1000000:.1f} MB serialized")
+    print(f"{'parse':<8} {parse_time * 1000:10.1f} ms")
+    print(f"{'dump':<8} {dump_time * 1000:10.1f} ms")
+    print(f"{'load':<8} {load_time * 1000:10.1f} ms {parse_time / load_time:8.1f}x faster than parse")
+    print(f"{'mmap':<8} {mapped_time * 1000:10.1f} ms {parse_time / mapped_time:8.1f}x faster than parse")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import sys
+import random
+"""
+Generates synthetic Markdown documents for the benchmarks. The documents are generated from a seed, so the same seed and size always give the same
+document and the benchmark results of different versions of the converter can be compared.
+
+Example usage:
+
+    python benchmarks/corpus.py emphasis 1000000 out.md
+"""
+words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit", "sed", "do", "eiusmod", "tempor", "incididunt", "ut", "labore",
+    "et", "dolore", "magna", "aliqua", "enim", "ad", "minim", "veniam", "quis", "nostrud", "exercitation", "ullamco", "laboris", "nisi", "aliquip",
+    "snake_case", "AT&T", "x<y", "3.14", "(note)", "e.g.", "don't", "\"quoted\""]
+
+def sentence(rng, length=12):
+    return " ".join(rng.choice(words) for _ in range(length))
+
+def inline(rng, length=12):
+    """
+    Returns a line of text with some emphasis, code and links in it.
+    """
+    pieces = []
+    for _ in range(length):
+        choice = rng.random()
+        word = rng.choice(words)
+        if choice < 0.08:
+            pieces.append(f"*{word}*")
+        elif choice < 0.12:
+            pieces.append(f"**{word}**")
+        elif choice < 0.15:
+            pieces.append(f"`{word}`")
+        elif choice < 0.18:
+            pieces.append(f"[{word}](https://example.com/{rng.randrange(1000)})")
+        else:
+            pieces.append(word)
+    return " ".join(pieces)
+
+def realistic(rng):
+    """
+    Returns a block of a document that looks like the usual documentation: headings, paragraphs, lists, quotes and code.
+    """
+    choice = rng.random()
+    if choice < 0.1:
+        return "#" * rng.randint(1, 4) + " " + sentence(rng, rng.randint(2, 6))
+    if choice < 0.5:
+        return "\n".join(inline(rng) for _ in range(rng.randint(1, 5)))
+    if choice < 0.7:
+        marker = rng.choice(["-", "*", "+", "1."])
+        return "\n".join(f"{marker} {inline(rng, rng.randint(3, 10))}" for _ in range(rng.randint(2, 8)))
+    if choice < 0.8:
+        return "\n".join("> " + inline(rng) for _ in range(rng.randint(1, 4)))
+    if choice < 0.9:
+        return "\n".join("    " + sentence(rng, rng.randint(2, 8)) for _ in range(rng.randint(2, 10)))
+    return "***"
+
+def nested(rng):
+    """
+    Returns a block of deeply nested blockquotes and lists.
+    """
+    depth = rng.randint(10, 60)
+    if rng.random() < 0.5:
+        return "\n".join("> " * depth + inline(rng, 6) for _ in range(rng.randint(1, 3)))
+    return "\n".join("  " * level + "- " + inline(rng, 4) for level in range(depth))
+
+def paragraphs(rng):
+    """
+    Returns a single long paragraph.
+    """
+    return "\n".join(inline(rng, 20) for _ in range(rng.randint(50, 200)))
+
+def emphasis(rng):
+    """
+    Returns a paragraph full of delimiter runs, many of which can not be matched.
+    """
+    pieces = []
+    for _ in range(rng.randint(20, 200)):
+        word = rng.choice(words)
+        pieces.append(rng.choice(["*", "**", "***", "_", "__", ""]) + word + rng.choice(["*", "**", "***", "_", "__", "", " *", "* "]))
+    return " ".join(pieces)
+
+def links(rng):
+    """
+    Returns a paragraph full of inline and reference links.
+    """
+    pieces = []
+    for _ in range(rng.randint(10, 50)):
+        word = rng.choice(words)
+        choice = rng.random()
+        if choice < 0.5:
+            pieces.append(f"[{word}](https://example.com/{word}/{rng.randrange(10000)})")
+        elif choice < 0.7:
+            pieces.append(f"[{word}][label {rng.randrange(100)}]")
+        elif choice < 0.8:
+            pieces.append(f"[{word}]")
+        else:
+            pieces.append(word)
+    return " ".join(pieces)
+
+def codeblocks(rng):
+    """
+    Returns an indented codeblock.
+    """
+    return "\n".join("    " + rng.choice(["    ", ""]) + sentence(rng, rng.randint(1, 10)).replace(" ", rng.choice([" ", "  ", "\t"]))
+        for _ in range(rng.randint(5, 50)))
+
+# The kinds of documents, each given by the function that generates a single block of the document
+kinds = {
+    "realistic": realistic,
+    "nested": nested,
+    "paragraphs": paragraphs,
+    "emphasis": emphasis,
+    "links": links,
+    "codeblocks": codeblocks,
+}
+
+def generate(kind, size, seed=0):
+    """
+    Generates a document of the @kind (see kinds) of about @size characters from the @seed.
+    Returns a string.
+    """
+    if kind not in kinds:
+        raise ValueError(f"Unknown kind of document: {kind}")
+    rng = random.Random(f"{kind}-{seed}")
+    block = kinds[kind]
+    blocks = []
+    length = 0
+    while length < size:
+        blocks.append(block(rng))
+        length += len(blocks[-1]) + 2
+    if kind == "links":
+        # Half of the labels are defined
+        blocks.append("\n".join(f"[label {i}]: https://example.com/label/{i} \"Label {i}\"" for i in range(0, 100, 2)))
+    return "\n\n".join(blocks) + "\n"
+
+def main():
+    if len(sys.argv) not in (4, 5):
+        print("Usage: python benchmarks/corpus.py KIND SIZE OUTPUT [SEED]")
+        print("Kinds: " + ", ".join(kinds))
+        sys.exit(1)
+    text = generate(sys.argv[1], int(sys.argv[2]), int(sys.argv[4]) if len(sys.argv) == 5 else 0)
+    with open(sys.argv[3], "w", encoding="utf-8") as file:
+        file.write(text)
+
+if __name__ == "__main__":
+    main()
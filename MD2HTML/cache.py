@@ -0,0 +1,117 @@
+import os
+import json
+import hashlib
+"""
+The build manifest remembers what every source file looked like when it was last converted, so that rebuilding a tree of mostly unchanged files only
+converts the files that actually changed. See batch.py.
+"""
+
+# The files the output of the conversion depends on, a change in any of them invalidates the whole manifest
+converter_files = ["tokenizer.py", "parser.py", "translator.py", "arena.py", "source.py", "stats.py", "main.py", "metadata.py"]
+
+def get_converter_version():
+    """
+    Computes the version of the converter from the contents of its source files, so that any change to the converter is noticed without having to
+    maintain a version number by hand.
+    Returns a hexadecimal string.
+    """
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in converter_files:
+        with open(os.path.join(directory, name), "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+def hash_file(path):
+    """
+    Returns the SHA-256 hash of the contents of the file at @path as a hexadecimal string.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class BuildManifest:
+    """
+    This class represents the on-disk record of the previous build. For every source file it stores the hash of its contents, the output path and the
+    version of the converter that produced the output. A source file is up to date when all three still match and the output exists.
+
+    The size and modification time of the source are stored as well. As long as they have not changed, the stored hash is trusted and the file is not read at
+    all, which is what makes a rebuild of an unchanged tree fast.
+    """
+    file_name = ".md2html-manifest.json"
+
+    def __init__(self, path, version=None):
+        """
+        @path is the path of the manifest file, it does not need to exist
+        @version is the version of the converter, see get_converter_version()
+        """
+        self.path = path
+        self.version = get_converter_version() if version is None else version
+        self.entries = {}
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        """
+        Reads the manifest file. A missing or unreadable manifest, or one written by another version of the converter, is treated as empty.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version") == self.version and isinstance(data.get("files"), dict):
+            self.entries = data["files"]
+
+    def save(self):
+        """
+        Writes the manifest file. The file is replaced atomically so that an interrupted build can not leave a corrupted manifest behind.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump({"version": self.version, "files": self.entries}, file, indent=1, sort_keys=True)
+        os.replace(temporary_path, self.path)
+
+    def clear(self):
+        """
+        Forgets all the entries, so that every file is considered changed.
+        """
+        self.entries = {}
+
+    def is_up_to_date(self, source, target):
+        """
+        Checks whether the file at @source was converted to @target by this version of the converter and has not changed since. The fingerprint of the
+        source is remembered, so that a later call to update() does not need to compute it again.
+        Returns boolean.
+        """
+        stat = os.stat(source)
+        entry = self.entries.get(source)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            digest = entry["hash"]
+        else:
+            digest = hash_file(source)
+        self.pending[source] = {"hash": digest, "size": stat.st_size, "mtime": stat.st_mtime_ns, "target": target}
+        if entry is not None and entry["hash"] == digest and entry["target"] == target and os.path.exists(target):
+            # A file that was only touched is not hashed again on the next run
+            self.entries[source] = self.pending[source]
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def update(self, source):
+        """
+        Records that the file at @source has just been converted. is_up_to_date() must have been called for the file before.
+        """
+        self.entries[source] = self.pending[source]
+
+    def retain(self, sources):
+        """
+        Removes the entries of all files that are not in the collection @sources, e.g. because they were deleted.
+        """
+        self.entries = {source: self.entries[source] for source in sources if source in self.entries}
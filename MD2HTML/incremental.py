@@ -0,0 +1,107 @@
+from tokenizer import RegexTokenizer
+from parser import Parser, may_define_labels
+from translator import Translator
+from metadata import split_front_matter
+"""
+Incremental conversion for live previews, where the same document is converted again after every small edit.
+
+An empty line closes all the open structures, so a document falls apart into blocks of lines that end with empty lines and can be parsed independently
+of each other. The structures and the HTML of every block are remembered, keyed by the text of the block, and only the blocks whose text changed since
+the previous conversion are parsed and translated again.
+
+Example usage:
+
+    renderer = IncrementalRenderer()
+    html = renderer.render(text)
+    html = renderer.render(edited_text) # Only the edited block is converted
+"""
+
+class IncrementalRenderer:
+    """
+    This class converts successive versions of a document, reusing the results for the blocks of the document that did not change. The result is
+    always the same as if the whole document was converted at once.
+    """
+    def __init__(self):
+        self.tokenizer = RegexTokenizer()
+        self.parser = Parser()
+        self.translator = Translator()
+        self.cache = {} # Maps the text of a block to a list [structures, HTML or None, whether the block is independent of the following lines]
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, text):
+        """
+        Parses the Markdown @text into a list of structures. The structures of unchanged blocks are shared with the previous results, they must not be
+        modified.
+        Returns a list of {@link Structure}
+        """
+        structures = []
+        for entry in self.__convert_blocks(text):
+            structures += entry[0]
+        return structures
+
+    def render(self, text):
+        """
+        Converts the Markdown @text into HTML, see Translator#translate().
+        Returns a string.
+        """
+        html = []
+        for entry in self.__convert_blocks(text):
+            if entry[1] is None:
+                entry[1] = self.translator.translate(entry[0])
+            html.append(entry[1])
+        return "".join(html)
+
+    def __convert_blocks(self, text):
+        """
+        Splits the @text into blocks and parses the blocks that are not cached yet. A block that the following lines depend on (e.g. because of an escape
+        at its very end) is merged with the following block. Only the blocks of this @text are kept in the cache afterwards.
+        Returns a list of the cache entries of the blocks.
+        """
+        if text is None:
+            raise ValueError("Can not convert None")
+        text = text[split_front_matter(text)[1]:]
+        if len(text) == 0:
+            return []
+        # The labels defined anywhere in the document may be referred to in any block, so such a document is converted as a single block
+        blocks = [text] if may_define_labels(text) else self.__split_blocks(text)
+        cache = {}
+        entries = []
+        i = 0
+        while i < len(blocks):
+            block = blocks[i]
+            i += 1
+            while True:
+                entry = cache.get(block) or self.cache.get(block)
+                if entry is None:
+                    self.misses += 1
+                    structures, independent = self.parser.parse_block(self.tokenizer.tokenize(block))
+                    entry = [structures, None, independent]
+                else:
+                    self.hits += 1
+                cache[block] = entry
+                if entry[2] or i == len(blocks):
+                    break
+                block += "\n" + blocks[i]
+                i += 1
+            entries.append(entry)
+        self.cache = cache
+        return entries
+
+    def __split_blocks(self, text):
+        """
+        Splits the @text into blocks of lines, every block but the last one ends with one or more empty lines. Joining the blocks with line terminators
+        gives back the @text.
+        Returns a list of strings.
+        """
+        lines = text.split("\n")
+        blocks = []
+        start = 0
+        for i in range(len(lines)):
+            # The tokenizer turns tabs into spaces, so a line of spaces and tabs is empty for the parser
+            if len(lines[i].strip(" \t")) == 0 and (i + 1 == len(lines) or len(lines[i + 1].strip(" \t")) != 0):
+                blocks.append("\n".join(lines[start:i + 1]))
+                start = i + 1
+        if start < len(lines):
+            blocks.append("\n".join(lines[start:]))
+        return blocks
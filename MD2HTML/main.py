@@ -1,8 +1,10 @@
 import sys, os
-from pathlib import Path
-from tokenizer import Tokenizer
+from tokenizer import RegexTokenizer
 from parser import Parser
 from translator import Translator
+from source import MappedSource, ChunkedWriter
+from stats import ConversionStats
+from metadata import split_front_matter
 import webbrowser
 """
 MD2HTML is a conversion program from the Markdown format to the HTML format.
@@ -13,15 +15,73 @@ Example usage:
 
     python main.py documents/in.md documents.out.html
 
+The time spent in each stage of the conversion and other statistics are printed with --stats, see stats.py:
+
+    python main.py documents/in.md documents.out.html --stats
+
+With --toc, the headings get anchors and a table of contents linking to them is put at the beginning of the document:
+
+    python main.py documents/docs.md documents/docs.html --toc
+
+A whole directory tree of Markdown files can be converted at once, see batch.py:
+
+    python main.py --batch documents/ out/
+
+Files that have not changed since the previous batch are skipped, --force converts them all again:
+
+    python main.py --batch documents/ out/ --force
+
+The files can be watched and converted again whenever they are saved, see watch.py:
+
+    python main.py --watch documents/ out/
+
+Other programs can have their documents converted by a long-running render service instead, see server.py:
+
+    python main.py --serve 127.0.0.1:8000
+
+A single large file can be split into chunks that are converted in parallel, see parallel.py:
+
+    python main.py --parallel documents/in.md documents/out.html
+
 The software is provided WITHOUT WARRANTY OF ANY KIND!
 """
 def main():
+    stats = None
+    if "--stats" in sys.argv:
+        sys.argv.remove("--stats")
+        stats = ConversionStats()
+    toc = "--toc" in sys.argv
+    if toc:
+        sys.argv.remove("--toc")
     if len(sys.argv) == 2 and sys.argv[1] == "--example":
         example()
         return
     if len(sys.argv) == 2 and sys.argv[1] == "--docs":
         docs()
         return
+    if len(sys.argv) in (4, 5) and sys.argv[1] == "--batch":
+        # batch imports this module for convert(), so it can not be imported at the top
+        import batch
+        if not batch.main(sys.argv[2], sys.argv[3], "--force" in sys.argv[4:]):
+            sys.exit(1)
+        return
+    if len(sys.argv) == 4 and sys.argv[1] == "--watch":
+        # watch imports batch, which imports this module
+        import watch
+        if not watch.main(sys.argv[2], sys.argv[3]):
+            sys.exit(1)
+        return
+    if len(sys.argv) in (2, 3) and sys.argv[1] == "--serve":
+        # server imports batch, which imports this module
+        import server
+        if not server.main(*sys.argv[2:]):
+            sys.exit(1)
+        return
+    if len(sys.argv) == 4 and sys.argv[1] == "--parallel":
+        # parallel imports batch, which imports this module
+        import parallel
+        parallel.convert(sys.argv[2], sys.argv[3])
+        return
 
     print("Enter absolute file paths (as long as possible). If you are referring to a file in the working directory, file name is enough.")
     if len(sys.argv) == 1:
@@ -32,23 +92,47 @@ def main():
         output_file_path = sys.argv[2]
     else:
         output_file_path = input("Enter output file: ")
-    convert(input_file_path, output_file_path)
+    convert(input_file_path, output_file_path, stats, toc)
     print("Translation finished!")
+    if stats is not None:
+        stats.print_report()
     webbrowser.open(output_file_path)
 
-def convert(source, target):
+def convert(source, target, stats=None, toc=False):
     """
     Converts a file at @source location to a file at @target location. The source file is treated as Markdown formatted text file. The target file will be an HTML document.
+    The file is converted in a streaming manner, the source is mapped into memory and tokenized line by line and every finished top-level block is written
+    to the target right away, in chunks of a fixed size. The memory used does not grow with the size of the file, only with the size of its largest
+    top-level block, unless a reference waits for a label defined further on (see Parser#parse_stream()). The front matter of the source is left out, see metadata.py. The source file is expected to be UTF-8 encoded, the target file is
+    UTF-8 encoded.
+    When a {@link ConversionStats} object is given as @stats, the conversion is measured into it. With @toc, the headings get anchors and a table of
+    contents is written before the document (see Translator#translate_outline()), so the whole document is parsed before anything is written.
     Returns the absolute path of the target file.
     """
     input_file_path = os.path.abspath(source)
     output_file_path = os.path.abspath(target)
-    tokenizer = Tokenizer()
+    tokenizer = RegexTokenizer()
     parser = Parser()
     translator = Translator()
-    markdown = Path(input_file_path).read_text()
-    with open(output_file_path, "w") as output_file:
-        output_file.write(translator.translate(parser.parse(tokenizer.tokenize(markdown))))
+    with MappedSource(input_file_path) as source, ChunkedWriter(open(output_file_path, "wb")) as output_file:
+        start = split_front_matter(source.buffer)[1]
+        outline = [] if toc else None
+        if stats is None:
+            structures = parser.parse_stream(tokenizer.tokenize_mapped(source, start), outline)
+        else:
+            stats.bytes_read = len(source)
+            stats.start()
+            structures = stats.parsed(parser.parse_stream(stats.tokenized(tokenizer.tokenize_mapped(source, start)), outline))
+            output_file = stats.writer(output_file)
+        try:
+            if toc:
+                # The outline is only complete once the whole document is parsed
+                structures = list(structures)
+                output_file.write(translator.translate_outline(outline))
+            translator.translate_to(structures, output_file)
+        finally:
+            if stats is not None:
+                stats.stop()
     return output_file_path
     
 def example():
@@ -0,0 +1,143 @@
+import io
+import re
+from tokenizer import RegexTokenizer
+from parser import Parser, Structure, get_text
+"""
+Front matter and metadata of Markdown documents. A document may begin with a block of front matter enclosed in lines of three dashes, which is not a part
+of the text of the document:
+
+    ---
+    title: About
+    description: Who we are
+    tags: [news, about]
+    ---
+
+The front matter is read as a dictionary (see parse_front_matter()) and left out of the HTML. For listing pages, scan_metadata() reads the front matter
+and the first few blocks of a document only, without converting the whole document.
+
+Example usage:
+
+    metadata = scan_metadata("documents/in.md")
+    print(metadata.title, metadata.description)
+"""
+
+# The largest front matter that is recognized, in characters (or bytes), so that a document that starts with a horizontal rule is not scanned whole
+max_front_matter_size = 1 << 16
+
+# The front matter starts with a line of three dashes and ends with a line of three dashes or three dots
+front_matter_pattern = re.compile(r"---[ \t]*(?:\r\n?|\n)((?:[^\r\n]*(?:\r\n?|\n))*?)(?:---|\.\.\.)[ \t]*(?:\r\n?|\n|\Z)")
+front_matter_bytes_pattern = re.compile(front_matter_pattern.pattern.encode("ascii"))
+
+key_pattern = re.compile(r"([\w-][\w.-]*)[ \t]*:(?:[ \t]+(.*?))?[ \t]*")
+item_pattern = re.compile(r"[ \t]*-(?:[ \t]+(.*?))?[ \t]*")
+
+tokenizer = RegexTokenizer()
+parser = Parser()
+
+def parse_value(value):
+    """
+    Parses a single value of the front matter. Quoted values are unquoted and values in square brackets are lists.
+    Returns a string or a list of strings.
+    """
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r'\\(.)', r"\1", value[1:-1])
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        return value[1:-1].replace("''", "'")
+    if len(value) >= 2 and value[0] == "[" and value[-1] == "]":
+        return [parse_value(item.strip()) for item in value[1:-1].split(",") if len(item.strip()) != 0]
+    return value
+
+def parse_front_matter(text):
+    """
+    Parses the @text of the front matter (without the lines of dashes). Only the simple subset of YAML that the front matter is written in is supported:
+    "key: value" lines, comments and lists, either in square brackets or as "- item" lines below a key without a value. All the values are strings.
+    Returns a dictionary or None if the @text is not front matter.
+    """
+    data = {}
+    key = None # The key the "- item" lines belong to
+    for line in text.splitlines():
+        if len(line.strip()) == 0 or line.lstrip().startswith("#"):
+            continue
+        match = key_pattern.fullmatch(line)
+        if match is not None:
+            key = match.group(1)
+            data[key] = parse_value(match.group(2) or "")
+            continue
+        match = item_pattern.fullmatch(line)
+        if match is not None and key is not None and (data[key] == "" or isinstance(data[key], list)):
+            if data[key] == "":
+                data[key] = []
+            data[key].append(parse_value(match.group(1) or ""))
+            continue
+        return None
+    return data
+
+def split_front_matter(text):
+    """
+    Finds the front matter at the beginning of the @text (a string, bytes or a memory map of a UTF-8 encoded file).
+    Returns a tuple (dictionary of the front matter or None, the index in @text where the Markdown starts)
+    """
+    pattern = front_matter_pattern if isinstance(text, str) else front_matter_bytes_pattern
+    end = min(len(text), max_front_matter_size)
+    match = pattern.match(text, 0, end)
+    # A match that reaches the limit may have been cut short
+    if match is None or (match.end() == end and end != len(text)):
+        return None, 0
+    body = match.group(1)
+    front_matter = parse_front_matter(body if isinstance(body, str) else body.decode("utf-8", "replace"))
+    if front_matter is None:
+        return None, 0
+    return front_matter, match.end()
+
+class DocumentMetadata:
+    """
+    This class holds what scan_metadata() found out about a document.
+    """
+    headings = {Structure.Type.HEADING_1, Structure.Type.HEADING_2, Structure.Type.HEADING_3, Structure.Type.HEADING_4, Structure.Type.HEADING_5,
+        Structure.Type.HEADING_6}
+
+    def __init__(self, front_matter, blocks):
+        """
+        @front_matter is the dictionary of the front matter, empty if the document has none
+        @blocks is the list of the first top-level structures of the document
+        """
+        self.front_matter = front_matter
+        self.blocks = blocks
+        # The text of the first heading and of the first paragraph among the blocks, or None
+        self.heading = next((get_text(block) for block in blocks if block.kind in self.headings), None)
+        self.paragraph = next((get_text(block) for block in blocks if block.kind is Structure.Type.PARAGRAPH), None)
+        # The title and the description given by the front matter, or the first heading and the first paragraph otherwise
+        self.title = front_matter.get("title") or self.heading
+        self.description = front_matter.get("description") or self.paragraph
+
+def scan_metadata(path, blocks=3):
+    """
+    Reads the front matter and the first @blocks top-level structures of the Markdown file at @path. An empty line closes all the open structures, so
+    the file is read and parsed one block of lines at a time (like in parallel.py) and the reading stops as soon as there are enough structures. The
+    definitions of the reference links may be anywhere in the document, so the references in the scanned blocks are not resolved. The file is expected
+    to be UTF-8 encoded.
+    Returns a {@link DocumentMetadata}.
+    """
+    structures = []
+    with open(path, "rb") as file:
+        # One byte more than the largest front matter, so that a front matter cut short by the limit is told apart from one that ends there
+        front_matter, start = split_front_matter(file.read(max_front_matter_size + 1))
+        file.seek(start)
+        lines = [] # The lines of the blocks that are not parsed yet
+        previous_empty = True
+        for line in io.TextIOWrapper(file, encoding="utf-8"):
+            empty = len(line.strip()) == 0
+            if not empty and previous_empty and len(lines) != 0:
+                block, independent = parser.parse_block(tokenizer.tokenize("".join(lines)))
+                # A block that the following lines depend on (e.g. because of an escape at its very end) is parsed again together with them
+                if independent:
+                    structures += block
+                    lines = []
+                    if len(structures) >= blocks:
+                        break
+            lines.append(line)
+            previous_empty = empty
+        else:
+            if len(lines) != 0:
+                structures += parser.parse_block(tokenizer.tokenize("".join(lines)))[0]
+    return DocumentMetadata(front_matter or {}, structures[:blocks])
@@ -0,0 +1,120 @@
+import os
+import re
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from tokenizer import RegexTokenizer
+from parser import Parser, may_define_labels
+from translator import Translator
+from batch import get_worker_count
+from metadata import split_front_matter
+from source import ChunkedWriter
+"""
+Parallel conversion of a single large document. An empty line closes all the open structures, so the document is split into chunks at runs of empty
+lines and the chunks are converted by a pool of processes. The HTML of the chunks is put back together in order, which gives the same output as
+converting the whole document at once.
+
+A chunk boundary is only safe when the parser is left in its initial state after the empty lines, which is not the case e.g. after an escape at the very
+end of the chunk or inside an unfinished link. Every chunk reports whether it ended in a safe state (see Parser#parse_block()) and a chunk that did not
+is converted again together with the following chunk.
+
+Example usage:
+
+    python main.py --parallel documents/in.md documents/out.html
+"""
+
+# The size of the chunks in characters, the chunks end at the first run of empty lines after this many characters
+chunk_size = 1 << 20
+
+# A run of empty lines (for the parser, a line of spaces and tabs is empty), the chunk ends right before the last line terminator of the run
+empty_lines_pattern = re.compile(r"\n[ \t]*\n(?:[ \t]*\n)*")
+
+tokenizer = RegexTokenizer()
+parser = Parser()
+translator = Translator()
+
+def split_chunks(text, size=None):
+    """
+    Splits the @text into chunks of at least @size characters, every chunk but the last one ends with one or more empty lines. Joining the chunks with
+    line terminators gives back the @text.
+    Returns a list of strings.
+    """
+    size = chunk_size if size is None else size
+    chunks = []
+    start = 0
+    while start + size < len(text):
+        match = empty_lines_pattern.search(text, start + size)
+        if match is None:
+            break
+        chunks.append(text[start:match.end() - 1])
+        start = match.end()
+    chunks.append(text[start:])
+    return chunks
+
+def convert_chunk(text):
+    """
+    Converts a chunk of a document into HTML. This is the function run by the worker processes.
+    Returns a tuple (HTML string, whether the following chunk can be converted independently of this one)
+    """
+    structures, independent = parser.parse_block(tokenizer.tokenize(text))
+    return translator.translate(structures), independent
+
+def render(text, workers=None, size=None):
+    """
+    Converts the Markdown @text into HTML using @workers processes (all the available processors by default). The text is split into chunks of about
+    @size characters, see split_chunks(). The front matter of the text is left out.
+    Returns a generator of the pieces of the HTML, in order.
+    """
+    if text is None:
+        raise ValueError("Can not convert None")
+    text = text[split_front_matter(text)[1]:]
+    if len(text) == 0:
+        return
+    workers = get_worker_count() if workers is None else workers
+    # The labels defined anywhere in the document may be referred to in any chunk, so such a document is converted as a single chunk
+    chunks = [text] if may_define_labels(text) else split_chunks(text, size)
+    if workers == 1 or len(chunks) == 1:
+        yield from merge_results(chunks, [functools.partial(convert_chunk, chunk) for chunk in chunks])
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        futures = [executor.submit(convert_chunk, chunk) for chunk in chunks]
+        try:
+            yield from merge_results(chunks, [future.result for future in futures])
+        finally:
+            for future in futures:
+                future.cancel()
+
+def merge_results(chunks, results):
+    """
+    Goes through the @results of the conversion of the @chunks in order. The results are functions that return the result of convert_chunk(), so
+    that the result of a chunk is only waited for when it is needed. When a chunk is not independent of the following one, the two are joined and
+    converted again in this process, until the joined chunk is independent. The result of the following chunk is not used then, since it was converted
+    from the wrong state.
+    Returns a generator of the pieces of the HTML.
+    """
+    pending = None # The text of the joined chunks that wait for the following chunk
+    for i in range(len(chunks)):
+        if pending is None:
+            html, independent = results[i]()
+        else:
+            pending += "\n" + chunks[i]
+            html, independent = convert_chunk(pending)
+        if independent or i + 1 == len(chunks):
+            pending = None
+            yield html
+        elif pending is None:
+            pending = chunks[i]
+
+def convert(source, target, workers=None, size=None):
+    """
+    Converts a file at @source location to a file at @target location like main.convert() does, but splits the document into chunks that are converted
+    in parallel, see render(). The source file is expected to be UTF-8 encoded, the target file is UTF-8 encoded.
+    Returns the absolute path of the target file.
+    """
+    input_file_path = os.path.abspath(source)
+    output_file_path = os.path.abspath(target)
+    with open(input_file_path, encoding="utf-8") as input_file:
+        text = input_file.read()
+    with ChunkedWriter(open(output_file_path, "wb")) as output_file:
+        for html in render(text, workers, size):
+            output_file.write(html)
+    return output_file_path
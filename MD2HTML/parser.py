@@ -1,5 +1,7 @@
 from enum import Enum
-from tokenizer import Token
+import unicodedata
+import re
+from tokenizer import Token, SpanToken, RegexTokenizer
 
 
 class Structure:
@@ -52,12 +54,16 @@ class Structure:
         def __repr__(self):
             return str(self)
         
-    def __init__(self, content, kind, parent=None, scope=None, metadata=[]):
+    # Documents consist of a great number of structures, so they do not get a __dict__. The attributes that only some of the structures have (the address
+    # and title of a LINK, the address of a heading, which is its anchor, the delimiter of a delimiter run) are left unset on the other structures.
+    __slots__ = ("content", "kind", "parent", "scope", "metadata", "address", "title", "delimiter", "has_delimiters")
+
+    def __init__(self, content, kind, parent=None, scope=None, metadata=None):
         self.content = content
         self.kind = kind
         self.parent = parent
         self.scope = scope
-        self.metadata = metadata
+        self.metadata = [] if metadata is None else metadata
     
     
     def __eq__(self, other):
@@ -94,10 +100,89 @@ class Structure:
     def __repr__(self):
         return str(self)
 
-class Label:
-    def __init__(data, title = ""):
-        self.data = data
-        self.title = title
+class OutlineEntry:
+    """
+    This class represents a heading in the outline of a document, see Parser#parse().
+    """
+    def __init__(self, level, text, slug, position):
+        """
+        @level is the level of the heading, 1 to 6
+        @text is the text of the heading without any markup
+        @slug is the anchor of the heading, unique within the document
+        @position is the number of the line of the heading, counted from 0
+        """
+        self.level = level
+        self.text = text
+        self.slug = slug
+        self.position = position
+
+    def __eq__(self, other):
+        return (isinstance(other, OutlineEntry) and self.level == other.level and self.text == other.text and self.slug == other.slug
+            and self.position == other.position)
+
+    def __repr__(self):
+        return f"OutlineEntry({self.level}, {self.text!r}, {self.slug!r}, {self.position})"
+
+def get_text(structure):
+    """
+    Collects the text of the @structure and all the structures inside it, without any markup.
+    Returns a string.
+    """
+    pieces = []
+    stack = [structure]
+    while len(stack) != 0:
+        structure = stack.pop()
+        if isinstance(structure.content, str):
+            pieces.append(structure.content)
+        elif isinstance(structure.content, list):
+            stack.extend(reversed(structure.content))
+    return "".join(pieces).strip()
+
+# The characters left out of the anchors of the headings
+slug_pattern = re.compile(r"[^\w\- ]")
+
+def slugify(text):
+    """
+    Turns the @text of a heading into its anchor the way GitHub does it: lowercase, without punctuation and with hyphens instead of spaces.
+    Returns a string.
+    """
+    return slug_pattern.sub("", text.lower()).replace(" ", "-")
+
+# A line that may be a link reference definition: a label in brackets followed by a colon at the start of the line, after any indentation and markers of
+# blockquotes and lists
+definition_pattern = re.compile(r"(?:^|(?<=\r))[ \t>*+\-.\d]*\[[^\[\]\\\r\n]*\]:", re.MULTILINE)
+
+def may_define_labels(text):
+    """
+    Checks whether the Markdown @text may contain link reference definitions. Only a line that starts with a label followed by a colon can be a
+    definition, so e.g. "y = x[1:]:" in a code sample is not mistaken for one. The check errs on the side of finding a definition. Fenced code is not
+    a block of its own for the parser (a line of backticks opens inline code), so the lines between fences are checked like any other.
+    Returns boolean.
+    """
+    return definition_pattern.search(text) is not None
+
+class Delimiter:
+    """
+    This class represents a run of asterisks or underscores that may open or close EMPHASIS and STRONG structures. The runs of an inline content are kept
+    in a doubly linked list while they are being matched (see Parser#__match_delimiters()).
+    """
+    def __init__(self, character, length, can_open, can_close):
+        """
+        @character is the character the run consists of
+        @length is the number of characters in the run
+        @can_open tells whether the run may open structures
+        @can_close tells whether the run may close structures
+        """
+        self.character = character
+        self.length = length # The number of characters that have not been used by any structure yet
+        self.original_length = length
+        self.can_open = can_open
+        self.can_close = can_close
+        self.position = 0
+        self.previous = None
+        self.next = None
+        self.opens = [] # The types of the structures the run opens, from the innermost one
+        self.closes = [] # The types of the structures the run closes, from the innermost one
 
 class Stack:
     def __init__(self):
@@ -114,40 +199,185 @@ class Stack:
     def poll(self):
         return self.data.pop()
 
+class ContextStack(Stack):
+    """
+    The stack of the open structures. Besides the structures themselves, it keeps track of the open scopes and of the open structures of every type as
+    the structures are pushed and removed, so that the parser never needs to walk the stack to find them.
+    """
+    # The children of these structures belong to an open scope (see Parser#__get_scope_hierarchy())
+    scope_structures = {Structure.Type.BLOCKQUOTE, Structure.Type.CODEBLOCK, Structure.Type.CODE, Structure.Type.PARAGRAPH, Structure.Type.ORDERED_LIST,
+        Structure.Type.UNORDERED_LIST, Structure.Type.HEADING_1, Structure.Type.HEADING_2, Structure.Type.HEADING_3, Structure.Type.HEADING_4,
+        Structure.Type.HEADING_5, Structure.Type.HEADING_6}
+
+    def __init__(self):
+        super().__init__()
+        self.scopes = [] # The scopes of the structures on the stack that belong to an open scope, from the bottom to the top
+        self.scopes_history = [] # For every structure on the stack, the scopes list and its length from before the structure was pushed
+        self.open_structures = {} # Maps a structure type to the list of the structures of that type on the stack, from the bottom to the top
+
+    def push(self, value):
+        self.scopes_history.append((self.scopes, len(self.scopes)))
+        # A structure without a scope is a top-level structure, the scopes of the structures below it are not open within it
+        if value.scope is None or value.parent is None:
+            self.scopes = []
+        elif value.parent.kind in self.scope_structures:
+            self.scopes.append(value.scope)
+        self.open_structures.setdefault(value.kind, []).append(value)
+        super().push(value)
+
+    def poll(self):
+        value = super().poll()
+        self.scopes, length = self.scopes_history.pop()
+        del self.scopes[length:]
+        self.open_structures[value.kind].pop()
+        return value
+
 class Parser:
     """
-    This class is used to convert the tokens into logical structures.
+    This class is used to convert the tokens into logical structures. The parser holds no state of the documents it parses (see __create_context()), so a
+    single instance can be used by several threads at once.
     """
+    # The scope that the structures of these types open for the structures inside them
+    opened_scopes = {
+        Structure.Type.BLOCKQUOTE: Structure.Scope.BLOCKQUOTE,
+        Structure.Type.CODEBLOCK: Structure.Scope.CODEBLOCK,
+        Structure.Type.CODE: Structure.Scope.CODE,
+        Structure.Type.HTML: Structure.Scope.HTML,
+        Structure.Type.PARAGRAPH: Structure.Scope.PARAGRAPH,
+        Structure.Type.ORDERED_LIST: Structure.Scope.LIST,
+        Structure.Type.UNORDERED_LIST: Structure.Scope.LIST,
+        Structure.Type.HEADING_1: Structure.Scope.HEADING,
+        Structure.Type.HEADING_2: Structure.Scope.HEADING,
+        Structure.Type.HEADING_3: Structure.Scope.HEADING,
+        Structure.Type.HEADING_4: Structure.Scope.HEADING,
+        Structure.Type.HEADING_5: Structure.Scope.HEADING,
+        Structure.Type.HEADING_6: Structure.Scope.HEADING,
+    }
+
+    # The structures that may be a part of an inline content, all other structures separate the inline contents from each other
+    inline_types = {Structure.Type.TEXT, Structure.Type.EMPHASIS, Structure.Type.STRONG, Structure.Type.CODE, Structure.Type.LINK, Structure.Type.EMAIL,
+        Structure.Type.IMAGE, Structure.Type.LINE_BREAK}
+
+    # The level of each of the headings
+    heading_levels = {Structure.Type.HEADING_1: 1, Structure.Type.HEADING_2: 2, Structure.Type.HEADING_3: 3, Structure.Type.HEADING_4: 4,
+        Structure.Type.HEADING_5: 5, Structure.Type.HEADING_6: 6}
+
+    # The characters represented by the tokens that carry no value
+    token_characters = {kind: character for character, kind in RegexTokenizer.single_character_tokens.items()}
+
     def __init(self):
         self.super_structure = Structure([], Structure.Type.SUPER) # The parent structure for all other structures
         self.FLAG_LAST_LINE_EMPTY = False
         self.FLAG_IS_ESCAPED = False
-        self.context_stack = Stack()
+        self.context_stack = ContextStack()
         self.context_stack.push(self.super_structure)
         self.token_buffer = [] # Stores tokens that are not yet part of any structure
         self.setext_heading_buffer = [] # Stores a line of tokens in case it is found to be a setext heading
         self.link_text_buffer = [] # Stores tokens that will possibly hold the textual part of a LINK
         self.link_address_buffer = [] # Stores tokens that will possibly hold the address of a LINK
         self.link_title_buffer = [] # Stores tokens that will possibly hold the title of a LINK
-        self.link_buffer_stage = 0 # Stage 1 is buffering the text, stage 2 is buffering the address
+        self.link_buffer_stage = 0 # Stage 1 is buffering the text, stage 2 is buffering the address, stage 3 is buffering the label of a reference
         self.link_data_buffer_index = -1 # Holds the index in the token_buffer from where on the tokens are being buffered for link recognition so that the buffer can be cut to this index
+        self.link_label_index = -1 # Holds the index in the token_buffer of the bracket that opens the label of a reference
+        self.labels = {} # Maps a normalized label to the (address, title) of its link reference definition
+        self.pending_references = {} # Maps a normalized label that is not defined yet to the LINK structures that refer to it
+        self.line_index = -1 # The number of the line being parsed
+        self.consumed_indent = 0 # The number of spaces of the SPACE token the prefixes of the current line ended in that the prefixes already used
+        self.outline = None # The list the {@link OutlineEntry} of every finished heading is appended to, None if the outline is not collected
+        self.slugs = {} # Maps the slug of a heading to the number of the last heading that got the slug with a number appended
     
-    def parse(self, tokens):
+    def parse(self, tokens, outline=None):
         """
-        Parses a list of token lists into a list of structures.
+        Parses a list of token lists into a list of structures. When a list is given as @outline, the outline of the document is collected into it as a
+        side product of the parsing: an {@link OutlineEntry} of every heading is appended to it in order and the address of every heading structure is
+        set to its anchor (see Translator#translate_outline()).
         Returns a list of {@link Structure}
         """
-        self.__init()
+        context = self.__create_context(outline)
         for line in tokens:
-            self.__parse_line(line)
+            context.__parse_line(line)
 
-        open_scopes = self.__get_scope_hierarchy()
+        open_scopes = context.__get_scope_hierarchy()
+        if len(open_scopes) != 0:
+            context.__finish_recursively(open_scopes)
+        context.__drop_pending_references()
+
+        return context.super_structure.content
+
+    def parse_stream(self, tokens, outline=None):
+        """
+        Parses an iterable of token lists (such as the one produced by Tokenizer#tokenize_stream()) into structures. Every top-level structure is
+        handed back as soon as it is finished, so only the currently open block needs to be kept in memory. A reference to a label that is not defined
+        yet may still be resolved by a definition further in the document, so while there is such a reference, the finished structures are held back.
+        The definitions are usually put at the end of the document, so a reference to a label that is never defined makes the rest of the document
+        stay in memory until the end, which is the price of giving the same structures as parse().
+        The @outline is collected like in parse(), it is complete once the generator is exhausted.
+        Returns a generator of {@link Structure}
+        """
+        context = self.__create_context(outline)
+        for line in tokens:
+            context.__parse_line(line)
+            if len(context.super_structure.content) != 0 and len(context.pending_references) == 0:
+                yield from context.__take_finished_structures()
+
+        open_scopes = context.__get_scope_hierarchy()
         if len(open_scopes) != 0:
-            self.__finish_recursively(open_scopes)
+            context.__finish_recursively(open_scopes)
+        context.__drop_pending_references()
+        yield from context.__take_finished_structures()
 
-        return self.super_structure.content
+    def parse_block(self, tokens):
+        """
+        Parses a list of token lists, that is a block of lines of a document, into a list of structures like parse() does. Also tells whether the lines
+        following the block can be parsed independently of it, which is the case when the block ends with an empty line after which the parser is left
+        in its initial state (no open structures, nothing buffered, no pending escape or link). The labels defined in one block are not known to the
+        other blocks, so a document that contains link reference definitions (see may_define_labels()) can not be parsed in blocks. See incremental.py.
+        Returns a tuple (list of {@link Structure}, boolean)
+        """
+        context = self.__create_context()
+        for line in tokens:
+            context.__parse_line(line)
+        independent = context.__is_idle()
+
+        open_scopes = context.__get_scope_hierarchy()
+        if len(open_scopes) != 0:
+            context.__finish_recursively(open_scopes)
+        context.__drop_pending_references()
+
+        return context.super_structure.content, independent
+
+    def __create_context(self, outline=None):
+        """
+        Creates the parse context of a single document. All the state of the parsing (the context stack, the buffers and the flags) lives in the context,
+        which is a parser of its own, so the parser the public methods are called on is never modified. A single parser can therefore be shared by any
+        number of threads, and several parse_stream() generators of the same parser can be consumed at the same time. The outline of the document is
+        collected into the @outline list, if given.
+        Returns a {@link Parser}
+        """
+        context = object.__new__(type(self))
+        context.__init()
+        context.outline = outline
+        return context
+
+    def __is_idle(self):
+        """
+        Checks whether the parser holds no state that could affect the parsing of the following lines.
+        Returns boolean.
+        """
+        return (len(self.context_stack.data) == 1 and len(self.token_buffer) == 0 and self.FLAG_IS_ESCAPED is False and self.link_buffer_stage == 0
+            and len(self.link_text_buffer) == 0 and len(self.link_address_buffer) == 0)
+
+    def __take_finished_structures(self):
+        """
+        Detaches the finished top-level structures from the super structure so that they are not referenced by the parser anymore.
+        Returns a list of {@link Structure}
+        """
+        structures = self.super_structure.content
+        self.super_structure.content = []
+        return structures
     
     def __parse_line(self, tokens):
+        self.line_index += 1
         open_scopes = self.__get_scope_hierarchy()
 
         if self.__is_line_empty(tokens):
@@ -159,36 +389,45 @@ class Parser:
         
         
         # We first need to check which scopes are no longer open (structures that have been closed) and eventually close them
-        # We also remove the prefixes of these scopes from the tokens
+        # We also skip the prefixes of these scopes in the tokens, the index points to the first token that is not a part of the prefixes
+        index = 0
+        self.consumed_indent = 0
         list_scopes_count = sum(1 for scope in open_scopes if scope is Structure.Scope.LIST) # Total number of open list scopes
         for i, scope in enumerate(open_scopes):
             HAS_NESTED_LISTS = False
             if scope is Structure.Scope.LIST:
                 HAS_NESTED_LISTS = list_scopes_count > 1
                 list_scopes_count -= 1
-            shifted_tokens = self.__shift_by_scope(tokens, scope, HAS_NESTED_LISTS)
+            shifted_index = self.__shift_by_scope(tokens, scope, HAS_NESTED_LISTS, index)
             
-            if shifted_tokens is False:
+            if shifted_index is False:
                 if HAS_NESTED_LISTS is True:
                     # Returning False when HAS_NESTED_LISTS is True signals us to close all upcomming scopes to avoid adding items to the wrong list
                     self.__finish_recursively(open_scopes[i+1:])
-                    tokens = self.__shift_by_scope(tokens, Structure.Scope.LIST) # We still need to remove the prefix, otherwise it starts a new list
+                    index = self.__shift_by_scope(tokens, Structure.Scope.LIST, False, index) # We still need to skip the prefix, otherwise it starts a new list
                 else:
                     self.__finish_recursively(open_scopes[i:])
                 break
             else:
-                tokens = shifted_tokens
+                index = shifted_index
+        # The spaces used by the prefixes are cut off the SPACE token only once, not once per scope
+        if self.consumed_indent != 0:
+            tokens[index].value = tokens[index].value[self.consumed_indent:]
+            self.consumed_indent = 0
         # Next we check the structures that occupy the entire line of tokens
-        if self.__is_hr_structure(tokens):
+        if self.__is_hr_structure(tokens, index):
             self.__open_structure(Structure.Type.HR)
             return
-        if (level := self.__is_setext_underline(tokens)) == -1:
+        if (level := self.__is_setext_underline(tokens, index)) == -1:
             self.setext_heading_buffer = tokens
         else:
             pass
         
         # Finally we parse what is left of the tokens to first open new block scopes and then parse the rest into inline sturctures
-        index = self.__open_recursively(tokens.copy())
+        index = self.__open_recursively(tokens, index)
+        if self.__is_definition_allowed() and self.__parse_definition(tokens, index):
+            self.FLAG_LAST_LINE_EMPTY = False
+            return
         self.__parse(tokens[index:])
         self.FLAG_LAST_LINE_EMPTY = False
             
@@ -253,7 +492,7 @@ class Parser:
                 if token.kind in Token.escapable_tokens:
                     # Only the first symbol in multicharacter tokens is escaped
                     if len(token.value) > 1:
-                       self.__push_to_buffer(Token(token.value[0]), token.kind)
+                       self.__push_to_buffer(Token(token.value[0], Token.Type.TEXT))
                        token.value = token.value[1:] 
                     else:
                         self.__push_to_buffer(token)
@@ -270,26 +509,40 @@ class Parser:
 
             match token.kind:
                 case Token.Type.ASTERISK | Token.Type.UNDERSCORE:
-                    if len(token.value) == 1:
-                        open_em = self.__get_open_structure(Structure.Type.EMPHASIS)                        
-                        if open_em is not None and (i != 0 and tokens[i-1].kind is not Token.Type.SPACE) and token == open_em.metadata[0]:
-                            self.__finish_structure(Structure.Type.EMPHASIS)
-                        elif i+1 != len(tokens) and tokens[i+1].kind is not Token.Type.SPACE:
-                            self.__open_structure(Structure.Type.EMPHASIS, scope, [token])
-                    elif len(token.value) == 2:
-                        open_st = self.__get_open_structure(Structure.Type.STRONG)
-                        if open_st is not None and (i != 0 and tokens[i-1].kind is not Token.Type.SPACE) and token == open_st.metadata[0]:
-                            self.__finish_structure(Structure.Type.STRONG)
-                        elif i+1 != len(tokens) and tokens[i+1].kind is not Token.Type.SPACE:
-                            self.__open_structure(Structure.Type.STRONG, scope, [token])
+                    # Whether the run actually opens or closes anything is only known once the whole inline content has been read
+                    self.__push_delimiter(token, tokens, i, scope)
                 case Token.Type.LBRACKET:
+                    # A label can not contain brackets, the bracket may start a link of its own though
+                    if self.link_buffer_stage == 3 and len(self.token_buffer) != self.link_label_index:
+                        self.__reset_link_metadata()
                     if self.link_buffer_stage == 0:
                         self.link_buffer_stage = 1
                         self.link_data_buffer_index = len(self.token_buffer)
                     self.__push_to_buffer(token)
                 case Token.Type.RBRACKET:
+                    following = tokens[i + 1].kind if i + 1 < len(tokens) else None
                     if self.link_buffer_stage == 1:
                         self.link_buffer_stage = 0
+                        # [text](address) is an inline link, [text][label] is a full reference and [label] alone is a shortcut reference
+                        if following is not Token.Type.LPAREN and self.__is_link_text_buffered():
+                            if following is Token.Type.LBRACKET:
+                                self.link_buffer_stage = 3
+                                self.link_label_index = len(self.token_buffer) + 1
+                            else:
+                                self.__push_to_buffer(token)
+                                self.__create_reference(self.token_buffer[self.link_data_buffer_index + 1:-1])
+                                continue
+                        elif following is not Token.Type.LPAREN:
+                            # The brackets do not make a link, so their text must not end up in the text of the next one
+                            self.__reset_link_metadata()
+                    elif self.link_buffer_stage == 3:
+                        self.__push_to_buffer(token)
+                        label = self.token_buffer[self.link_label_index + 1:-1]
+                        # [text][] is a collapsed reference, the text is the label
+                        if len(label) == 0:
+                            label = self.token_buffer[self.link_data_buffer_index + 1:self.link_label_index - 1]
+                        self.__create_reference(label)
+                        continue
                     self.__push_to_buffer(token)
                 case Token.Type.LPAREN:
                     if self.link_buffer_stage == 0 and len(self.link_text_buffer) != 0:
@@ -322,25 +575,26 @@ class Parser:
             self.__push_to_buffer(Token(" ", Token.Type.SPACE))
 
         
-    def __is_line_empty(self, tokens):
+    def __is_line_empty(self, tokens, start=0):
         """
-        Checks whether @tokens contains any other tokens than spaces.
+        Checks whether @tokens from the index @start on contain any other tokens than spaces.
         Returns boolean.
         """
-        for token in tokens:
-            if token.kind is not Token.Type.SPACE:
+        for i in range(start, len(tokens)):
+            if tokens[i].kind is not Token.Type.SPACE:
                 return False
         return True
         
-    def __is_hr_structure(self, tokens):
+    def __is_hr_structure(self, tokens, start=0):
         """
-        Checks whether @tokens represent a horizontal rule structure.
+        Checks whether @tokens from the index @start on represent a horizontal rule structure.
         Returns boolean.
         """
         # Three or more characters of the same type from DASHES, ASTERISKS and UNDERSCORES make a horizontal rule
         # These characters can not be mixed with any other, but may contain spaces in between them
         quantities = [0, 0, 0]
-        for token in tokens:
+        for i in range(start, len(tokens)):
+            token = tokens[i]
             match token.kind:
                 case Token.Type.SPACE:
                     continue
@@ -361,27 +615,200 @@ class Parser:
                 return True
         return False
     
-    def __is_setext_underline(self, tokens):
+    def __is_setext_underline(self, tokens, start=0):
         """
-        Looks through a list of @tokens and determines whether they represent a setext heading underline.
+        Looks through a list of @tokens from the index @start on and determines whether they represent a setext heading underline.
         Returns
                 a) 1 if it is a heading level 1 underline
                 b) 2 if it is a heading level 2 underline
                 c) -1 if it is not a setext heading underline
         """
-        if len(tokens) == 0:
+        if len(tokens) <= start:
             return -1
-        if tokens[0].kind is Token.Type.EQUALS:
+        if tokens[start].kind is Token.Type.EQUALS:
             heading_level = 1 
-        elif tokens[0].kind is Token.Type.DASH:
+        elif tokens[start].kind is Token.Type.DASH:
             heading_level = 2
         else:
             return -1
-        for token in tokens:
+        for i in range(start, len(tokens)):
+            token = tokens[i]
             if not ((heading_level == 1 and token.kind is Token.Type.EQUALS) or (heading_level == 2 and token.kind is Token.Type.DASH)):
                 return -1
         return heading_level
     
+    def __push_delimiter(self, token, tokens, i, scope):
+        """
+        Adds a run of asterisks or underscores (the @token at the index @i of @tokens) to the content of the current structure as a TEXT structure with
+        a {@link Delimiter}. The delimiters are turned into EMPHASIS and STRONG structures when the structure is finished (see __resolve_emphasis()).
+        """
+        if self.link_buffer_stage != 1:
+            self.__reset_link_metadata()
+        top_structure = self.context_stack.get_last()
+        if top_structure.kind is Structure.Type.TEXT:
+            self.__finish_current_structure()
+            top_structure = self.context_stack.get_last()
+        # The text before the run has to be saved first to preserve the order of the content
+        if len(self.token_buffer) > 0:
+            top_structure.content.append(Structure(self.__stringify_tokens(self.token_buffer), Structure.Type.TEXT, top_structure, scope))
+            self.__clear_buffer()
+        value = token.value
+        # Lines begin and end with whitespace as far as the delimiters are concerned
+        before = self.__get_token_character(tokens[i - 1], -1) if i > 0 else " "
+        after = self.__get_token_character(tokens[i + 1], 0) if i + 1 < len(tokens) else " "
+        left_flanking = not after.isspace() and (not self.__is_punctuation(after) or before.isspace() or self.__is_punctuation(before))
+        right_flanking = not before.isspace() and (not self.__is_punctuation(before) or after.isspace() or self.__is_punctuation(after))
+        if token.kind is Token.Type.ASTERISK:
+            can_open, can_close = left_flanking, right_flanking
+        else:
+            # Underscores inside of words do not open nor close anything
+            can_open = left_flanking and (not right_flanking or self.__is_punctuation(before))
+            can_close = right_flanking and (not left_flanking or self.__is_punctuation(after))
+        structure = Structure(value, Structure.Type.TEXT, top_structure, scope)
+        structure.delimiter = Delimiter(value[0], len(value), can_open, can_close)
+        top_structure.content.append(structure)
+        top_structure.has_delimiters = True
+
+    def __get_token_character(self, token, index):
+        """
+        Returns the character at @index of the text of @token.
+        """
+        if len(token.value) != 0:
+            return token.value[index]
+        return self.token_characters.get(token.kind, " ")
+
+    def __is_punctuation(self, character):
+        """
+        Checks whether @character is a punctuation character or a symbol.
+        Returns boolean.
+        """
+        return unicodedata.category(character)[0] in "PS"
+
+    def __resolve_emphasis(self, structure):
+        """
+        Replaces the delimiters in the content of @structure with the EMPHASIS and STRONG structures they form. The delimiters that do not form any
+        structure become a part of the text. Every inline content (the content between two block-level structures) is resolved separately.
+        """
+        content = []
+        start = 0
+        for i in range(len(structure.content) + 1):
+            if i < len(structure.content) and structure.content[i].kind in self.inline_types:
+                continue
+            if start < i:
+                content += self.__build_emphasis(structure.content[start:i], structure)
+            if i < len(structure.content):
+                content.append(structure.content[i])
+            start = i + 1
+        structure.content = content
+        del structure.has_delimiters
+
+    def __match_delimiters(self, delimiters):
+        """
+        Pairs the openers and closers in the list of @delimiters, in the way CommonMark processes emphasis. Each closer is matched with the nearest
+        preceding opener of the same character, the delimiters in between them are not matched anymore. The lower bound of the search for an opener is
+        remembered for every kind of closer, so the delimiters are matched in linear time. The results are stored in the opens and closes lists of the
+        delimiters.
+        """
+        for i, delimiter in enumerate(delimiters):
+            delimiter.position = i
+            delimiter.previous = delimiters[i - 1] if i > 0 else None
+            delimiter.next = delimiters[i + 1] if i + 1 < len(delimiters) else None
+        openers_bottom = {} # Maps a kind of closer to the position below which no opener can be found
+        closer = delimiters[0] if len(delimiters) != 0 else None
+        while closer is not None:
+            if not closer.can_close:
+                closer = closer.next
+                continue
+            key = (closer.character, closer.can_open, closer.original_length % 3)
+            bottom = openers_bottom.get(key, -1)
+            opener = closer.previous
+            while opener is not None and opener.position > bottom:
+                if opener.character == closer.character and opener.can_open:
+                    # A delimiter that can both open and close does not match if the lengths sum up to a multiple of three (unless both are such)
+                    both = opener.can_close or closer.can_open
+                    if not (both and (opener.original_length + closer.original_length) % 3 == 0
+                            and not (opener.original_length % 3 == 0 and closer.original_length % 3 == 0)):
+                        break
+                opener = opener.previous
+            if opener is None or opener.position <= bottom:
+                openers_bottom[key] = closer.position - 1
+                following = closer.next
+                if not closer.can_open:
+                    self.__remove_delimiter(closer)
+                closer = following
+                continue
+            used = 2 if opener.length >= 2 and closer.length >= 2 else 1
+            kind = Structure.Type.STRONG if used == 2 else Structure.Type.EMPHASIS
+            opener.length -= used
+            closer.length -= used
+            opener.opens.append(kind)
+            closer.closes.append(kind)
+            # The delimiters in between can not be matched anymore
+            opener.next = closer
+            closer.previous = opener
+            if opener.length == 0:
+                self.__remove_delimiter(opener)
+            if closer.length == 0:
+                following = closer.next
+                self.__remove_delimiter(closer)
+                closer = following
+
+    def __remove_delimiter(self, delimiter):
+        """
+        Unlinks @delimiter from the list of delimiters.
+        """
+        if delimiter.previous is not None:
+            delimiter.previous.next = delimiter.next
+        if delimiter.next is not None:
+            delimiter.next.previous = delimiter.previous
+
+    def __build_emphasis(self, content, parent):
+        """
+        Matches the delimiters in an inline @content of the structure @parent and builds the EMPHASIS and STRONG structures in a single pass over the
+        content. Adjacent text is merged into a single TEXT structure.
+        Returns a list of {@link Structure}
+        """
+        delimiters = [structure.delimiter for structure in content if hasattr(structure, "delimiter")]
+        if len(delimiters) == 0:
+            return content
+        self.__match_delimiters(delimiters)
+        result = []
+        stack = [parent] # The structures that are open in the content
+        target = result
+        text = []
+        for structure in content:
+            if structure.kind is Structure.Type.TEXT:
+                if not hasattr(structure, "delimiter"):
+                    text.append(structure.content)
+                    continue
+            else:
+                if len(text) != 0:
+                    target.append(Structure("".join(text), Structure.Type.TEXT, stack[-1], structure.scope))
+                    text.clear()
+                structure.parent = stack[-1]
+                target.append(structure)
+                continue
+            delimiter = structure.delimiter
+            for kind in delimiter.closes:
+                if len(text) != 0:
+                    target.append(Structure("".join(text), Structure.Type.TEXT, stack[-1], structure.scope))
+                    text.clear()
+                stack.pop()
+                target = stack[-1].content if len(stack) > 1 else result
+            if delimiter.length != 0:
+                text.append(delimiter.character * delimiter.length)
+            for kind in reversed(delimiter.opens):
+                if len(text) != 0:
+                    target.append(Structure("".join(text), Structure.Type.TEXT, stack[-1], structure.scope))
+                    text.clear()
+                emphasis = Structure([], kind, stack[-1], structure.scope)
+                target.append(emphasis)
+                stack.append(emphasis)
+                target = emphasis.content
+        if len(text) != 0:
+            target.append(Structure("".join(text), Structure.Type.TEXT, stack[-1], parent.scope))
+        return result
+
     def __push_to_buffer(self, token):
         """
         Adds @token to the inner token buffer.
@@ -400,9 +827,10 @@ class Parser:
     
     def __push_to_link_buffer(self, token):
         """
-        Adds @token to the corresponding buffer for link-parsing data based upod the current link_buffer_stage. If the stage is 0, the token is discarded.
+        Adds @token to the corresponding buffer for link-parsing data based upod the current link_buffer_stage. If the stage is 0 or 3, the token is discarded
+        (the label of a reference is taken from the token_buffer).
         """
-        if self.link_buffer_stage == 0:
+        if self.link_buffer_stage == 0 or self.link_buffer_stage == 3:
             return
         if self.link_buffer_stage == 1:
             buffer = self.link_text_buffer
@@ -421,6 +849,7 @@ class Parser:
         self.link_address_buffer = []
         self.link_title_buffer = []
         self.link_data_buffer_index = -1
+        self.link_label_index = -1
         self.link_buffer_stage = 0
 
     def __create_link(self):
@@ -434,6 +863,151 @@ class Parser:
         self.__finish_current_structure() # This should save the token_buffer as a TEXT structure inside the LINK structure we opened
         self.__reset_link_metadata()
 
+    def __is_link_text_buffered(self):
+        """
+        Checks whether the tokens of the text of a link, from the opening bracket on, are all still in the token_buffer. They are not when something
+        (such as a delimiter run) has saved the buffer into a structure in the meantime.
+        Returns boolean.
+        """
+        index = self.link_data_buffer_index
+        return 0 <= index < len(self.token_buffer) and self.token_buffer[index].kind is Token.Type.LBRACKET and len(self.link_text_buffer) != 0
+
+    def __normalize_label(self, label):
+        """
+        Brings the @label to the form in which labels are compared: case-insensitive and with any whitespace collapsed to a single space.
+        Returns a string.
+        """
+        return " ".join(label.split()).casefold()
+
+    def __create_reference(self, label_tokens):
+        """
+        Creates a LINK structure from the link text in the token_buffer, whose address is given by the link reference definition of the label in
+        @label_tokens. When the label is not defined yet, the LINK is remembered in pending_references and the definition fills it in once it is
+        parsed. The text the reference was written as is kept in the metadata of the LINK, so that a reference that is never defined can be turned back
+        into text (see __drop_pending_references()).
+        """
+        label = self.__normalize_label(self.__stringify_tokens(label_tokens))
+        if len(label) == 0:
+            self.__reset_link_metadata()
+            return
+        literal = self.__stringify_tokens(self.token_buffer[self.link_data_buffer_index:])
+        self.token_buffer = self.token_buffer[:self.link_data_buffer_index]
+        self.__open_structure(Structure.Type.LINK, metadata=[literal])
+        link = self.context_stack.get_last()
+        if label in self.labels:
+            self.__set_link_destination(link, *self.labels[label])
+        else:
+            link.address = None
+            self.pending_references.setdefault(label, []).append(link)
+        self.__push_to_buffer(self.link_text_buffer)
+        self.__finish_current_structure()
+        self.__reset_link_metadata()
+
+    def __set_link_destination(self, link, address, title):
+        """
+        Sets the @address and the @title (which may be None) of the @link.
+        """
+        link.address = address
+        if title is not None:
+            link.title = title
+
+    def __drop_pending_references(self):
+        """
+        Turns the references to labels that have not been defined back into the text they were written as and merges the text with the adjacent TEXT
+        structures, which gives the same structures as if the reference was never recognized. Called at the end of the document.
+        """
+        dropped = set()
+        parents = {}
+        for links in self.pending_references.values():
+            for link in links:
+                link.kind = Structure.Type.TEXT
+                link.content = link.metadata[0]
+                del link.address
+                dropped.add(id(link))
+                parents[id(link.parent)] = link.parent
+        self.pending_references.clear()
+        for parent in parents.values():
+            content = []
+            for structure in parent.content:
+                if (structure.kind is Structure.Type.TEXT and len(content) != 0 and content[-1].kind is Structure.Type.TEXT
+                        and (id(structure) in dropped or id(content[-1]) in dropped)):
+                    content[-1].content += structure.content
+                    dropped.add(id(content[-1]))
+                else:
+                    content.append(structure)
+            parent.content = content
+
+    def __is_definition_allowed(self):
+        """
+        Checks whether a link reference definition may start on the current line, that is at the start of a paragraph, a blockquote or a list item.
+        A definition can not interrupt a paragraph.
+        Returns boolean.
+        """
+        if len(self.token_buffer) != 0 or self.FLAG_IS_ESCAPED is True or self.link_buffer_stage != 0:
+            return False
+        structure = self.context_stack.get_last()
+        if structure.kind is Structure.Type.PARAGRAPH:
+            return len(structure.content) == 0
+        if structure.kind is Structure.Type.BLOCKQUOTE or structure.kind is Structure.Type.LIST_ITEM:
+            return len(structure.content) == 0 or structure.content[-1].kind not in self.inline_types
+        return False
+
+    def __parse_definition(self, tokens, index):
+        """
+        Parses a link reference definition ([label]: address "title") from the @tokens starting at the index @index. The title is optional and it may
+        be enclosed in double quotes, single quotes or parentheses. The first definition of a label is used, the address and title are filled into
+        the references that have been waiting for the label. The empty PARAGRAPH opened for the line is removed.
+        Returns boolean, whether the tokens are a definition.
+        """
+        i = index
+        if i < len(tokens) and tokens[i].kind is Token.Type.SPACE and len(tokens[i].value) <= 3:
+            i += 1
+        if i >= len(tokens) or tokens[i].kind is not Token.Type.LBRACKET:
+            return False
+        end = i + 1
+        while end < len(tokens) and tokens[end].kind is not Token.Type.RBRACKET:
+            if tokens[end].kind in [Token.Type.LBRACKET, Token.Type.BACKSLASH]:
+                return False
+            end += 1
+        if end + 1 >= len(tokens) or tokens[end + 1].kind is not Token.Type.COLON:
+            return False
+        label = self.__normalize_label(self.__stringify_tokens(tokens[i + 1:end]))
+        i = end + 2
+        if i < len(tokens) and tokens[i].kind is Token.Type.SPACE:
+            i += 1
+        start = i
+        # The address may be enclosed in angle brackets, then it may contain spaces
+        if i < len(tokens) and tokens[i].kind is Token.Type.LT:
+            while i < len(tokens) and tokens[i].kind is not Token.Type.GT:
+                i += 1
+            if i == len(tokens):
+                return False
+            address = self.__stringify_tokens(tokens[start + 1:i])
+            i += 1
+        else:
+            while i < len(tokens) and tokens[i].kind is not Token.Type.SPACE:
+                i += 1
+            address = self.__stringify_tokens(tokens[start:i])
+        if len(label) == 0 or start == i:
+            return False
+        rest = tokens[i + 1:] if i < len(tokens) else []
+        while len(rest) != 0 and rest[-1].kind is Token.Type.SPACE:
+            rest = rest[:-1]
+        title = None
+        if len(rest) != 0:
+            closing = {Token.Type.DOUBLE_QUOTES: Token.Type.DOUBLE_QUOTES, Token.Type.SINGLE_QUOTES: Token.Type.SINGLE_QUOTES,
+                Token.Type.LPAREN: Token.Type.RPAREN}.get(rest[0].kind)
+            if len(rest) < 2 or closing is None or rest[-1].kind is not closing:
+                return False
+            title = self.__stringify_tokens(rest[1:-1])
+        if self.context_stack.get_last().kind is Structure.Type.PARAGRAPH:
+            self.context_stack.poll()
+        if label not in self.labels:
+            self.labels[label] = (address, title)
+            for link in self.pending_references.pop(label, []):
+                self.__set_link_destination(link, address, title)
+        return True
+
     def __wrap_top_text_in_paragraph(self):
         # TODO:
         structure = self.context_stack.get_last()
@@ -453,7 +1027,7 @@ class Parser:
         self.__open_structure(Structure.Type.TEXT)
         pass
 
-    def __open_structure(self, kind, scope=None, metadata=[]):
+    def __open_structure(self, kind, scope=None, metadata=None):
         """
         Pushes a structure of specific type (@kind) and @scope with empty content to the context stack.
         """
@@ -491,57 +1065,57 @@ class Parser:
         else:
             self.context_stack.push(Structure([], kind, top_structure, scope, metadata))
         
-    def __open_recursively(self, tokens):
+    def __open_recursively(self, tokens, index=0):
         """
-        Goes through @tokens from the left and when possible, opens a block-level structure on the stack. The function destroys the list @tokens, 
-        make sure you pass a copy of the actual data! When there are no more block-level structures to open, the function returns the number of 
-        tokens it has parsed. This number can used as an index in the original data list.
+        Goes through @tokens from the index @index on and when possible, opens a block-level structure on the stack. When there are no more block-level
+        structures to open, the function returns the index of the first token it has not parsed. The list @tokens is not altered, although the value of
+        a SPACE token that is only partially used as a codeblock prefix is shortened.
         Returns integer.
         """
-        scope = self.__get_current_scope()
-        if scope in [Structure.Scope.PARAGRAPH, Structure.Scope.CODEBLOCK, Structure.Scope.CODE]:
-            return 0 # There can be no other block-level structures in these scopes
+        while True:
+            scope = self.__get_current_scope()
+            if scope in [Structure.Scope.PARAGRAPH, Structure.Scope.CODEBLOCK, Structure.Scope.CODE]:
+                return index # There can be no other block-level structures in these scopes
+            remaining = len(tokens) - index
+            if remaining <= 2:
+                break
+            first = tokens[index]
+            second = tokens[index + 1]
+
+            if first.kind is Token.Type.GT and second.kind is Token.Type.SPACE:
+                self.__open_structure(Structure.Type.BLOCKQUOTE, scope)
+                index += 2
+                continue
             
-        if len(tokens) > 2 and tokens[0].kind is Token.Type.GT and tokens[1].kind is Token.Type.SPACE:
-            self.__open_structure(Structure.Type.BLOCKQUOTE, scope)
-            return self.__open_recursively(tokens[2:]) + 2
-        
-        if len(tokens) > 2:
-            if tokens[0].kind is Token.Type.SPACE and len(tokens[0].value) >= 4:
+            if first.kind is Token.Type.SPACE and first.get_length() >= 4:
                 self.__open_structure(Structure.Type.CODEBLOCK, scope)
                 # The actual code will be stored in a text structure
                 self.__open_structure(Structure.Type.TEXT, Structure.Scope.CODEBLOCK)
-                if len(tokens[0].value) == 4:
-                    return self.__open_recursively(tokens[1:]) + 1
+                if first.get_length() == 4:
+                    index += 1
                 else:
-                    tokens[0].value = tokens[0].value[4:]
-                    return self.__open_recursively(tokens) + 0
-
-        # Because ASTERISK tokens can represent multiple asterisks, we have to filter out the single character one
-        if len(tokens) > 2 and (tokens[0].kind in [Token.Type.DASH, Token.Type.PLUS] or tokens[0].value == "*") and tokens[1].kind is Token.Type.SPACE:
-            self.__open_structure(Structure.Type.UNORDERED_LIST, scope, [tokens[0]])
-            return self.__open_recursively(tokens[2:]) + 2
-               
-        if len(tokens) > 3 and tokens[0].kind is Token.Type.NUMBER and tokens[1].kind is Token.Type.PERIOD and tokens[2].kind is Token.Type.SPACE:
-            self.__open_structure(Structure.Type.ORDERED_LIST, scope, [tokens[0]])
-            return self.__open_recursively(tokens[3:]) + 3
-
-        # To enable lists embedded in other lists, the inner lists are padded by a space
-        if len(tokens) > 2 and (tokens[0].kind in [Token.Type.DASH, Token.Type.PLUS] or tokens[0].value == "*") and tokens[1].kind is Token.Type.SPACE:
-            self.__open_structure(Structure.Type.UNORDERED_LIST, scope, [tokens[0]])
-            return self.__open_recursively(tokens[2:]) + 2
-               
-        if len(tokens) > 3 and tokens[0].kind is Token.Type.NUMBER and tokens[1].kind is Token.Type.PERIOD and tokens[2].kind is Token.Type.SPACE:
-            self.__open_structure(Structure.Type.ORDERED_LIST, scope, [tokens[0]])
-            return self.__open_recursively(tokens[3:]) + 3
-
-        if len(tokens) > 2 and tokens[0].kind is Token.Type.HASH and tokens[1].kind is Token.Type.SPACE:
-            self.__open_structure(Structure.Type[f"HEADING_{len(tokens[0].value)}"], scope, [tokens[0]])
-            return 2
+                    first.value = first.value[4:]
+                continue
+
+            # Because ASTERISK tokens can represent multiple asterisks, we have to filter out the single character one
+            if (first.kind in [Token.Type.DASH, Token.Type.PLUS] or first.value == "*") and second.kind is Token.Type.SPACE:
+                self.__open_structure(Structure.Type.UNORDERED_LIST, scope, [first])
+                index += 2
+                continue
+                   
+            if remaining > 3 and first.kind is Token.Type.NUMBER and second.kind is Token.Type.PERIOD and tokens[index + 2].kind is Token.Type.SPACE:
+                self.__open_structure(Structure.Type.ORDERED_LIST, scope, [first])
+                index += 3
+                continue
+
+            if first.kind is Token.Type.HASH and second.kind is Token.Type.SPACE:
+                self.__open_structure(Structure.Type[f"HEADING_{len(first.value)}"], scope, [first])
+                return index + 2
+            break
                     
         if scope is None:
             self.__open_structure(Structure.Type.PARAGRAPH, scope)
-        return 0
+        return index
 
     def __finish_current_structure(self):
         """
@@ -552,7 +1126,9 @@ class Parser:
         if self.context_stack.get_last().kind is Structure.Type.SUPER:
             return
         # Finishing a structure usually means changing scope, so we need to reset the metadata gathered for links
-        if self.context_stack.get_last().kind not in [Structure.Type.TEXT, Structure.Type.LINK] and self.link_buffer_stage != 1:
+        # A link can not span more than a single inline content, even when its closing bracket is still missing
+        kind = self.context_stack.get_last().kind
+        if kind not in self.inline_types or (kind not in [Structure.Type.TEXT, Structure.Type.LINK] and self.link_buffer_stage != 1):
             self.__reset_link_metadata()
         if len(self.token_buffer) > 0:
             # If the structure already is TEXT, we simply append the buffer to the text in the structure
@@ -562,7 +1138,29 @@ class Parser:
                 text_structure = Structure(self.__stringify_tokens(self.token_buffer), Structure.Type.TEXT, self.__get_current_scope())
                 self.context_stack.get_last().content.append(text_structure)
             self.__clear_buffer()
-        self.context_stack.get_last().parent.content.append(self.context_stack.poll())
+        structure = self.context_stack.poll()
+        if hasattr(structure, "has_delimiters"):
+            self.__resolve_emphasis(structure)
+        structure.parent.content.append(structure)
+        if self.outline is not None and structure.kind in self.heading_levels:
+            self.__add_to_outline(structure)
+
+    def __add_to_outline(self, heading):
+        """
+        Appends the finished @heading to the outline and sets its address to a slug of its text. A slug that some previous heading already has gets the
+        lowest number that makes it unique appended, e.g. "usage-1".
+        """
+        text = get_text(heading)
+        slug = slugify(text) or "section"
+        number = self.slugs.get(slug, 0)
+        anchor = slug
+        while anchor in self.slugs:
+            number += 1
+            anchor = f"{slug}-{number}"
+        self.slugs[slug] = number
+        self.slugs.setdefault(anchor, 0)
+        heading.address = anchor
+        self.outline.append(OutlineEntry(self.heading_levels[heading.kind], text, anchor, self.line_index))
         
     def __finish_structure(self, kind):
         """
@@ -578,19 +1176,16 @@ class Parser:
         Closes all structures on the context stack that belong to the scopes in the @scopes list. The scopes are closed in the same order as they are in the list.
         Empties the @scopes list.
         """
-        if len(scopes) == 0:
-            return
-        scope = scopes[0]
-        structure = self.context_stack.get_last()
-        while structure.scope is scope:
-            if self.__finish_recursively__is_false_positive(structure, scope):
-                break
-            self.__finish_current_structure()
+        for scope in scopes:
             structure = self.context_stack.get_last()
-        # The scope-opening structure actually does not itself belong to the scope (unless false-positive) so we need to close one more structure to the top
-        self.__finish_current_structure()
-        scopes.pop(0)
-        self.__finish_recursively(scopes)
+            while structure.scope is scope:
+                if self.__finish_recursively__is_false_positive(structure, scope):
+                    break
+                self.__finish_current_structure()
+                structure = self.context_stack.get_last()
+            # The scope-opening structure actually does not itself belong to the scope (unless false-positive) so we need to close one more structure to the top
+            self.__finish_current_structure()
+        scopes.clear()
         
     def __finish_recursively__is_false_positive(self, structure, scope):
         """
@@ -617,48 +1212,22 @@ class Parser:
         Determines the scope for the next-to-be-opened structure. This scope may differ from the scope of its parent structure.
         Returns {@link Structure.Type}.
         """
-        match self.context_stack.get_last().kind:
-            case Structure.Type.BLOCKQUOTE:
-                return Structure.Scope.BLOCKQUOTE
-            case Structure.Type.CODEBLOCK:
-                return Structure.Scope.CODEBLOCK
-            case Structure.Type.CODE:
-                return Structure.Scope.CODE
-            case Structure.Type.HTML:
-                return Structure.Scope.HTML
-            case Structure.Type.PARAGRAPH:
-                return Structure.Scope.PARAGRAPH
-            case Structure.Type.ORDERED_LIST:
-                return Structure.Scope.LIST
-            case Structure.Type.UNORDERED_LIST:
-                return Structure.Scope.LIST
-            case _:
-                if str(self.context_stack.get_last().kind).startswith("HEADING"):
-                    return Structure.Scope.HEADING
-                return self.context_stack.get_last().scope
+        structure = self.context_stack.get_last()
+        scope = self.opened_scopes.get(structure.kind)
+        if scope is None:
+            return structure.scope
+        return scope
     
     def __get_scope_hierarchy(self):
         """
-        Traverses the context stack and generates a list of the open scopes from bottom to the top.
+        Generates a list of the open scopes from bottom to the top. The scopes are tracked by the context stack as the structures are opened and finished.
         Returns a list.
         """
-        scope_structures = [Structure.Type.BLOCKQUOTE, Structure.Type.CODEBLOCK, Structure.Type.CODE, Structure.Type.PARAGRAPH, Structure.Type.ORDERED_LIST,
-            Structure.Type.UNORDERED_LIST]
-        scopes = []
-        structure = self.context_stack.get_last()
+        scopes = self.context_stack.scopes.copy()
         # Add current scope only if it is not inherited (avoid adding the same scope twice)
-        if (current := self.__get_current_scope()) is not None and  self.__finish_recursively__is_false_positive(structure, current):
+        if (current := self.__get_current_scope()) is not None and self.__finish_recursively__is_false_positive(self.context_stack.get_last(), current):
             scopes.append(current)
-        
-        while structure is not None:
-            if structure.scope is None:
-                break
-            if structure.parent is None:
-                break
-            if structure.parent.kind in scope_structures or str(structure.parent.kind).startswith("HEADING"):
-                scopes.append(structure.scope)
-            structure = structure.parent
-        return list(reversed(scopes))
+        return scopes
 
     def __get_open_structure(self, kind):
         """
@@ -667,14 +1236,10 @@ class Parser:
                 a) a {@link Structure}
                 b) None if no such structure is open.
         """
-        structure = self.context_stack.get_last()
-        while structure is not None:
-            if structure.kind is kind:
-                return structure
-            if structure.parent is None:
-                break
-            structure = structure.parent
-        return None
+        structures = self.context_stack.open_structures.get(kind)
+        if not structures:
+            return None
+        return structures[-1]
 
     def __rstrip_tokens(self, tokens):
         """
@@ -688,53 +1253,58 @@ class Parser:
             tokens.pop()
         return diff
             
-    def __shift_by_scope(self, tokens, scope, HAS_NESTED_LISTS=False):
+    def __shift_by_scope(self, tokens, scope, HAS_NESTED_LISTS=False, index=0):
         """
-        Removes the appropriate opening tokens for the given @scope from @tokens. Only block-level scopes are removed. The list @tokens is not altered.
+        Skips the appropriate opening tokens for the given @scope in @tokens, starting at the index @index. Only block-level scopes have opening tokens.
+        The list @tokens is not altered. When a SPACE token is only partially used as a prefix, the used spaces are added to consumed_indent instead of
+        being cut off the token, the caller cuts them off once all the prefixes are skipped.
         Returns
-                a) a list of tokens without the scope prefix
+                a) the index of the first token after the scope prefix
                 b) False if the shift failed
         """
+        remaining = len(tokens) - index
         match scope:
             case Structure.Scope.BLOCKQUOTE:
-                if len(tokens) > 2 and tokens[0].kind is Token.Type.GT and tokens[1].kind is Token.Type.SPACE:
-                    return tokens[2:]
+                if remaining > 2 and tokens[index].kind is Token.Type.GT and tokens[index + 1].kind is Token.Type.SPACE:
+                    return index + 2
                 # Enable lazy BLOCKQUOTE markup
-                if not self.__is_line_empty(tokens):
-                    return tokens
+                if not self.__is_line_empty(tokens, index):
+                    return index
             case Structure.Scope.CODEBLOCK:
-                if len(tokens) >= 2:
-                    if tokens[0].kind is Token.Type.SPACE and len(tokens[0].value) >= 4:
-                        if len(tokens[0].value) == 4:
-                            return tokens[1:]
+                if remaining >= 2:
+                    if tokens[index].kind is Token.Type.SPACE and tokens[index].get_length() - self.consumed_indent >= 4:
+                        if tokens[index].get_length() - self.consumed_indent == 4:
+                            self.consumed_indent = 0
+                            return index + 1
                         else:
-                            tokens[0].value = tokens[0].value[4:]
-                            return tokens
+                            self.consumed_indent += 4
+                            return index
             case Structure.Scope.LIST:
-                if len(tokens) > 2 and (tokens[0].kind in [Token.Type.DASH, Token.Type.PLUS] or tokens[0].value == "*") and tokens[1].kind is Token.Type.SPACE:
+                if remaining > 2 and (tokens[index].kind in [Token.Type.DASH, Token.Type.PLUS] or tokens[index].value == "*") and tokens[index + 1].kind is Token.Type.SPACE:
                     if HAS_NESTED_LISTS is True:
                         return False
                     self.__finish_structure(Structure.Type.LIST_ITEM)
                     self.__open_structure(Structure.Type.LIST_ITEM)
-                    return tokens[2:] # Unoredered list
+                    return index + 2 # Unoredered list
                 
-                if len(tokens) > 3 and tokens[0].kind is Token.Type.NUMBER and tokens[1].kind is Token.Type.PERIOD and tokens[2].kind is Token.Type.SPACE:
+                if remaining > 3 and tokens[index].kind is Token.Type.NUMBER and tokens[index + 1].kind is Token.Type.PERIOD and tokens[index + 2].kind is Token.Type.SPACE:
                     if HAS_NESTED_LISTS is True:
                         return False
                     self.__finish_structure(Structure.Type.LIST_ITEM)
                     self.__open_structure(Structure.Type.LIST_ITEM)
-                    return tokens[3:] # Ordered list
+                    return index + 3 # Ordered list
                 # Enable multi-line list items
-                if not self.__is_line_empty(tokens):
+                if not self.__is_line_empty(tokens, index):
                     # We all a double-space prefix to qualify as continuation of the LIST_ITEM to allow lists inside list items
-                    if len(tokens) >= 2 and tokens[0].kind is Token.Type.SPACE and len(tokens[0].value) >= 2:
-                        if len(tokens[0].value) == 2:
-                            return tokens[1:]
+                    if remaining >= 2 and tokens[index].kind is Token.Type.SPACE and tokens[index].get_length() - self.consumed_indent >= 2:
+                        if tokens[index].get_length() - self.consumed_indent == 2:
+                            self.consumed_indent = 0
+                            return index + 1
                         else:
-                            tokens[0].value = tokens[0].value[2:]
-                            return tokens
+                            self.consumed_indent += 2
+                            return index
                     else:
-                        return tokens # If the line is just regular paragraph of text or something, we let it pass
+                        return index # If the line is just regular paragraph of text or something, we let it pass
                # empty = self.__is_line_empty(tokens)
                # if self.FLAG_LAST_LINE_EMPTY is True and len(tokens) > 2 and tokens[0].kind is Token.Type.SPACE and not empty:
                    # self.__wrap_top_text_in_paragraph()
@@ -743,9 +1313,9 @@ class Parser:
                     #self.__wrap_top_text_in_paragraph()
                     #return tokens # Allow multiline list items
             case Structure.Scope.CODE:
-                return tokens # CODE is not a block level scope
+                return index # CODE is not a block level scope
             case Structure.Scope.PARAGRAPH:
-                return tokens # PARAGRAPH has no special opening
+                return index # PARAGRAPH has no special opening
         return False
     
     def __stringify_tokens(self, tokens):
@@ -755,65 +1325,92 @@ class Parser:
         order the tokens were added to the list. The line positions of the tokens are not given any notice, same for line numbers.
         Returns a string.
         """
-        string = ""
+        pieces = [] # The string is joined only once at the end
+        # Consecutive SpanTokens are sliced out of their source at once instead of one by one. The tokens in between two spans from the same source
+        # are bridged over as well, as long as their text is exactly what separates the spans in the source.
+        source, start, end = None, 0, 0
+        gap = [] # The text of the tokens that came after the current span
+        gap_length = 0
         for token in tokens:
+            if type(token) is SpanToken:
+                if token.source is source and token.start - end == gap_length and (gap_length == 0 or source[end:token.start] == "".join(gap)):
+                    end = token.end
+                    gap.clear()
+                    gap_length = 0
+                    continue
+                if source is not None:
+                    pieces.append(source[start:end])
+                    pieces += gap
+                source, start, end = token.source, token.start, token.end
+                gap.clear()
+                gap_length = 0
+                continue
+            text = ""
             match token.kind:
                 case Token.Type.TEXT:
-                    string += token.value
+                    text = token.value
                 case Token.Type.SPACE:
-                    string += token.value
+                    text = token.value
                 case Token.Type.TAB:
-                    string += " " * 4
+                    text = " " * 4
                 case Token.Type.EOL:
-                    string += "\n"
+                    text = "\n"
                 case Token.Type.BACKSLASH:
-                    string += "\\"
+                    text = "\\"
                 case Token.Type.HASH:
-                    string += token.value
+                    text = token.value
                 case Token.Type.GT:
-                    string += ">"
+                    text = ">"
                 case Token.Type.LT:
-                    string += "<"
+                    text = "<"
                 case Token.Type.NUMBER:
-                    string += token.value
+                    text = token.value
                 case Token.Type.EXCLAMATION_MARK:
-                    string += "!"
+                    text = "!"
                 case Token.Type.DASH:
-                    string += "-"
+                    text = "-"
                 case Token.Type.ASTERISK:
-                    string += token.value
+                    text = token.value
                 case Token.Type.UNDERSCORE:
-                    string += token.value
+                    text = token.value
                 case Token.Type.PLUS:
-                    string += "+"
+                    text = "+"
                 case Token.Type.TILDE:
-                    string += "~"
+                    text = "~"
                 case Token.Type.EQUALS:
-                    string += "="
+                    text = "="
                 case Token.Type.LPAREN:
-                    string += "("
+                    text = "("
                 case Token.Type.RPAREN:
-                    string += ")"
+                    text = ")"
                 case Token.Type.LBRACKET:
-                    string += "["
+                    text = "["
                 case Token.Type.RBRACKET:
-                    string += "]"
+                    text = "]"
                 case Token.Type.LBRACE:
-                    string += "{"
+                    text = "{"
                 case Token.Type.RBRACE:
-                    string += "}"
+                    text = "}"
                 case Token.Type.DOUBLE_QUOTES:
-                    string += "\""
+                    text = "\""
                 case Token.Type.SINGLE_QUOTES:
-                    string += "'"
+                    text = "'"
                 case Token.Type.COLON:
-                    string += ":"
+                    text = ":"
                 case Token.Type.BACKTICK:
-                    string += token.value
+                    text = token.value
                 case Token.Type.PERIOD:
-                    string += "."
+                    text = "."
                 case Token.Type.SEMICOLON:
-                    string += ";"
-        return string
+                    text = ";"
+            if source is not None:
+                gap.append(text)
+                gap_length += len(text)
+            else:
+                pieces.append(text)
+        if source is not None:
+            pieces.append(source[start:end])
+            pieces += gap
+        return "".join(pieces)
     
     
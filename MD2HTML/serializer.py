@@ -0,0 +1,160 @@
+import sys
+import struct
+from array import array
+from arena import StructureArena
+"""
+A binary format for parsed documents, so that a document that is rendered many times only has to be parsed once. The format is the memory layout of a
+{@link StructureArena}: a header followed by the arrays of the arena, the links and the text. Loading it only copies the arrays, which is much faster than
+parsing the document again.
+
+Example usage:
+
+    with open("docs.ast", "wb") as file:
+        serializer.dump(parser.parse_stream(tokenizer.tokenize(text)), file)
+    with open("docs.ast", "rb") as file:
+        html = translator.translate(serializer.load(file))
+
+The data can as well be memory-mapped and passed to loads():
+
+    with open("docs.ast", "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        arena = serializer.loads(data)
+
+Layout (all numbers are little-endian):
+
+    magic "MD2HAST\\0", version (uint32), number of structures, number of roots, number of links, length of the text in bytes (uint64 each)
+    kinds (uint8), scopes (int8), parents, first children, next siblings, text offsets, text lengths, roots (int64 each)
+    for each link (and heading with an anchor): the number of the structure (int64), flags (uint8, 1 = has address, 2 = has title), address and title as length-prefixed UTF-8
+    the text of all TEXT structures as UTF-8
+"""
+
+magic = b"MD2HAST\0"
+# Increase when the layout or the meaning of the stored codes changes, files of other versions are rejected
+version = 1
+
+header = struct.Struct("<8sIQQQQ")
+link_header = struct.Struct("<qB")
+length = struct.Struct("<Q")
+
+class FormatError(ValueError):
+    """
+    Raised when the data is not a serialized document of a supported version.
+    """
+    pass
+
+def dumps(structures):
+    """
+    Serializes @structures, which is either a {@link StructureArena} or an iterable of top-level structures such as the result of Parser#parse() or
+    Parser#parse_stream().
+    Returns a bytes object.
+    """
+    arena = structures if isinstance(structures, StructureArena) else StructureArena(structures)
+    text = arena.text.encode("utf-8")
+    # The text spans of the arena count characters, in the file they count bytes. The texts are stored in the order of the structures, so the byte
+    # offsets are the running sum of the byte lengths.
+    text_offsets, text_lengths = arena.text_offsets, arena.text_lengths
+    if len(text) != len(arena.text):
+        text_offsets, text_lengths = array("q"), array("q")
+        offset = 0
+        for i in range(len(arena)):
+            if arena.text_lengths[i] <= 0:
+                text_offsets.append(0)
+                text_lengths.append(arena.text_lengths[i])
+                continue
+            start = arena.text_offsets[i]
+            size = len(arena.text[start:start + arena.text_lengths[i]].encode("utf-8"))
+            text_offsets.append(offset)
+            text_lengths.append(size)
+            offset += size
+    links = []
+    for index in sorted(arena.addresses.keys() | arena.titles.keys()):
+        address = arena.addresses.get(index)
+        title = arena.titles.get(index)
+        links.append(link_header.pack(index, (address is not None) | (title is not None) << 1))
+        for value in (address, title):
+            if value is not None:
+                value = value.encode("utf-8")
+                links.append(length.pack(len(value)))
+                links.append(value)
+    columns = [arena.kinds, arena.scope_codes, arena.parents, arena.first_children, arena.next_siblings, text_offsets, text_lengths, arena.roots]
+    if sys.byteorder == "big":
+        columns = [array(column.typecode, column) for column in columns]
+        for column in columns:
+            column.byteswap()
+    output = [header.pack(magic, version, len(arena), len(arena.roots), len(arena.addresses.keys() | arena.titles.keys()), len(text))]
+    output.extend(column.tobytes() for column in columns)
+    output.extend(links)
+    output.append(text)
+    return b"".join(output)
+
+def dump(structures, fp):
+    """
+    Serializes @structures (see dumps()) and writes them to the binary file-like object @fp.
+    """
+    fp.write(dumps(structures))
+
+def loads(data):
+    """
+    Deserializes a document from @data, which is a bytes-like object such as bytes or an mmap.
+    Returns a {@link StructureArena}.
+    """
+    view = memoryview(data)
+    if len(view) < header.size:
+        raise FormatError("data is too short")
+    file_magic, file_version, count, root_count, link_count, text_size = header.unpack_from(view, 0)
+    if file_magic != magic:
+        raise FormatError("not a serialized document")
+    if file_version != version:
+        raise FormatError(f"unsupported version {file_version}, expected {version}")
+    arena = StructureArena()
+    position = header.size
+    columns = [(arena.kinds, count), (arena.scope_codes, count), (arena.parents, count), (arena.first_children, count), (arena.next_siblings, count),
+               (arena.text_offsets, count), (arena.text_lengths, count), (arena.roots, root_count)]
+    for column, size in columns:
+        end = position + size * column.itemsize
+        if end > len(view):
+            raise FormatError("data is truncated")
+        column.frombytes(view[position:end])
+        if sys.byteorder == "big":
+            column.byteswap()
+        position = end
+    try:
+        for _ in range(link_count):
+            index, flags = link_header.unpack_from(view, position)
+            position += link_header.size
+            values = []
+            for flag in (1, 2):
+                if flags & flag == 0:
+                    values.append(None)
+                    continue
+                size, = length.unpack_from(view, position)
+                position += length.size
+                values.append(str(view[position:position + size], "utf-8"))
+                position += size
+            arena.addresses[index] = values[0]
+            if values[1] is not None:
+                arena.titles[index] = values[1]
+    except struct.error:
+        raise FormatError("data is truncated")
+    if position + text_size != len(view):
+        raise FormatError("data is truncated")
+    arena.joined_text = str(view[position:], "utf-8")
+    arena.text_length = len(arena.joined_text)
+    if arena.text_length != text_size:
+        # The text is not ASCII, convert the byte spans back to character spans
+        offset = 0
+        for i in range(count):
+            if arena.text_lengths[i] <= 0:
+                continue
+            start = position + arena.text_offsets[i]
+            size = len(str(view[start:start + arena.text_lengths[i]], "utf-8"))
+            arena.text_offsets[i] = offset
+            arena.text_lengths[i] = size
+            offset += size
+    return arena
+
+def load(fp):
+    """
+    Reads a serialized document from the binary file-like object @fp.
+    Returns a {@link StructureArena}.
+    """
+    return loads(fp.read())
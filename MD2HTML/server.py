@@ -0,0 +1,303 @@
+import math
+import json
+import time
+import asyncio
+import collections
+from concurrent.futures import ProcessPoolExecutor
+from tokenizer import RegexTokenizer
+from parser import Parser
+from translator import Translator
+from batch import get_worker_count
+from metadata import split_front_matter
+"""
+A local render service, so that other programs can convert Markdown without starting a new interpreter (and writing two temporary files) for every
+document. The service speaks a minimal HTTP/1.1 over TCP or a Unix socket. The parsing is done by a pool of worker processes that are started and warmed
+up before the first request comes, the event loop only reads the requests and writes the responses.
+
+    POST /render    the body is the Markdown text (UTF-8), the response is the HTML, sent in chunks
+    GET /stats      the number of requests, the queue depth and the latency percentiles as JSON
+
+At most one request per worker is converted at a time and at most @queue_size more requests wait for a worker. Any request beyond that is turned away
+right away with 503 Service Unavailable, so that an overloaded service answers quickly instead of piling up work it can not finish. The HTML is written
+only as fast as the client reads it.
+
+Example usage:
+
+    python main.py --serve 127.0.0.1:8000
+    python main.py --serve unix:/tmp/md2html.sock
+    curl --data-binary @documents/in.md http://127.0.0.1:8000/render
+"""
+
+# The size of the pieces the HTML is sent in, in bytes
+piece_size = 1 << 16
+
+statuses = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required", 413: "Payload Too Large",
+    500: "Internal Server Error", 503: "Service Unavailable"}
+
+tokenizer = RegexTokenizer()
+parser = Parser()
+translator = Translator()
+
+def render(text):
+    """
+    Converts the Markdown @text into HTML, leaving out its front matter. The line endings are normalized the same way reading a file in text mode
+    does it, so that a body sent with CRLF line endings gives the same HTML as the file would. This is the function run by the worker processes.
+    Returns a string.
+    """
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = text[split_front_matter(text)[1]:]
+    return translator.translate(parser.parse(tokenizer.tokenize(text)))
+
+def warm_up():
+    """
+    Converts a small document, so that the worker process has imported the converter and compiled its patterns before the first request comes.
+    """
+    render("# Title\n\nSome *text* with a [link](https://example.com)\n\n- item\n")
+
+def percentile(values, fraction):
+    """
+    Finds the value that @fraction of the @values are less than or equal to (the nearest rank method).
+    Returns the value or None if there are no @values.
+    """
+    if len(values) == 0:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def parse_address(address):
+    """
+    Parses the @address the service listens on, which is either "unix:PATH", "HOST:PORT" or just "PORT".
+    Returns a tuple (host, port, path), where path is None for a TCP address and host and port are None for a Unix socket.
+    """
+    if address.startswith("unix:"):
+        return None, None, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port), None
+
+class RequestError(Exception):
+    """
+    A request that can not be served, @status is the HTTP status code of the response.
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class RenderServer:
+    """
+    This class is the render service. It is started with start() (or serve(), which runs until cancelled) from a running event loop.
+    """
+    def __init__(self, workers=None, queue_size=None, max_body=64 << 20, window=10000):
+        """
+        @workers is the number of worker processes, one per available processor core by default
+        @queue_size is the number of requests that may wait for a worker, four per worker by default
+        @max_body is the largest accepted document in bytes
+        @window is the number of the latest requests the latency percentiles are computed from
+        """
+        self.workers = get_worker_count() if workers is None else workers
+        self.queue_size = self.workers * 4 if queue_size is None else queue_size
+        self.max_body = max_body
+        self.latencies = collections.deque(maxlen=window) # Seconds from receiving a request to sending the last byte of the response
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+        self.queued = 0 # The requests waiting for a worker
+        self.running = 0 # The requests being converted by the workers
+        self.executor = None
+        self.slots = None
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=8000, path=None):
+        """
+        Starts the worker processes and waits until all of them are warmed up, then starts listening on the TCP @host and @port, or on the Unix socket
+        at @path if given.
+        """
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.slots = asyncio.Semaphore(self.workers)
+        loop = asyncio.get_running_loop()
+        # The tasks are submitted before any worker is idle, so every one of them starts its own process
+        await asyncio.gather(*[loop.run_in_executor(self.executor, warm_up) for _ in range(self.workers)])
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+
+    async def close(self):
+        """
+        Stops listening and shuts the worker processes down.
+        """
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    async def serve(self, address):
+        """
+        Starts the service on the @address (see parse_address()) and serves the requests until cancelled.
+        """
+        host, port, path = parse_address(address)
+        await self.start(host, port, path)
+        print(f"Serving on {address} with {self.workers} workers, press Ctrl+C to stop")
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def handle(self, reader, writer):
+        """
+        Serves the requests of a single connection, which is kept alive unless the client asks otherwise.
+        """
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    await self.respond(method, target, body, writer)
+                except RequestError as error:
+                    await self.send(writer, error.status, str(error).encode("utf-8") + b"\n", "text/plain; charset=utf-8", close=True)
+                    break
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        """
+        Reads a single request from the @reader.
+        Returns a tuple (method, target, headers, body) or None if the connection was closed.
+        """
+        try:
+            line = await reader.readline()
+            if len(line) == 0:
+                return None
+            parts = line.decode("latin-1").split()
+            if len(parts) != 3:
+                raise RequestError(400, "Malformed request line")
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if "chunked" in headers.get("transfer-encoding", "").lower():
+                raise RequestError(411, "The length of the body has to be given by Content-Length")
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            # Also raised by the reader for a line over its limit
+            raise RequestError(400, "Malformed request")
+        if length < 0:
+            raise RequestError(400, "Malformed Content-Length")
+        if length > self.max_body:
+            raise RequestError(413, f"The body is larger than {self.max_body} bytes")
+        body = await reader.readexactly(length)
+        return parts[0], parts[1], headers, body
+
+    async def respond(self, method, target, body, writer):
+        """
+        Serves a single request.
+        """
+        path = target.split("?", 1)[0]
+        if path == "/stats":
+            if method != "GET":
+                raise RequestError(405, "Use GET")
+            await self.send(writer, 200, json.dumps(self.get_stats(), indent=2).encode("utf-8"), "application/json")
+        elif path == "/render":
+            if method != "POST":
+                raise RequestError(405, "Use POST")
+            await self.respond_render(body, writer)
+        else:
+            raise RequestError(404, "Unknown path, use POST /render or GET /stats")
+
+    async def respond_render(self, body, writer):
+        """
+        Converts the Markdown @body in a worker process and sends the HTML back.
+        """
+        start = time.perf_counter()
+        self.requests += 1
+        try:
+            text = body.decode("utf-8")
+        except UnicodeDecodeError:
+            raise RequestError(400, "The body is not valid UTF-8")
+        if self.slots.locked() and self.queued >= self.queue_size:
+            self.rejected += 1
+            await self.send(writer, 503, b"Too many requests, try again later\n", "text/plain; charset=utf-8", ["Retry-After: 1"])
+            return
+        self.queued += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.queued -= 1
+        self.running += 1
+        try:
+            html = await asyncio.get_running_loop().run_in_executor(self.executor, render, text)
+        except Exception as exception:
+            self.errors += 1
+            await self.send(writer, 500, f"{type(exception).__name__}: {exception}\n".encode("utf-8"), "text/plain; charset=utf-8")
+            return
+        finally:
+            self.running -= 1
+            self.slots.release()
+        await self.send(writer, 200, html.encode("utf-8"), "text/html; charset=utf-8")
+        self.latencies.append(time.perf_counter() - start)
+
+    async def send(self, writer, status, data, content_type, headers=(), close=False):
+        """
+        Sends a response with the bytes @data as its body. The body is sent in chunks (chunked transfer encoding) and every chunk waits until the client
+        has taken the previous ones, so a slow client does not make the whole HTML pile up in the memory of the service.
+        """
+        head = [f"HTTP/1.1 {status} {statuses[status]}", f"Content-Type: {content_type}", "Transfer-Encoding: chunked", *headers]
+        if close:
+            head.append("Connection: close")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        view = memoryview(data)
+        for i in range(0, len(view), piece_size):
+            piece = view[i:i + piece_size]
+            writer.write(b"%x\r\n" % len(piece))
+            writer.write(piece)
+            writer.write(b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    def get_stats(self):
+        """
+        Returns the statistics of the service as a dictionary, the latencies are in milliseconds.
+        """
+        latencies = list(self.latencies)
+        def milliseconds(seconds):
+            return None if seconds is None else round(seconds * 1000, 3)
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queue_depth": self.queued,
+            "running": self.running,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "latency": {
+                "samples": len(latencies),
+                "p50": milliseconds(percentile(latencies, 0.5)),
+                "p99": milliseconds(percentile(latencies, 0.99)),
+                "max": milliseconds(max(latencies, default=None)),
+            },
+        }
+
+def main(address="127.0.0.1:8000"):
+    """
+    The entry point of the --serve command line mode.
+    """
+    try:
+        parse_address(address)
+    except ValueError:
+        print(f"Invalid address {address}, use HOST:PORT or unix:PATH")
+        return False
+    try:
+        asyncio.run(RenderServer().serve(address))
+    except KeyboardInterrupt:
+        print("Stopped serving")
+    return True
@@ -0,0 +1,121 @@
+import mmap
+import os
+import stat
+
+class MappedSource:
+    """
+    This class represents a Markdown source file mapped into memory. The tokenizer scans the raw bytes of the file (see RegexTokenizer#tokenize_mapped())
+    and the tokens only keep offsets into them. The text is decoded (as UTF-8) only for the ranges that are requested by slicing the source, so the file is
+    never copied as a whole.
+
+    The pages of the file that were already scanned can be dropped from the memory of the process (see release()), so the memory used for a large file
+    stays about the same no matter how large the file is. A source that can not be mapped (such as a pipe) is read into memory instead.
+
+    The source has to stay open for as long as the tokens created from it are in use. It can be used as a context manager.
+    """
+    # The pages of the file are released in steps of this many bytes
+    release_size = 1 << 20
+
+    def __init__(self, path):
+        """
+        @path is the path of the file to map
+        """
+        self.file = open(path, "rb")
+        status = os.fstat(self.file.fileno())
+        # Pipes and other streams can not be mapped and report no size
+        if not stat.S_ISREG(status.st_mode):
+            self.map = None
+            self.buffer = self.file.read()
+        # Empty files can not be mapped
+        elif status.st_size == 0:
+            self.map = None
+            self.buffer = b""
+        else:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.buffer = self.map
+        self.view = memoryview(self.buffer)
+        self.released = 0 # The end of the range of the file that was released
+
+    def __getitem__(self, key):
+        """
+        Decodes the bytes of the file in the range given by the slice @key.
+        Returns a string.
+        """
+        return str(self.view[key], "utf-8")
+
+    def __len__(self):
+        return len(self.view)
+
+    def endswith(self, value, start, end):
+        """
+        Checks whether the bytes of the file in the range <@start, @end) end with the encoded string @value. Mimics str#endswith().
+        Returns boolean.
+        """
+        encoded = value.encode("utf-8")
+        return end - start >= len(encoded) and self.view[end - len(encoded):end] == encoded
+
+    def release(self, end):
+        """
+        Tells the operating system that the bytes of the file before @end are not going to be needed soon, so that the pages of the file that hold them
+        do not count towards the memory of the process anymore. The bytes stay valid, the pages are read from the file again if they are accessed later.
+        Does nothing if the source is not mapped or the platform does not support it.
+        """
+        if self.map is None or not hasattr(self.map, "madvise") or not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        end -= end % mmap.PAGESIZE
+        if end > self.released:
+            self.map.madvise(mmap.MADV_DONTNEED, self.released, end - self.released)
+            self.released = end
+
+    def close(self):
+        """
+        Releases the mapped memory and closes the file.
+        """
+        self.view.release()
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class ChunkedWriter:
+    """
+    A file-like object that collects the strings written to it and writes them to the binary file @fp encoded as UTF-8 in chunks of about @chunk_size
+    characters. The translator writes the HTML in many small pieces (see Translator#translate_to()), this way the file only gets a write of a fixed size
+    every now and then and at most a single chunk of the HTML is held in memory. It can be used as a context manager, which closes @fp.
+    """
+    def __init__(self, fp, chunk_size=1 << 16):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.pieces = []
+        self.length = 0
+
+    def write(self, text):
+        self.pieces.append(text)
+        self.length += len(text)
+        if self.length >= self.chunk_size:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        """
+        Writes the collected strings to the file.
+        """
+        if len(self.pieces) != 0:
+            self.fp.write("".join(self.pieces).encode("utf-8"))
+            self.pieces = []
+            self.length = 0
+
+    def close(self):
+        self.flush()
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
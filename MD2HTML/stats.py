@@ -0,0 +1,173 @@
+import time
+import json
+import tracemalloc
+"""
+Opt-in instrumentation of the conversion pipeline. A {@link ConversionStats} object passed to main.convert() measures the time spent in each stage of
+the conversion and counts what went through the pipeline. Without it, the conversion runs exactly as it would otherwise.
+
+Example usage:
+
+    stats = ConversionStats()
+    main.convert("documents/in.md", "documents/out.html", stats)
+    print(stats.to_json())
+
+or from the command line:
+
+    python main.py documents/in.md documents/out.html --stats
+"""
+
+class ConversionStats:
+    """
+    This class collects the statistics of a single conversion. The stages of the conversion run interleaved (the translator pulls the structures from the
+    parser, which pulls the lines of tokens from the tokenizer), so each stage is timed including the stages it pulls from and the time of the inner stages
+    is subtracted afterwards.
+
+    Counted are the lines and tokens produced by the tokenizer, the structures produced by the parser along with the deepest nesting of the structures
+    (which is the peak depth of the parser's context stack, without the super structure) and the bytes read and written. The peak of the memory allocated
+    during the conversion is only measured with @trace_memory, since tracing the allocations slows the conversion down considerably.
+    """
+    stages = ["tokenize", "parse", "translate"]
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.wall = {stage: 0.0 for stage in self.stages} # Wall-clock time of each stage in seconds
+        self.cpu = {stage: 0.0 for stage in self.stages} # CPU time of each stage in seconds
+        self.total_wall = 0.0
+        self.total_cpu = 0.0
+        self.lines = 0
+        self.tokens = 0
+        self.structures = 0
+        self.max_depth = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.peak_memory = None # Bytes, only measured with trace_memory
+
+    def tokenized(self, lines):
+        """
+        Passes the @lines of tokens through, timing the tokenizer and counting the lines and tokens.
+        Returns a generator.
+        """
+        iterator = iter(lines)
+        wall, cpu = self.wall, self.cpu
+        while True:
+            start_wall, start_cpu = time.perf_counter(), time.process_time()
+            line = next(iterator, None)
+            wall["tokenize"] += time.perf_counter() - start_wall
+            cpu["tokenize"] += time.process_time() - start_cpu
+            if line is None:
+                return
+            self.lines += 1
+            self.tokens += len(line)
+            yield line
+
+    def parsed(self, structures):
+        """
+        Passes the top-level @structures through, timing the parser (including the tokenizer it pulls the tokens from) and counting the structures.
+        Returns a generator.
+        """
+        iterator = iter(structures)
+        wall, cpu = self.wall, self.cpu
+        while True:
+            start_wall, start_cpu = time.perf_counter(), time.process_time()
+            structure = next(iterator, None)
+            wall["parse"] += time.perf_counter() - start_wall
+            cpu["parse"] += time.process_time() - start_cpu
+            if structure is None:
+                return
+            self.__count(structure)
+            yield structure
+
+    def __count(self, structure):
+        """
+        Counts the @structure and all the structures inside it and updates the deepest nesting. The structures are walked without recursion.
+        """
+        stack = [(structure, 1)]
+        while len(stack) != 0:
+            structure, depth = stack.pop()
+            self.structures += 1
+            if depth > self.max_depth:
+                self.max_depth = depth
+            if isinstance(structure.content, list):
+                stack.extend((child, depth + 1) for child in structure.content)
+
+    def writer(self, fp):
+        """
+        Wraps the file-like object @fp so that the bytes written to it are counted (as UTF-8).
+        Returns a file-like object with a write() method.
+        """
+        return CountingWriter(self, fp)
+
+    def start(self):
+        """
+        Starts measuring the whole conversion.
+        """
+        if self.trace_memory:
+            tracemalloc.start()
+        self.start_wall, self.start_cpu = time.perf_counter(), time.process_time()
+
+    def stop(self):
+        """
+        Stops measuring the whole conversion. The time of each stage is turned into the time spent in the stage itself, the translator gets what is left
+        of the total time.
+        """
+        self.total_wall = time.perf_counter() - self.start_wall
+        self.total_cpu = time.process_time() - self.start_cpu
+        if self.trace_memory:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        for times, total in [(self.wall, self.total_wall), (self.cpu, self.total_cpu)]:
+            times["translate"] = max(0.0, total - times["parse"])
+            times["parse"] = max(0.0, times["parse"] - times["tokenize"])
+
+    def to_dict(self):
+        """
+        Returns the statistics as a dictionary.
+        """
+        tokenize_time = self.wall["tokenize"]
+        return {
+            "stages": {stage: {"wall": self.wall[stage], "cpu": self.cpu[stage]} for stage in self.stages},
+            "total": {"wall": self.total_wall, "cpu": self.total_cpu},
+            "lines": self.lines,
+            "tokens": self.tokens,
+            "tokens_per_second": self.tokens / tokenize_time if tokenize_time > 0 else None,
+            "structures": self.structures,
+            "max_depth": self.max_depth,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "peak_memory": self.peak_memory,
+        }
+
+    def to_json(self):
+        """
+        Returns the statistics as a JSON string, see to_dict().
+        """
+        return json.dumps(self.to_dict(), indent=2)
+
+    def print_report(self):
+        """
+        Prints the statistics in a human readable form.
+        """
+        for stage in self.stages:
+            share = self.wall[stage] / self.total_wall * 100 if self.total_wall > 0 else 0
+            print(f"{stage:<10} {self.wall[stage] * 1000:10.1f} ms wall {self.cpu[stage] * 1000:10.1f} ms CPU {share:6.1f} %")
+        print(f"{'total':<10} {self.total_wall * 1000:10.1f} ms wall {self.total_cpu * 1000:10.1f} ms CPU")
+        tokens_per_second = self.to_dict()["tokens_per_second"]
+        if tokens_per_second is not None:
+            print(f"Tokens: {self.tokens} in {self.lines} lines, {tokens_per_second / 1000000:.2f} M tokens/s")
+        print(f"Structures: {self.structures}, deepest nesting {self.max_depth}")
+        print(f"Read {self.bytes_read} bytes, wrote {self.bytes_written} bytes")
+        if self.peak_memory is not None:
+            print(f"Peak memory: {self.peak_memory / 1000000:.1f} MB")
+
+class CountingWriter:
+    """
+    A file-like object that counts the bytes written through it, see ConversionStats#writer().
+    """
+    def __init__(self, stats, fp):
+        self.stats = stats
+        self.fp = fp
+
+    def write(self, text):
+        # The output is ASCII for the most part, so the length in UTF-8 is only computed for text that is not
+        self.stats.bytes_written += len(text) if text.isascii() else len(text.encode("utf-8"))
+        return self.fp.write(text)
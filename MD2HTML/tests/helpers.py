@@ -0,0 +1,13 @@
+from tokenizer import RegexTokenizer
+from parser import Parser
+from translator import Translator
+"""
+Helpers shared by the tests.
+"""
+
+def convert(text):
+    """
+    Converts the Markdown @text into HTML with the whole pipeline at once, the reference output the other ways of converting are compared to.
+    Returns a string.
+    """
+    return Translator().translate(Parser().parse(RegexTokenizer().tokenize(text)))
@@ -0,0 +1,50 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+
+from arena import StructureArena
+from tokenizer import RegexTokenizer
+from parser import Parser, Structure
+from translator import Translator
+import unittest
+
+class StructureArenaTest(unittest.TestCase):
+
+    def read_document(self, name):
+        with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "documents", name)) as file:
+            return file.read()
+
+    def test_StructureArena(self):
+        text = "# Title\n\nSome *text* and [a link](address)\n\n- item\n- **item**\n\n***\n\n    code\n"
+        test_output = Parser().parse(RegexTokenizer().tokenize(text))
+        arena = StructureArena(Parser().parse_stream(RegexTokenizer().tokenize(text)))
+
+        output = list(arena)
+        assert output == test_output, f"Incorrect structures: {output} expected: {test_output}"
+        assert len(arena) == 18, f"Incorrect number of structures: {len(arena)}"
+        link = output[1].content[3]
+        assert link.kind is Structure.Type.LINK and link.address == "address", f"Incorrect link: {link}"
+        assert link.parent.kind is Structure.Type.PARAGRAPH and link.parent.parent is None, f"Incorrect parent of {link}"
+        assert output[3].content is None, f"HR should have no content: {output[3]}"
+
+    def test_StructureArena__documents(self):
+        for name in ["docs.md", "in.md"]:
+            text = self.read_document(name)
+            test_output = Parser().parse(RegexTokenizer().tokenize(text))
+            arena = StructureArena(Parser().parse_stream(RegexTokenizer().tokenize(text)))
+            assert list(arena) == test_output, f"Incorrect structures of {name}"
+            output = Translator().translate(arena)
+            assert output == Translator().translate(test_output), f"Incorrect translation of {name}"
+
+    def test_StructureArena__deep_nesting(self):
+        depth = sys.getrecursionlimit() + 100
+        text = "> " * depth + "text\n"
+        arena = StructureArena(Parser().parse_stream(RegexTokenizer().tokenize(text)))
+        test_output = "<blockquote>" * depth + "text" + "</blockquote>" * depth
+        output = Translator().translate(arena)
+        assert output == test_output, f"Incorrect output of {depth} nested blockquotes"
+
+
+if __name__ == "__main__":
+    unittest.main()
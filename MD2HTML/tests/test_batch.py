@@ -0,0 +1,80 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+
+import batch
+from main import convert
+import unittest
+import tempfile
+
+class BatchTest(unittest.TestCase):
+
+    def make_tree(self, files):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for name, data in files.items():
+            path = os.path.join(directory.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file:
+                file.write(data)
+        return directory.name
+
+    def test_batch_find_sources(self):
+        source_dir = self.make_tree({"a.md": "", os.path.join("sub", "b.md"): "", "notes.txt": ""})
+
+        test_output = [(os.path.join(source_dir, "a.md"), os.path.join("out", "a.html")),
+                       (os.path.join(source_dir, "sub", "b.md"), os.path.join("out", "sub", "b.html"))]
+        output = batch.find_sources(source_dir, "out")
+        assert output == test_output, f"Incorrect jobs: {output} expected: {test_output}"
+
+    def test_batch_convert_tree(self):
+        files = {"index.md": "# Title\n\nSome **text**\n", os.path.join("a", "b", "deep.md"): "- item\n- item\n", os.path.join("a", "c.md"): "`code`\n"}
+        source_dir = self.make_tree(files)
+        target_dir = os.path.join(self.make_tree({}), "out")
+
+        results = batch.convert_tree(source_dir, target_dir, workers=2)
+        assert len(results) == len(files), f"Incorrect number of results: {len(results)} expected: {len(files)}"
+        for result in results:
+            assert result.error is None, f"Conversion of {result.source} failed: {result.error}"
+            reference = os.path.join(self.make_tree({}), "reference.html")
+            convert(result.source, reference)
+            with open(result.target) as output, open(reference) as test_output:
+                assert output.read() == test_output.read(), f"Incorrect output of {result.source}"
+        for name in files:
+            target = os.path.join(target_dir, os.path.splitext(name)[0] + ".html")
+            assert os.path.isfile(target), f"Missing output file {target}"
+
+    def test_batch_convert_tree__failure(self):
+        source_dir = self.make_tree({"good.md": "text\n"})
+        with open(os.path.join(source_dir, "bad.md"), "wb") as file:
+            file.write(b"invalid \xff utf-8\n")
+        target_dir = self.make_tree({})
+
+        results = batch.convert_tree(source_dir, target_dir, workers=1)
+        errors = {os.path.basename(result.source): result.error for result in results}
+        assert errors["good.md"] is None, f"Conversion of good.md failed: {errors['good.md']}"
+        assert errors["bad.md"] is not None, "Conversion of a file that is not UTF-8 encoded should be reported as failed"
+
+    def test_batch_convert_tree__incremental(self):
+        source_dir = self.make_tree({"a.md": "first\n", "b.md": "second\n"})
+        target_dir = self.make_tree({})
+
+        results = batch.convert_tree(source_dir, target_dir, workers=1)
+        assert not any(result.cached for result in results), "No file should be cached on the first run"
+        results = batch.convert_tree(source_dir, target_dir, workers=1)
+        assert all(result.cached for result in results), "All files should be cached on a rerun"
+
+        with open(os.path.join(source_dir, "b.md"), "w") as file:
+            file.write("changed content\n")
+        results = {os.path.basename(result.source): result.cached for result in batch.convert_tree(source_dir, target_dir, workers=1)}
+        assert results == {"a.md": True, "b.md": False}, f"Only the changed file should be converted: {results}"
+        with open(os.path.join(target_dir, "b.html")) as file:
+            assert "changed content" in file.read(), "The output of the changed file should be rebuilt"
+
+        results = batch.convert_tree(source_dir, target_dir, workers=1, force=True)
+        assert not any(result.cached for result in results), "No file should be cached when the rebuild is forced"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import corpus
+import bench_pipeline
+from tokenizer import RegexTokenizer
+from parser import Parser
+from translator import Translator
+import unittest
+
+class BenchmarksTest(unittest.TestCase):
+
+    def test_corpus_generate(self):
+        for kind in corpus.kinds:
+            text = corpus.generate(kind, 5000, 1)
+            assert text == corpus.generate(kind, 5000, 1), f"The {kind} document should only depend on the seed"
+            assert text != corpus.generate(kind, 5000, 2), f"The {kind} documents of different seeds should differ"
+            assert len(text) >= 5000, f"The {kind} document is too short: {len(text)}"
+            Translator().translate(Parser().parse(RegexTokenizer().tokenize(text)))
+
+    def test_bench_pipeline_compare(self):
+        def entry(parse_time):
+            return {"size": 1000, "seed": 0, "results": {"links": {"cpu": {"tokenize": 1.0, "parse": parse_time, "translate": 1.0, "total": 2.0 + parse_time}}}}
+        baseline = entry(1.0)
+        history = [baseline, {"size": 2000, "seed": 0, "results": {}}]
+
+        assert bench_pipeline.find_baseline(history, entry(1.0)) is baseline, "The run with the same settings should be found"
+        assert bench_pipeline.compare(baseline, entry(1.05), "cpu", 0.1) == [], "A slowdown within the threshold is not a regression"
+        regressions = bench_pipeline.compare(baseline, entry(1.5), "cpu", 0.1)
+        assert [(kind, stage) for kind, stage, _, _ in regressions] == [("links", "parse"), ("links", "total")], f"Incorrect regressions: {regressions}"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+
+from cache import BuildManifest, converter_files
+import unittest
+import tempfile
+import subprocess
+
+class BuildManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.source = os.path.join(self.directory, "in.md")
+        self.target = os.path.join(self.directory, "out.html")
+        self.manifest_path = os.path.join(self.directory, BuildManifest.file_name)
+        self.write(self.source, "# Title\n")
+        self.write(self.target, "<h1>Title</h1>")
+
+    def write(self, path, data):
+        with open(path, "w") as file:
+            file.write(data)
+
+    def build(self, version="1"):
+        manifest = BuildManifest(self.manifest_path, version)
+        up_to_date = manifest.is_up_to_date(self.source, self.target)
+        if not up_to_date:
+            manifest.update(self.source)
+        manifest.save()
+        return up_to_date
+
+    def test_BuildManifest_is_up_to_date(self):
+        assert self.build() == False, "A file missing from the manifest should not be up to date"
+        assert self.build() == True, "An unchanged file should be up to date"
+
+    def test_BuildManifest_is_up_to_date__changed_content(self):
+        self.build()
+        self.write(self.source, "# Other title\n")
+        assert self.build() == False, "A file with changed contents should not be up to date"
+
+    def test_BuildManifest_is_up_to_date__touched_file(self):
+        self.build()
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert self.build() == True, "A file with unchanged contents should be up to date even if its modification time changed"
+        manifest = BuildManifest(self.manifest_path, "1")
+        assert manifest.entries[self.source]["mtime"] == stat.st_mtime_ns + 10 ** 9, "The new modification time should be remembered"
+
+    def test_BuildManifest_is_up_to_date__converter_version(self):
+        self.build("1")
+        assert self.build("2") == False, "A file converted by another version of the converter should not be up to date"
+
+    def test_BuildManifest_is_up_to_date__missing_target(self):
+        self.build()
+        os.remove(self.target)
+        assert self.build() == False, "A file whose output is missing should not be up to date"
+
+    def test_converter_files(self):
+        # Every module of the converter that the conversion imports has to be a part of the version
+        directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = "import sys, main; print('\\n'.join(getattr(module, '__file__', None) or '' for module in list(sys.modules.values())))"
+        paths = subprocess.run([sys.executable, "-c", code], cwd=directory, capture_output=True, text=True, check=True).stdout.split("\n")
+        names = {os.path.basename(path) for path in paths if os.path.dirname(path) == directory}
+        missing = names - set(converter_files)
+        assert len(missing) == 0, f"The converter files are missing: {missing}"
+
+    def test_BuildManifest_load__corrupted(self):
+        self.write(self.manifest_path, "{not json")
+        manifest = BuildManifest(self.manifest_path, "1")
+        assert manifest.entries == {}, "A corrupted manifest should be treated as empty"
+
+
+if __name__ == "__main__":
+    unittest.main()
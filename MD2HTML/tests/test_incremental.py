@@ -0,0 +1,88 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+
+from incremental import IncrementalRenderer
+from tokenizer import RegexTokenizer
+from parser import Parser
+from tests.helpers import convert
+import unittest
+
+class IncrementalRendererTest(unittest.TestCase):
+
+    def test_IncrementalRenderer_render(self):
+        renderer = IncrementalRenderer()
+        text = "# Title\n\nSome *text*\nmore text\n\n- item\n- item\n\n> quote\n\n    code\n"
+
+        test_output = convert(text)
+        output = renderer.render(text)
+        assert output == test_output, f"Incorrect output: {output} expected: {test_output}"
+        assert renderer.misses == 5, f"Incorrect number of parsed blocks: {renderer.misses}"
+
+    def test_IncrementalRenderer_render__edit(self):
+        renderer = IncrementalRenderer()
+        text = "# Title\n\nSome *text*\n\n- item\n- item\n\n> quote\n"
+        renderer.render(text)
+        edited_text = text.replace("- item\n- item", "- item\n- edited item")
+
+        test_output = convert(edited_text)
+        output = renderer.render(edited_text)
+        assert output == test_output, f"Incorrect output: {output} expected: {test_output}"
+        assert renderer.misses == 5 and renderer.hits == 3, f"Only the edited block should be parsed again: {renderer.misses} misses, {renderer.hits} hits"
+
+    def test_IncrementalRenderer_render__dependent_blocks(self):
+        renderer = IncrementalRenderer()
+        # The escape at the end of the first block applies to the first token of the next block
+        text = "text \\\n\n*not emphasis*\n\n[link\n\ntext](address)\n"
+
+        test_output = convert(text)
+        output = renderer.render(text)
+        assert output == test_output, f"Incorrect output: {output} expected: {test_output}"
+
+    def test_IncrementalRenderer_render__reference_links(self):
+        renderer = IncrementalRenderer()
+        text = "See [label]\n\nmore text\n\n[label]: /address\n"
+        renderer.render(text)
+        # The definition changes the link in another block
+        edited_text = text.replace("/address", "/edited")
+
+        test_output = convert(edited_text)
+        output = renderer.render(edited_text)
+        assert output == test_output, f"Incorrect output: {output} expected: {test_output}"
+
+    def test_IncrementalRenderer_render__code_like_definition(self):
+        renderer = IncrementalRenderer()
+        # A colon after a bracket inside the code is not a link reference definition, so the blocks are still parsed one by one
+        text = "# Title\n\n    y = x[1:]:\n\nSome *text*\n"
+        renderer.render(text)
+        edited_text = text.replace("Some", "Edited")
+
+        test_output = convert(edited_text)
+        output = renderer.render(edited_text)
+        assert output == test_output, f"Incorrect output: {output} expected: {test_output}"
+        assert renderer.misses == 4 and renderer.hits == 2, f"Only the edited block should be parsed again: {renderer.misses} misses, {renderer.hits} hits"
+
+    def test_IncrementalRenderer_render__documents(self):
+        renderer = IncrementalRenderer()
+        for path in [os.path.join("documents", "docs.md"), os.path.join("documents", "in.md")]:
+            with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), path)) as file:
+                lines = file.read().split("\n")
+            for i in range(0, len(lines), 7):
+                lines[i] = lines[i] + " *edit*"
+                text = "\n".join(lines)
+                output = renderer.render(text)
+                assert output == convert(text), f"Incorrect output of {path} after editing line {i}"
+
+    def test_IncrementalRenderer_parse(self):
+        renderer = IncrementalRenderer()
+        text = "Some *text*\n\n1. item\n"
+
+        test_output = Parser().parse(RegexTokenizer().tokenize(text))
+        output = renderer.parse(text)
+        assert output == test_output, f"Incorrect structures: {output} expected: {test_output}"
+        assert renderer.parse("") == [], "An empty text should produce no structures"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+
+import metadata
+from metadata import parse_front_matter, split_front_matter, scan_metadata
+import main
+from incremental import IncrementalRenderer
+from parser import Structure
+from tests.helpers import convert
+import unittest
+import tempfile
+
+class MetadataTest(unittest.TestCase):
+
+    def write_file(self, data):
+        file = tempfile.NamedTemporaryFile(suffix=".md", delete=False)
+        file.write(data.encode("utf-8") if isinstance(data, str) else data)
+        file.close()
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_parse_front_matter(self):
+        text = "title: Events | Underhand\ndescription: \"A \\\"quoted\\\" one: yes\"\n# comment\nlayout: base.html\ntags: [news, 'it''s']\nauthors:\n  - Alice\n  - Bob\nempty:\n"
+        test_output = {"title": "Events | Underhand", "description": "A \"quoted\" one: yes", "layout": "base.html", "tags": ["news", "it's"],
+            "authors": ["Alice", "Bob"], "empty": ""}
+
+        output = parse_front_matter(text)
+        assert output == test_output, f"Incorrect front matter: {output} expected: {test_output}"
+        assert parse_front_matter("Just some text\n") is None, "Text that is not front matter should not be parsed"
+        assert parse_front_matter("- item\n") is None, "An item without a key should not be parsed"
+
+    def test_split_front_matter(self):
+        text = "---\ntitle: About\n---\n\n# About\n"
+        assert split_front_matter(text) == ({"title": "About"}, len("---\ntitle: About\n---\n")), f"Incorrect split: {split_front_matter(text)}"
+        assert split_front_matter(text.encode("utf-8")) == split_front_matter(text), "Bytes should be split the same way as strings"
+        assert split_front_matter("---\r\ntitle: Žluť\r\n...") == ({"title": "Žluť"}, len("---\r\ntitle: Žluť\r\n...")), "The front matter may end the text"
+        assert split_front_matter("---\n---\ntext") == ({}, len("---\n---\n")), "The front matter may be empty"
+        assert split_front_matter("***\ntitle: About\n---\n") == (None, 0), "The front matter has to start with dashes"
+        assert split_front_matter("---\nSome text\n---\n") == (None, 0), "Horizontal rules around text should not be front matter"
+        assert split_front_matter(" ---\ntitle: About\n---\n") == (None, 0), "The front matter has to start at the beginning"
+        assert split_front_matter("---\ntitle: About\n") == (None, 0), "Unfinished front matter should not be front matter"
+
+    def test_split_front_matter__limit(self):
+        text = "---\n" + "key: value\n" * metadata.max_front_matter_size + "---\n"
+        assert split_front_matter(text) == (None, 0), "Too large front matter should not be recognized"
+
+    def test_convert__front_matter(self):
+        text = "---\ntitle: About\nlayout: base.html\n---\n\n# About\n\nSome *text*\n"
+        test_output = convert("\n# About\n\nSome *text*\n")
+        source = self.write_file(text)
+        target = source + ".html"
+        self.addCleanup(os.remove, target)
+
+        main.convert(source, target)
+        with open(target, encoding="utf-8") as file:
+            output = file.read()
+        assert output == test_output, f"The front matter should be left out: {output} expected: {test_output}"
+        assert IncrementalRenderer().render(text) == test_output, "The incremental conversion should leave the front matter out as well"
+
+    def test_scan_metadata(self):
+        text = "---\ntitle: Events\nlayout: base.html\n---\n\nIntro *text*\n\n## First heading\n\n- item\n\n# Second heading\n"
+        output = scan_metadata(self.write_file(text))
+
+        assert output.front_matter == {"title": "Events", "layout": "base.html"}, f"Incorrect front matter: {output.front_matter}"
+        test_output = [Structure.Type.PARAGRAPH, Structure.Type.HEADING_2, Structure.Type.UNORDERED_LIST]
+        assert [block.kind for block in output.blocks] == test_output, f"Incorrect blocks: {output.blocks} expected: {test_output}"
+        assert output.heading == "First heading", f"Incorrect heading: {output.heading}"
+        assert output.title == "Events" and output.description == "Intro text", f"Incorrect title or description: {output.title} {output.description}"
+
+        output = scan_metadata(self.write_file("# Only *a* heading\n\nThe first paragraph\n"))
+        assert output.front_matter == {} and output.title == "Only a heading", f"The heading should be the title: {output.title}"
+        assert output.description == "The first paragraph", f"The first paragraph should be the description: {output.description}"
+
+    def test_scan_metadata__stops_early(self):
+        # The end of the file is not valid UTF-8, so reading it would fail
+        data = "---\ntitle: Long\n---\n# Heading\n\nText\n\n".encode("utf-8") + b"More text\n\n" * 100000 + b"\xff\xfe\n"
+        output = scan_metadata(self.write_file(data), blocks=2)
+        assert output.title == "Long" and output.heading == "Heading" and len(output.blocks) == 2, "Only the beginning of the file should be read"
+
+    def test_scan_metadata__long_front_matter(self):
+        # The closing line of dashes is cut off by the limit, so the dashes are not the end of the front matter
+        text = "---\ntitle: Long\n" + "# comment\n" * ((metadata.max_front_matter_size - 20) // 10)
+        text += "#" * (metadata.max_front_matter_size - 4 - len(text)) + "\n---"
+        text += "-\n\n# Heading\n"
+        output = scan_metadata(self.write_file(text))
+        assert output.front_matter == {} and split_front_matter(text) == (None, 0), f"The front matter should not be recognized: {output.front_matter}"
+        # A front matter longer than the limit is not recognized either
+        text = "---\ntitle: Long\n" + "key: value\n" * metadata.max_front_matter_size + "---\n\n# Heading\n"
+        output = scan_metadata(self.write_file(text))
+        assert output.front_matter == {}, f"The front matter should not be recognized: {output.front_matter}"
+
+
+if __name__ == "__main__":
+    unittest.main()
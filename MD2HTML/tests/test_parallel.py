@@ -0,0 +1,79 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+
+import parallel
+import main
+from tests.helpers import convert
+import unittest
+import tempfile
+
+class ParallelTest(unittest.TestCase):
+
+    def read_document(self, name):
+        with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "documents", name)) as file:
+            return file.read()
+
+    def test_split_chunks(self):
+        text = "# Title\n\nSome text\nmore text\n\n  \n\t\n- item\n\n    code\n"
+        chunks = parallel.split_chunks(text, 1)
+
+        test_output = ["# Title\n", "Some text\nmore text\n\n  \n\t", "- item\n", "    code\n"]
+        assert chunks == test_output, f"Incorrect chunks: {chunks} expected: {test_output}"
+        assert parallel.split_chunks(text, 1000) == [text], "A text shorter than the chunk size should not be split"
+        for size in range(len(text)):
+            assert "\n".join(parallel.split_chunks(text, size)) == text, f"Joining the chunks of size {size} should give back the text"
+
+    def test_render(self):
+        text = self.read_document("docs.md") * 3 + self.read_document("in.md")
+        test_output = convert(text)
+
+        output = "".join(parallel.render(text, 2, 500))
+        assert output == test_output, "The output of the parallel conversion should be the same as the output of the serial conversion"
+
+    def test_render__dependent_chunks(self):
+        # The escape and the unfinished link make the chunks depend on each other
+        text = "text \\\n\n*not emphasis*\n\n[link\n\ntext](address)\n\nlast *chunk*\n"
+        test_output = convert(text)
+
+        for size in range(len(text)):
+            output = "".join(parallel.render(text, 1, size))
+            assert output == test_output, f"Incorrect output with chunks of size {size}: {output} expected: {test_output}"
+
+    def test_render__reference_links(self):
+        text = "See [label]\n\nmore text\n\n[label]: /address\n\n[label] again\n"
+        test_output = convert(text)
+
+        output = "".join(parallel.render(text, 1, 1))
+        assert output == test_output, f"Incorrect output: {output} expected: {test_output}"
+
+    def test_convert__late_definition(self):
+        # The definitions are usually at the end of the document, however long it is
+        text = "See [the docs][docs]\n\n" + "\n\n".join(f"paragraph {i}" for i in range(2100)) + "\n\n[docs]: /d\n"
+        test_output = convert(text).encode("utf-8")
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "in.md")
+            with open(source, "w", encoding="utf-8") as file:
+                file.write(text)
+            with open(main.convert(source, os.path.join(directory, "out.html")), "rb") as file:
+                output = file.read()
+        assert output == test_output, f"Incorrect output: {output[:100]} expected: {test_output[:100]}"
+        assert b'<a href="/d">the docs</a>' in output, f"The reference should be resolved: {output[:100]}"
+
+    def test_convert(self):
+        text = self.read_document("in.md") * 2 + "Žluťoučký *kůň*\n"
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "in.md")
+            with open(source, "w", encoding="utf-8") as file:
+                file.write(text)
+            target = parallel.convert(source, os.path.join(directory, "out.html"), 2, 1000)
+            with open(target, "rb") as file:
+                output = file.read()
+            with open(main.convert(source, os.path.join(directory, "serial.html")), "rb") as file:
+                test_output = file.read()
+        assert output == convert(text).encode("utf-8"), "Incorrect output of the converted file"
+        assert output == test_output, "The output should be the same bytes as the output of main.convert()"
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,8 +3,8 @@ import os
 # Add parent directory to PATH because of imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
 
-from parser import Parser, Structure
-from tokenizer import Token
+from parser import Parser, Structure, OutlineEntry, slugify, may_define_labels
+from tokenizer import Token, RegexTokenizer
 import unittest
 
 class ParserTest(unittest.TestCase):
@@ -81,6 +81,12 @@ class ParserTest(unittest.TestCase):
     def test_Parser_parse__parse_unordered_list_in_ordered_list(self):
         self.parse_test_unordered_list_in_ordered_list()
 
+    def test_Parser_parse_stream(self):
+        self.parse_test_stream()
+
+    def test_Parser_parse__token_columns(self):
+        self.parse_test_token_columns()
+
     def test_Parser_parse__absolute_destruction_tests(self):
         pass # test parsing ***bold* or italic** and then test all the shit nested together
         
@@ -431,6 +437,67 @@ class ParserTest(unittest.TestCase):
         for i in range(len(test_structures)):
             assert test_structures[i] == structures[i], f"Incorrect structure found: {structures[i]} expected: {test_structures[i]} number {i}"
 
+    def test_Parser_parse__parse_delimiter_runs(self):
+        self.parse_test_delimiter_runs()
+        self.parse_test_delimiter_runs__intraword()
+        self.parse_test_delimiter_runs__multiline()
+        self.parse_test_delimiter_runs__adversarial()
+
+    def test_Parser_parse__deep_nesting(self):
+        self.parse_test_deep_nesting()
+
+    def test_Parser_parse__reference_links(self):
+        self.parse_test_reference_links()
+        self.parse_test_reference_links__forward()
+        self.parse_test_reference_links__undefined()
+        self.parse_test_reference_links__unfinished_text()
+        self.parse_test_reference_links__stream()
+
+    def test_may_define_labels(self):
+        test_data = [("[label]: /address", True), ("> - [label]: /address", True), ("text\r   [label]: /address", True),
+            ("text [label]: /address", False), ("    y = x[1:]: z", False), ("text\n~~~\n[label]: /address\n~~~", True)]
+        for text, test_output in test_data:
+            output = may_define_labels(text)
+            assert output == test_output, f"Incorrect result for {text!r}: {output} expected: {test_output}"
+
+    def test_Parser_parse__outline(self):
+        self.parse_test_outline()
+        self.parse_test_outline__stream()
+        self.parse_test_outline__not_collected()
+
+    def test_slugify(self):
+        test_data = [("Usage", "usage"), ("1. Conversion algorithm", "1-conversion-algorithm"), ("Why *not* use C++?", "why-not-use-c"),
+            ("Příliš žluťoučký kůň", "příliš-žluťoučký-kůň"), ("snake_case - names", "snake_case---names"), ("!!!", "")]
+        for text, test_output in test_data:
+            output = slugify(text)
+            assert output == test_output, f"Incorrect slug of {text}: {output} expected: {test_output}"
+
+    def parse_test_outline(self):
+        text = "# Title\n\nSome text\n\n## Usage *now*\n\n> ### Quoted `code`\n\n## Usage now\n\n## Usage-now-1\n\n## Usage now\n\n# !!!"
+        test_outline = [OutlineEntry(1, "Title", "title", 0), OutlineEntry(2, "Usage now", "usage-now", 4), OutlineEntry(3, "Quoted code", "quoted-code", 6),
+            OutlineEntry(2, "Usage now", "usage-now-1", 8), OutlineEntry(2, "Usage-now-1", "usage-now-1-1", 10), OutlineEntry(2, "Usage now", "usage-now-2", 12),
+            OutlineEntry(1, "!!!", "section", 14)]
+        outline = []
+        structures = Parser().parse(RegexTokenizer().tokenize(text), outline)
+
+        assert outline == test_outline, f"Incorrect outline: {outline} expected: {test_outline}"
+        assert structures[0].address == "title", f"The heading should get its anchor as the address: {structures[0].address}"
+        assert structures[3].content[0].address == "quoted-code", "A nested heading should get its anchor as well"
+
+    def parse_test_outline__stream(self):
+        text = "# One\ntext\n\n## Two\n\n# One"
+        test_outline = []
+        test_structures = Parser().parse(RegexTokenizer().tokenize(text), test_outline)
+        outline = []
+        structures = list(Parser().parse_stream(RegexTokenizer().tokenize(text), outline))
+
+        assert structures == test_structures, f"Incorrect structures: {structures} expected: {test_structures}"
+        assert outline == test_outline, f"Incorrect outline: {outline} expected: {test_outline}"
+
+    def parse_test_outline__not_collected(self):
+        structures = Parser().parse(RegexTokenizer().tokenize("# Title"))
+        assert not hasattr(structures[0], "address"), "The heading should not get an anchor when the outline is not collected"
+
     def parse_test_atx_heading_2(self):
         parser = Parser()
         tokens = [[ Token("", Token.Type.GT), Token(" ", Token.Type.SPACE), Token("#", Token.Type.HASH),  Token(" ", Token.Type.SPACE), Token("Nested", Token.Type.TEXT), 
@@ -442,6 +509,144 @@ class ParserTest(unittest.TestCase):
         for i in range(len(test_structures)):
             assert test_structures[i] == structures[i], f"Incorrect structure found: {structures[i]} expected: {test_structures[i]} number {i}"
 
+    def parse_test_stream(self):
+        parser = Parser()
+        tokens = [[Token("#", Token.Type.HASH), Token(" ", Token.Type.SPACE), Token("Title", Token.Type.TEXT)],
+            [Token("Some", Token.Type.TEXT), Token(" ", Token.Type.SPACE), Token("text", Token.Type.TEXT)], [],
+            [Token("", Token.Type.GT), Token(" ", Token.Type.SPACE), Token("Quote", Token.Type.TEXT)]]
+        test_structures = parser.parse(tokens)
+        received = []
+
+        def lines():
+            # The first structure has to be handed back before the parser gets to see the blockquote line
+            for i, line in enumerate(tokens):
+                if i == 3:
+                    assert len(received) == 2, f"Finished structures were not yielded in time: {received}"
+                yield line
+
+        for structure in parser.parse_stream(lines()):
+            received.append(structure)
+
+        assert len(test_structures) == len(received), f"Incorrect number of parsed structures received: { len(received) } expected: { len(test_structures) }"
+        for i in range(len(test_structures)):
+            assert test_structures[i] == received[i], f"Incorrect structure found: {received[i]} expected: {test_structures[i]} number {i}"
+
+
+    def parse_test_token_columns(self):
+        text = "# Title\n\nSome *text* with a [link](http://example.com).\n\n> 1. quoted **list**\n>    item\n\n        code\tblock"
+        tokenizer = RegexTokenizer()
+        test_structures = Parser().parse(tokenizer.tokenize(text))
+
+        structures = Parser().parse(tokenizer.tokenize_columns(text))
+
+        assert len(test_structures) == len(structures), f"Incorrect number of parsed structures received: { len(structures) } expected: { len(test_structures) }"
+        for i in range(len(test_structures)):
+            assert test_structures[i] == structures[i], f"Incorrect structure found: {structures[i]} expected: {test_structures[i]} number {i}"
+
+    def parse_test_delimiter_runs(self):
+        tokenizer = RegexTokenizer()
+        test_data = [
+            ("***both***", [Structure([Structure([Structure("both", Structure.Type.TEXT)], Structure.Type.STRONG)], Structure.Type.EMPHASIS)]),
+            ("*em **strong** em*", [Structure([Structure("em ", Structure.Type.TEXT), Structure([Structure("strong", Structure.Type.TEXT)], Structure.Type.STRONG),
+                Structure(" em", Structure.Type.TEXT)], Structure.Type.EMPHASIS)]),
+            ("**strong*", [Structure("*", Structure.Type.TEXT), Structure([Structure("strong", Structure.Type.TEXT)], Structure.Type.EMPHASIS)]),
+            ("*a **b*", [Structure("*a *", Structure.Type.TEXT), Structure([Structure("b", Structure.Type.TEXT)], Structure.Type.EMPHASIS)]),
+            ("a * not emphasis *", [Structure("a * not emphasis *", Structure.Type.TEXT)]),
+            ("*foo**bar**baz*", [Structure([Structure("foo", Structure.Type.TEXT), Structure([Structure("bar", Structure.Type.TEXT)], Structure.Type.STRONG),
+                Structure("baz", Structure.Type.TEXT)], Structure.Type.EMPHASIS)]),
+            ("*foo**bar*", [Structure([Structure("foo**bar", Structure.Type.TEXT)], Structure.Type.EMPHASIS)]),
+            ("_mixed*", [Structure("_mixed*", Structure.Type.TEXT)]),
+        ]
+        for text, content in test_data:
+            test_structures = [Structure(content, Structure.Type.PARAGRAPH)]
+            structures = Parser().parse(tokenizer.tokenize(text))
+            assert test_structures == structures, f"Incorrect structures for {text}: {structures} expected: {test_structures}"
+
+    def parse_test_delimiter_runs__intraword(self):
+        text = "snake_case_name and a*b*c"
+        test_structures = [Structure([Structure("snake_case_name and a", Structure.Type.TEXT), Structure([Structure("b", Structure.Type.TEXT)], Structure.Type.EMPHASIS),
+            Structure("c", Structure.Type.TEXT)], Structure.Type.PARAGRAPH)]
+        structures = Parser().parse(RegexTokenizer().tokenize(text))
+
+        assert test_structures == structures, f"Incorrect structures: {structures} expected: {test_structures}"
+
+    def parse_test_delimiter_runs__multiline(self):
+        text = "Some *emphasis\nacross* lines"
+        structures = Parser().parse(RegexTokenizer().tokenize(text))
+
+        emphasis = structures[0].content[1]
+        assert emphasis.kind is Structure.Type.EMPHASIS, f"Emphasis spanning two lines was not recognized: {structures}"
+
+    def parse_test_delimiter_runs__adversarial(self):
+        # Neither of the runs can be matched, every closer has to give up without searching through all the previous runs
+        count = 50000
+        structures = Parser().parse(RegexTokenizer().tokenize("*a " * count + "**b* " * count))
+
+        text = "".join(structure.content for structure in structures[0].content if structure.kind is Structure.Type.TEXT)
+        emphasis = [structure for structure in structures[0].content if structure.kind is Structure.Type.EMPHASIS]
+        assert len(emphasis) == count, f"Incorrect number of emphasis structures: {len(emphasis)} expected: {count}"
+        assert text.count("*") == count * 2, "Unmatched delimiters should be kept as text"
+
+    def parse_test_deep_nesting(self):
+        # The nesting is deeper than the recursion limit, the block-level structures have to be opened and closed without recursion
+        depth = sys.getrecursionlimit() + 100
+        line = "> " * depth + "text"
+        structures = Parser().parse(RegexTokenizer().tokenize(line + "\n" + line))
+
+        structure = structures[0]
+        for i in range(depth):
+            assert structure.kind is Structure.Type.BLOCKQUOTE and len(structure.content) == 1, f"Incorrect structure at depth {i}: {structure.kind}"
+            structure = structure.content[0]
+        test_structure = Parser().parse(RegexTokenizer().tokenize("> text\n> text"))[0].content[0]
+        assert structure == test_structure, f"Incorrect innermost structure: {structure} expected: {test_structure}"
+
+    def parse_test_reference_links(self):
+        text = "[Foo  Bar]: /url \"Title\"\n[baz]: <a b>\n\n[text][foo bar], [baz][] and [BAZ]"
+        test_structures = [Structure([Structure([Structure("text", Structure.Type.TEXT)], Structure.Type.LINK), Structure(", ", Structure.Type.TEXT),
+            Structure([Structure("baz", Structure.Type.TEXT)], Structure.Type.LINK), Structure(" and ", Structure.Type.TEXT),
+            Structure([Structure("BAZ", Structure.Type.TEXT)], Structure.Type.LINK)], Structure.Type.PARAGRAPH)]
+        structures = Parser().parse(RegexTokenizer().tokenize(text))
+
+        assert test_structures == structures, f"Incorrect structures: {structures} expected: {test_structures}"
+        links = [structures[0].content[i] for i in [0, 2, 4]]
+        assert [link.address for link in links] == ["/url", "a b", "a b"], f"Incorrect addresses: {[link.address for link in links]}"
+        assert links[0].title == "Title" and not hasattr(links[1], "title"), "Incorrect titles"
+
+    def parse_test_reference_links__forward(self):
+        text = "> see [label]\n\n- [label]: /first\n\n[label]: /second"
+        structures = Parser().parse(RegexTokenizer().tokenize(text))
+
+        link = structures[0].content[1]
+        assert link.kind is Structure.Type.LINK and link.address == "/first", f"The first definition should be used: {structures}"
+        assert structures[1].content[0].content == [], f"The definition should not produce any content: {structures[1]}"
+
+    def parse_test_reference_links__undefined(self):
+        # Undefined references stay text, as does a definition that would interrupt a paragraph
+        text = "a [x] b [y][z] c *[d]* e\n[x]: /x"
+        test_structures = [Structure([Structure("a [x] b [y][z] c ", Structure.Type.TEXT), Structure([Structure("[d]", Structure.Type.TEXT)], Structure.Type.EMPHASIS),
+            Structure(" e[x]: /x", Structure.Type.TEXT)], Structure.Type.PARAGRAPH)]
+        structures = Parser().parse(RegexTokenizer().tokenize(text))
+
+        assert test_structures == structures, f"Incorrect structures: {structures} expected: {test_structures}"
+
+    def parse_test_reference_links__unfinished_text(self):
+        # Brackets whose text was saved into other structures are not a link and their text must not leak into the text of the next link
+        test_data = [("x [a *b* c] y [d]\n\n[d]: /d", "d"), ("[a `b` c][lbl]\n\n[lbl]: /u", "lbl"), ("[a\n\nb] [d]\n\n[d]: /d", "d")]
+        for text, test_text in test_data:
+            structures = Parser().parse(RegexTokenizer().tokenize(text))
+            links = [structure for structure in structures[-1].content if structure.kind is Structure.Type.LINK]
+            assert len(links) == 1 and links[0].content == [Structure(test_text, Structure.Type.TEXT)], f"Incorrect link for {text!r}: {links}"
+
+    def parse_test_reference_links__stream(self):
+        text = "\n\n".join(f"paragraph [{i}]" for i in range(1000)) + "\n\n" + "\n".join(f"[{i}]: /{i}" for i in range(1000))
+        parser = Parser()
+        structures = list(parser.parse_stream(RegexTokenizer().tokenize(text)))
+
+        assert structures == parser.parse(RegexTokenizer().tokenize(text)), "Streamed structures should be the same as the parsed ones"
+        addresses = [structure.content[1].address for structure in structures]
+        assert addresses == [f"/{i}" for i in range(1000)], "Every forward reference should be resolved"
+
+        
 
         
 
@@ -3,8 +3,8 @@ import os
 # Add parent directory to PATH because of imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
 
-from parser import Parser, Structure, Stack
-from tokenizer import Token
+from parser import Parser, Structure, Stack, ContextStack
+from tokenizer import Token, SpanToken
 import unittest
 
 class ParserTest2(unittest.TestCase):
@@ -199,6 +199,20 @@ class ParserTest2(unittest.TestCase):
         assert structure.scope == None, f"test failed: {structure.scope} expected: None"
         assert index == 2, f"test failed: {index} expected: {2}"
 
+    def test_Parser__open_recursively__from_index(self):
+        types = [Structure.Type.LIST_ITEM, Structure.Type.UNORDERED_LIST, Structure.Type.BLOCKQUOTE]
+        tokens = [Token("", Token.Type.GT), Token(" ", Token.Type.SPACE), Token("", Token.Type.GT), Token(" ", Token.Type.SPACE), Token("", Token.Type.DASH),
+            Token(" ", Token.Type.SPACE), Token("texto", Token.Type.TEXT)]
+        parser = Parser()
+        parser._Parser__init()
+
+        index = parser._Parser__open_recursively(tokens, 2)
+        assert index == 6, f"test failed: {index} expected: {6}"
+        for i in range(len(types)):
+            structure = parser.context_stack.poll()
+            assert structure.kind == types[i], f"test {i+1} failed: {structure.kind} expected: {types[i]}"
+        assert parser.context_stack.get_last().kind is Structure.Type.SUPER, "Only the structures after the index should be opened"
+
     def test_Parser__open_recursively__should_open_codeblock(self):
         types = [ Structure.Type.TEXT, Structure.Type.CODEBLOCK]
         scopes = [Structure.Scope.CODEBLOCK, None]
@@ -399,7 +413,7 @@ class ParserTest2(unittest.TestCase):
 
     def test_Parser__get_scope_hierarchy(self):
         parser = Parser()
-        stack = Stack()
+        stack = ContextStack()
         
         stack.push(Structure([], Structure.Type.SUPER))
         stack.push(Structure([], Structure.Type.BLOCKQUOTE, stack.get_last()))
@@ -416,7 +430,7 @@ class ParserTest2(unittest.TestCase):
     
     def test_Parser__get_open_structure(self):
         parser = Parser()
-        stack = Stack()
+        stack = ContextStack()
         
         stack.push(Structure([], Structure.Type.SUPER))
         stack.push(Structure([], Structure.Type.BLOCKQUOTE, stack.get_last()))
@@ -466,9 +480,10 @@ class ParserTest2(unittest.TestCase):
             Token(" ", Token.Type.SPACE), Token("World", Token.Type.TEXT), Token("", Token.Type.EXCLAMATION_MARK)],
             [Token("Hello", Token.Type.TEXT), Token(" ", Token.Type.SPACE), Token("World", Token.Type.TEXT), Token("", Token.Type.EXCLAMATION_MARK)]]
         
-        output = test_tokens
+        index = 0
         for i in range(len(test_scopes)):
-            output = parser._Parser__shift_by_scope(output, test_scopes[i])
+            index = parser._Parser__shift_by_scope(test_tokens, test_scopes[i], False, index)
+            output = test_tokens[index:]
             assert len(output) == len(test_outputs[i])
             assert output == test_outputs[i], f"Shifting by scope failed: {output} expected: {test_outputs[i]} for test {i+1}"
        
@@ -492,6 +507,27 @@ class ParserTest2(unittest.TestCase):
         
         string = parser._Parser__stringify_tokens(test_tokens)
         assert test_string == string, f"Stringifying tokens failed: \"{string}\" expected: \"{test_string}\""
+
+    def test_Parser__stringify_tokens__span_tokens(self):
+        parser = Parser()
+        source = "Hello  there, **world**"
+        test_tokens = [SpanToken(source, 0, 5, Token.Type.TEXT), SpanToken(source, 5, 7, Token.Type.SPACE), SpanToken(source, 7, 13, Token.Type.TEXT),
+            Token("", Token.Type.DASH), SpanToken(source, 13, 14, Token.Type.SPACE), SpanToken(source, 16, 21, Token.Type.TEXT)]
+        test_string = "Hello  there,- world"
+        
+        string = parser._Parser__stringify_tokens(test_tokens)
+        assert test_string == string, f"Stringifying tokens failed: \"{string}\" expected: \"{test_string}\""
+
+    def test_Parser__stringify_tokens__bridged_span_tokens(self):
+        parser = Parser()
+        source = "Call (me). Now\\!"
+        test_tokens = [SpanToken(source, 0, 4, Token.Type.TEXT), SpanToken(source, 4, 5, Token.Type.SPACE), Token.shared[Token.Type.LPAREN],
+            SpanToken(source, 6, 8, Token.Type.TEXT), Token.shared[Token.Type.RPAREN], Token.shared[Token.Type.PERIOD], SpanToken(source, 11, 14, Token.Type.TEXT),
+            Token.shared[Token.Type.EXCLAMATION_MARK], Token.shared[Token.Type.EXCLAMATION_MARK]]
+        test_string = "Call (me).Now!!"
+        
+        string = parser._Parser__stringify_tokens(test_tokens)
+        assert test_string == string, f"Stringifying tokens failed: \"{string}\" expected: \"{test_string}\""
         
         
         
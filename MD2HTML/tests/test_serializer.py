@@ -0,0 +1,61 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+
+import serializer
+from tokenizer import RegexTokenizer
+from parser import Parser
+from translator import Translator
+import unittest
+import io
+
+class SerializerTest(unittest.TestCase):
+
+    def parse(self, text):
+        return Parser().parse(RegexTokenizer().tokenize(text))
+
+    def test_serializer_dump(self):
+        text = "# Title\n\nSome *text* and [a link](address)\n\n- item\n- **item**\n\n***\n\n`code`\n"
+        test_output = self.parse(text)
+        file = io.BytesIO()
+        serializer.dump(test_output, file)
+        file.seek(0)
+        output = serializer.load(file)
+
+        assert list(output) == test_output, f"Incorrect structures: {list(output)} expected: {test_output}"
+        assert Translator().translate(output) == Translator().translate(test_output), "Incorrect translation of the loaded structures"
+
+    def test_serializer_dumps__unicode(self):
+        text = "Žluťoučký *kůň* [odkaz](ádresa)\n\n> úpěl\n"
+        test_output = self.parse(text)
+        output = serializer.loads(serializer.dumps(test_output))
+
+        assert list(output) == test_output, f"Incorrect structures: {list(output)} expected: {test_output}"
+        assert output[0].content[3].address == "ádresa", f"Incorrect address: {output[0].content[3].address}"
+
+    def test_serializer_dumps__heading_anchors(self):
+        structures = Parser().parse(RegexTokenizer().tokenize("# Title\n\n## Žluťoučký kůň\n"), [])
+        test_output = Translator().translate(structures)
+        output = Translator().translate(serializer.loads(serializer.dumps(structures)))
+
+        assert output == test_output, f"The anchors of the headings should be kept: {output} expected: {test_output}"
+
+    def test_serializer_dumps__documents(self):
+        for name in ["docs.md", "in.md"]:
+            with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "documents", name)) as file:
+                test_output = self.parse(file.read())
+            data = serializer.dumps(test_output)
+            output = serializer.loads(data)
+            assert list(output) == test_output, f"Incorrect structures of {name}"
+            assert serializer.dumps(output) == data, f"Serializing the loaded structures of {name} should give the same data"
+
+    def test_serializer_loads__invalid(self):
+        data = serializer.dumps(self.parse("Some *text*\n"))
+        for invalid in [b"", b"not a serialized document at all, just some bytes", data[:-3], data[:8] + b"\xff" + data[9:]]:
+            with self.assertRaises(serializer.FormatError):
+                serializer.loads(invalid)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+
+import server
+from server import RenderServer
+from tests.helpers import convert
+import unittest
+import asyncio
+import json
+
+class RenderServerTest(unittest.TestCase):
+
+    async def request(self, port, method, target, body=b""):
+        """
+        Sends a single request to the server and reads the response.
+        Returns a tuple (status, headers, body).
+        """
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        data = b""
+        while True:
+            size = int(await reader.readline(), 16)
+            data += await reader.readexactly(size + 2)
+            data = data[:-2]
+            if size == 0:
+                break
+        writer.close()
+        return status, headers, data
+
+    def serve(self, test, **options):
+        """
+        Runs the coroutine function @test with a started server and its port.
+        """
+        async def run():
+            render_server = RenderServer(workers=1, **options)
+            await render_server.start("127.0.0.1", 0)
+            try:
+                await test(render_server, render_server.server.sockets[0].getsockname()[1])
+            finally:
+                await render_server.close()
+        asyncio.run(run())
+
+    def test_RenderServer_render(self):
+        async def test(render_server, port):
+            text = "# Title\n\nSome *text* with a [link](https://example.com) & more\n\n- item\n" * 2000
+            status, headers, body = await self.request(port, "POST", "/render", text.encode("utf-8"))
+            assert status == 200, f"Incorrect status: {status}"
+            assert headers["content-type"] == "text/html; charset=utf-8", f"Incorrect content type: {headers}"
+            assert body.decode("utf-8") == convert(text), "The output should be the same as the output of the converter"
+            assert len(body) > server.piece_size, "The output should be sent in more than one chunk"
+
+            status, headers, body = await self.request(port, "POST", "/render", "Žluťoučký *kůň*".encode("utf-8"))
+            assert body.decode("utf-8") == convert("Žluťoučký *kůň*"), f"Incorrect output: {body}"
+        self.serve(test)
+
+    def test_RenderServer_errors(self):
+        async def test(render_server, port):
+            status, headers, body = await self.request(port, "GET", "/nothing")
+            assert status == 404, f"Incorrect status: {status}"
+            status, headers, body = await self.request(port, "GET", "/render")
+            assert status == 405, f"Incorrect status: {status}"
+            status, headers, body = await self.request(port, "POST", "/render", b"\xff\xfe")
+            assert status == 400, f"Incorrect status: {status}"
+            status, headers, body = await self.request(port, "POST", "/render", b"x" * 101)
+            assert status == 413, f"Incorrect status: {status}"
+        self.serve(test, max_body=100)
+
+    def test_RenderServer_backpressure(self):
+        async def test(render_server, port):
+            # Keep the only worker busy, so that the requests have to wait for it
+            await render_server.slots.acquire()
+            waiting = asyncio.ensure_future(self.request(port, "POST", "/render", b"*waiting*"))
+            while render_server.queued == 0:
+                await asyncio.sleep(0.01)
+            status, headers, body = await self.request(port, "POST", "/render", b"*rejected*")
+            assert status == 503 and headers["retry-after"] == "1", f"A request should be rejected when the queue is full: {status} {headers}"
+
+            status, headers, body = await self.request(port, "GET", "/stats")
+            stats = json.loads(body)
+            assert stats["queue_depth"] == 1 and stats["rejected"] == 1, f"Incorrect stats: {stats}"
+
+            render_server.slots.release()
+            status, headers, body = await waiting
+            assert status == 200 and body == convert("*waiting*").encode("utf-8"), "The waiting request should be served once the worker is free"
+            status, headers, body = await self.request(port, "GET", "/stats")
+            stats = json.loads(body)
+            assert stats["queue_depth"] == 0 and stats["requests"] == 2 and stats["latency"]["samples"] == 1, f"Incorrect stats: {stats}"
+            assert stats["latency"]["p50"] == stats["latency"]["p99"] > 0, f"Incorrect latency: {stats}"
+        self.serve(test, queue_size=1)
+
+    def test_render__line_endings(self):
+        text = "---\ntitle: Lines\n---\n# Title\n\nSome *text*\nmore text\n\n- item\n"
+        test_output = convert("# Title\n\nSome *text*\nmore text\n\n- item\n")
+        for newline in ["\n", "\r\n", "\r"]:
+            output = server.render(text.replace("\n", newline))
+            assert output == test_output, f"Incorrect output with {newline!r} line endings: {output!r} expected: {test_output!r}"
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert server.percentile(values, 0.5) == 50, "Incorrect median"
+        assert server.percentile(values, 0.99) == 99, "Incorrect 99th percentile"
+        assert server.percentile([3], 0.99) == 3, "Incorrect percentile of a single value"
+        assert server.percentile([], 0.5) is None, "There is no percentile of no values"
+
+    def test_parse_address(self):
+        assert server.parse_address("localhost:8080") == ("localhost", 8080, None)
+        assert server.parse_address("8080") == ("127.0.0.1", 8080, None)
+        assert server.parse_address("unix:/tmp/md2html.sock") == (None, None, "/tmp/md2html.sock")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+
+from source import MappedSource, ChunkedWriter
+from tokenizer import RegexTokenizer
+import unittest
+import tempfile
+import threading
+import io
+
+class MappedSourceTest(unittest.TestCase):
+
+    def write_file(self, data):
+        file = tempfile.NamedTemporaryFile(suffix=".md", delete=False)
+        file.write(data)
+        file.close()
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_MappedSource__getitem__(self):
+        path = self.write_file("Příliš žluťoučký kůň".encode("utf-8"))
+
+        with MappedSource(path) as source:
+            test_output = "Příliš"
+            output = source[0:len(test_output.encode("utf-8"))]
+            assert output == test_output, f"Incorrectly decoded range: {output} expected: {test_output}"
+            assert len(source) == len("Příliš žluťoučký kůň".encode("utf-8")), f"Incorrect length of the source: {len(source)}"
+
+    def test_MappedSource_endswith(self):
+        path = self.write_file(b"    code")
+
+        with MappedSource(path) as source:
+            assert source.endswith("  ", 0, 4) == True, "The range should end with two spaces"
+            assert source.endswith("e", 0, 4) == False, "The range should not end with 'e'"
+            assert source.endswith("      ", 0, 4) == False, "The value is longer than the range"
+
+    def test_MappedSource__empty_file(self):
+        path = self.write_file(b"")
+
+        with MappedSource(path) as source:
+            assert len(source) == 0, f"Incorrect length of an empty source: {len(source)}"
+            assert source[0:0] == "", "An empty source should produce an empty string"
+
+    def test_MappedSource_release(self):
+        text = "".join(f"Line *{i}* with `code` and ščř\n" for i in range(20000))
+        path = self.write_file(text.encode("utf-8"))
+        test_output = RegexTokenizer().tokenize(text)
+
+        with MappedSource(path) as source:
+            source.release_size = 4096
+            output = list(RegexTokenizer().tokenize_mapped(source))
+            assert source.released > 0, "The scanned pages should have been released"
+            assert output == test_output, "Releasing the pages should not change the tokens"
+            assert source[0:len("Line *0*".encode("utf-8"))] == "Line *0*", "The released bytes should still be readable"
+
+    @unittest.skipUnless(hasattr(os, "mkfifo"), "Named pipes are not supported")
+    def test_MappedSource__pipe(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "pipe")
+        os.mkfifo(path)
+        def write():
+            with open(path, "wb") as file:
+                file.write("# Příliš\n".encode("utf-8"))
+        thread = threading.Thread(target=write)
+        thread.start()
+
+        with MappedSource(path) as source:
+            thread.join()
+            assert source[0:len(source)] == "# Příliš\n", f"Incorrect content of a pipe: {source[0:len(source)]}"
+
+    def test_ChunkedWriter(self):
+        fp = io.BytesIO()
+        writer = ChunkedWriter(fp, 10)
+        writer.write("<p>")
+        writer.write("žluť")
+        assert fp.getvalue() == b"", "Nothing should be written before a chunk is full"
+        writer.write("</p><p>x</p>")
+        assert fp.getvalue() == "<p>žluť</p><p>x</p>".encode("utf-8"), f"A full chunk should be written: {fp.getvalue()}"
+        writer.write("<hr />")
+        writer.flush()
+        assert fp.getvalue() == "<p>žluť</p><p>x</p><hr />".encode("utf-8"), f"Flushing should write the rest: {fp.getvalue()}"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+
+from stats import ConversionStats
+from main import convert
+from tokenizer import RegexTokenizer
+import unittest
+import tempfile
+import json
+
+class ConversionStatsTest(unittest.TestCase):
+
+    def convert(self, text, stats):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "in.md")
+            with open(source, "w", encoding="utf-8") as file:
+                file.write(text)
+            target = convert(source, os.path.join(directory, "out.html"), stats)
+            with open(target, "rb") as file:
+                return file.read()
+
+    def test_ConversionStats(self):
+        text = "# Title\n\nSome *text* and ünïcode\n\n> - nested **list**\n"
+        stats = ConversionStats()
+        output = self.convert(text, stats)
+
+        tokens = RegexTokenizer().tokenize(text)
+        assert stats.lines == len(tokens), f"Incorrect number of lines: {stats.lines} expected: {len(tokens)}"
+        assert stats.tokens == sum(len(line) for line in tokens), f"Incorrect number of tokens: {stats.tokens}"
+        # HEADING_1, TEXT, PARAGRAPH, TEXT, EMPHASIS, TEXT, TEXT, BLOCKQUOTE, UNORDERED_LIST, LIST_ITEM, TEXT, STRONG, TEXT
+        assert stats.structures == 13, f"Incorrect number of structures: {stats.structures}"
+        assert stats.max_depth == 5, f"Incorrect depth: {stats.max_depth}"
+        assert stats.bytes_read == len(text.encode("utf-8")), f"Incorrect number of bytes read: {stats.bytes_read}"
+        assert stats.bytes_written == len(output), f"Incorrect number of bytes written: {stats.bytes_written} expected: {len(output)}"
+        assert stats.peak_memory is None, "The memory should only be traced on demand"
+
+    def test_ConversionStats__times(self):
+        stats = ConversionStats(trace_memory=True)
+        with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "documents", "docs.md")) as file:
+            self.convert(file.read(), stats)
+
+        report = json.loads(stats.to_json())
+        for stage in ConversionStats.stages:
+            assert report["stages"][stage]["wall"] >= 0 and report["stages"][stage]["cpu"] >= 0, f"Negative time of {stage}"
+        total = sum(report["stages"][stage]["wall"] for stage in ConversionStats.stages)
+        assert abs(total - report["total"]["wall"]) < 1e-6, f"The times of the stages should add up to the total time: {total} {report['total']['wall']}"
+        assert report["tokens_per_second"] > 0, "Incorrect throughput"
+        assert report["peak_memory"] > 0, "The peak memory should be traced"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+
+from tokenizer import RegexTokenizer
+from parser import Parser
+from translator import Translator
+from concurrent.futures import ThreadPoolExecutor
+import unittest
+import random
+
+class ThreadingTest(unittest.TestCase):
+
+    def read_documents(self):
+        documents = []
+        directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "documents")
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".md"):
+                with open(os.path.join(directory, name)) as file:
+                    documents.append(file.read())
+        return documents
+
+    def test_shared_instances(self):
+        documents = self.read_documents()
+        # Make every document different so that mixed up state would show in the output
+        random.seed(16)
+        documents = [documents[i % len(documents)] + f"\n\nDocument *{i}* [link](address{i})\n" for i in range(64)]
+        random.shuffle(documents)
+        tokenizer, parser, translator = RegexTokenizer(), Parser(), Translator()
+
+        test_outputs = [Translator().translate(Parser().parse(RegexTokenizer().tokenize(text))) for text in documents]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            outputs = list(executor.map(lambda text: translator.translate(parser.parse(tokenizer.tokenize(text))), documents))
+            streamed_outputs = list(executor.map(lambda text: translator.translate(parser.parse_stream(tokenizer.tokenize(text))), documents))
+
+        for i in range(len(documents)):
+            assert outputs[i] == test_outputs[i], f"Incorrect output of document {i} converted concurrently"
+            assert streamed_outputs[i] == test_outputs[i], f"Incorrect output of document {i} streamed concurrently"
+        assert not hasattr(parser, "context_stack"), "The shared parser should not hold any parse state"
+
+    def test_interleaved_streams(self):
+        documents = ["# Title\n\nSome *text*\n\n- item\n- item\n", "> quote\n> *more*\n\n1. one\n2. two\n"]
+        parser, tokenizer = Parser(), RegexTokenizer()
+        test_outputs = [parser.parse(tokenizer.tokenize(text)) for text in documents]
+
+        # Both generators are consumed at the same time, each of them needs its own parse state
+        streams = [parser.parse_stream(tokenizer.tokenize(text)) for text in documents]
+        outputs = [[], []]
+        finished = [False, False]
+        while not all(finished):
+            for i, stream in enumerate(streams):
+                structure = next(stream, None)
+                if structure is None:
+                    finished[i] = True
+                else:
+                    outputs[i].append(structure)
+
+        for i in range(len(documents)):
+            assert outputs[i] == test_outputs[i], f"Incorrect structures of stream {i}: {outputs[i]} expected: {test_outputs[i]}"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,8 +3,12 @@ import os
 # Add parent directory to PATH because of imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
 
-from tokenizer import Tokenizer, Token
+from tokenizer import Tokenizer, RegexTokenizer, Token, SpanToken, TokenColumns
+from source import MappedSource
 import unittest
+import io
+import random
+import tempfile
 
 class TokenizerTest(unittest.TestCase):
 
@@ -46,6 +50,133 @@ class TokenizerTest(unittest.TestCase):
         for i in range(len(test_tokens)):
             if not test_tokens[i] == tokens[i]:
                 raise AssertionError(f"expected token: {str(test_tokens[i])} actual: {str(tokens[i])} number {i}")
+
+
+    def test_Tokenizer_tokenize_stream(self):
+        tokenizer = Tokenizer()
+        test_string = "# Heading\n\n> quote with **strong** text\n\t1. item\n"
+        test_tokens = tokenizer.tokenize(test_string)
+
+        tokens = list(tokenizer.tokenize_stream(io.StringIO(test_string)))
+
+        assert len(tokens) == len(test_tokens), f"incorrect number of lines - expected: {len(test_tokens)} actual: {len(tokens)}"
+        for i in range(len(test_tokens)):
+            assert tokens[i] == test_tokens[i], f"expected line: {test_tokens[i]} actual: {tokens[i]} number {i}"
+
+
+
+    def test_Tokenizer_tokenize__shared_tokens(self):
+        tokenizer = Tokenizer()
+        tokens = tokenizer.tokenize("(a.b) (c.d)")[0]
+
+        assert tokens[0] is Token.shared[Token.Type.LPAREN], f"single-character token is not shared: {tokens[0]}"
+        assert tokens[2] is tokens[8], f"single-character tokens of the same type are not the same instance: {tokens[2]} {tokens[8]}"
+        assert not hasattr(tokens[1], "__dict__"), "tokens should not have a __dict__"
+
+
+class TokenTest(unittest.TestCase):
+
+    def test_SpanToken_value(self):
+        source = "some    text"
+        token = SpanToken(source, 4, 8, Token.Type.SPACE)
+
+        assert token.value == "    ", f"incorrect value: '{token.value}' expected: '    '"
+        assert token == Token("    ", Token.Type.SPACE), f"span token differs from the equal token: {token}"
+        token.value = token.value[2:]
+        assert (token.source, token.start, token.end) == (source, 6, 8), f"cutting the value should move the span start: {token.start} {token.end}"
+        token.value = "other"
+        assert token.value == "other", f"incorrect value: '{token.value}' expected: 'other'"
+        assert token.get_length() == 5, f"incorrect length: {token.get_length()} expected: 5"
+        assert Token("   ", Token.Type.SPACE).get_length() == 3, "incorrect length of a plain token"
+
+    def test_TokenColumns_line(self):
+        columns = TokenColumns("a\tb.")
+        columns.append(Token.Type.TAB, 1, 2)
+        columns.append(Token.Type.TEXT, 0, 3)
+        columns.append(Token.Type.PERIOD, 3, 4)
+        columns.end_line()
+        test_tokens = [Token("    ", Token.Type.SPACE), Token("a\tb", Token.Type.TEXT), Token("", Token.Type.PERIOD)]
+
+        tokens = columns.line(0)
+
+        assert len(columns) == 1, f"incorrect number of lines: {len(columns)} expected: 1"
+        assert tokens == test_tokens, f"expected tokens: {test_tokens} actual: {tokens}"
+        assert isinstance(tokens[1], SpanToken) and tokens[2] is Token.shared[Token.Type.PERIOD], f"the tokens were not created compactly: {tokens}"
+
+
+class RegexTokenizerTest(unittest.TestCase):
+    """
+    Differential tests of the RegexTokenizer against the reference Tokenizer.
+    """
+
+    def assert_same_tokens(self, text):
+        test_tokens = Tokenizer().tokenize(text)
+        tokens = RegexTokenizer().tokenize(text)
+        self.assert_same_lines(text, tokens, test_tokens)
+        tokens = list(RegexTokenizer().tokenize_columns(text))
+        self.assert_same_lines(text, tokens, test_tokens)
+
+    def assert_same_lines(self, text, tokens, test_tokens):
+        assert len(tokens) == len(test_tokens), f"incorrect number of lines for {repr(text)} - expected: {len(test_tokens)} actual: {len(tokens)}"
+        for i in range(len(test_tokens)):
+            assert len(tokens[i]) == len(test_tokens[i]), f"incorrect number of tokens for {repr(text)} - expected: {test_tokens[i]} actual: {tokens[i]}"
+            assert tokens[i] == test_tokens[i], f"incorrect tokens for {repr(text)} - expected: {test_tokens[i]} actual: {tokens[i]}"
+
+    def test_RegexTokenizer__tokenize_line(self):
+        tokenizer = RegexTokenizer()
+        test_string = ">\tword **Alice** ![  ](x){k}28"
+        tokens = []
+        test_tokens = []
+
+        tokenizer._RegexTokenizer__tokenize_line(test_string, tokens)
+        Tokenizer()._Tokenizer__tokenize_line(test_string, test_tokens)
+
+        assert tokens == test_tokens, f"expected tokens: {test_tokens} actual: {tokens}"
+
+    def test_RegexTokenizer_tokenize__spans(self):
+        test_string = "# Some **text**\nand    more"
+        tokens = RegexTokenizer().tokenize(test_string)
+
+        for line in tokens:
+            for token in line:
+                if token.kind in Token.single_character_types:
+                    continue
+                assert isinstance(token, SpanToken) and token.source is test_string, f"token does not point into the source text: {token}"
+        assert (tokens[1][1].start, tokens[1][1].end) == (19, 23), f"incorrect span of the token {tokens[1][1]}: {tokens[1][1].start} {tokens[1][1].end}"
+
+    def test_RegexTokenizer_tokenize_mapped(self):
+        test_strings = ["# Title\r\n\r\nSome *text*\r\n", "a\rb\n\tc", "x² and\t²\n1. Příliš\n", "trailing newline\n", "x"]
+        tokenizer = RegexTokenizer()
+        for text in test_strings:
+            file = tempfile.NamedTemporaryFile(delete=False)
+            file.write(text.encode("utf-8"))
+            file.close()
+            self.addCleanup(os.remove, file.name)
+            # Reading the file in text mode translates the line terminators
+            with open(file.name) as input_file:
+                test_tokens = tokenizer.tokenize(input_file.read())
+
+            with MappedSource(file.name) as source:
+                tokens = list(tokenizer.tokenize_mapped(source))
+                self.assert_same_lines(text, tokens, test_tokens)
+
+    def test_RegexTokenizer_tokenize__tabs_and_unicode_digits(self):
+        test_strings = ["a\tb", " \t  x", "##\t# title", "12\t3", "\t\t**bold**", "x²y", "1² + ٣", "line\nbreak\n", "tab at end\t", ""]
+        for text in test_strings:
+            self.assert_same_tokens(text)
+
+    def test_RegexTokenizer_tokenize__random_input(self):
+        alphabet = list(" \t#*_`\\<>!-+=()[]{}.'\":;0123456789abcXYZé²\r")
+        generator = random.Random(42)
+        for i in range(2000):
+            text = "".join(generator.choice(alphabet + ["\n"]) for j in range(generator.randint(0, 40)))
+            self.assert_same_tokens(text)
+
+    def test_RegexTokenizer_tokenize__documents(self):
+        documents = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "documents")
+        for name in ["in.md", "docs.md"]:
+            with open(os.path.join(documents, name)) as file:
+                self.assert_same_tokens(file.read())
                 
                 
 if __name__ == "__main__":
@@ -4,8 +4,11 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
 
 from translator import Translator
-from parser import Structure
+from parser import Structure, Parser, OutlineEntry
+from tokenizer import RegexTokenizer
+from arena import StructureArena
 import unittest
+import io
 
 class TranslatorTest(unittest.TestCase):
         
@@ -31,6 +34,16 @@ class TranslatorTest(unittest.TestCase):
         assert test_output == output, f"Incorrectly escaped string { output } expected: { test_output }"
     
     
+    def test_Translator__escape__entities(self):
+        translator = Translator()
+        
+        test_inputs = ["&&copy;", "&;", "&#169;", "&amp", "a & b; c", "&" + "a" * 32 + ";", "&" + "a" * 33 + ";", "&&&<<>>", "&Příliš;"]
+        test_outputs = ["&amp;&copy;", "&amp;;", "&amp;#169;", "&amp;amp", "a &amp; b; c", "&" + "a" * 32 + ";", "&amp;" + "a" * 33 + ";", "&amp;&amp;&amp;&lt;&lt;&gt;&gt;", "&Příliš;"]
+        
+        for i in range(len(test_inputs)):
+            output = translator._Translator__escape(test_inputs[i])
+            assert test_outputs[i] == output, f"Incorrectly escaped string { output } expected: { test_outputs[i] }"
+
     def test_Translator__translate_structure_1(self):
         translator = Translator()
         
@@ -127,6 +140,92 @@ class TranslatorTest(unittest.TestCase):
         
         assert test_output == output, f"Incorrectly translated or escaped structures { output } expected: { test_output }"
 
+    def test_Translator_translate__link_title(self):
+        translator = Translator()
+
+        link = Structure([Structure("Jim & Carry", Structure.Type.TEXT)], Structure.Type.LINK)
+        link.address = "/jim"
+        link.title = 'Jim "&" Carry'
+        test_output = '<p><a href="/jim" title="Jim &quot;&amp;&quot; Carry">Jim &amp; Carry</a></p>'
+
+        output = translator.translate([Structure([link], Structure.Type.PARAGRAPH)])
+
+        assert test_output == output, f"Incorrectly translated link { output } expected: { test_output }"
+
+    def test_Translator_translate__heading_anchors(self):
+        translator = Translator()
+        outline = []
+        structures = Parser().parse(RegexTokenizer().tokenize('# Title\n\n> ## A "quoted" <heading>\n\n# Title'), outline)
+        test_output = ('<h1 id="title">Title</h1><blockquote><h2 id="a-quoted-heading">A "quoted" &lt;heading&gt;</h2></blockquote>'
+            '<h1 id="title-1">Title</h1>')
+
+        output = translator.translate(structures)
+        assert output == test_output, f"Incorrectly translated headings {output} expected: {test_output}"
+        arena = StructureArena()
+        for structure in structures:
+            arena.append(structure)
+        output = translator.translate(arena)
+        assert output == test_output, f"Incorrectly translated headings of an arena {output} expected: {test_output}"
+        # The views of the structures of an arena can be used in place of the structures
+        output = translator.translate(list(arena))
+        assert output == test_output, f"Incorrectly translated views of headings {output} expected: {test_output}"
+        arena = StructureArena()
+        for structure in Parser().parse(RegexTokenizer().tokenize("# Title\n\nSome *text*")):
+            arena.append(structure)
+        output = translator.translate(list(arena))
+        assert output == "<h1>Title</h1><p>Some <em>text</em></p>", f"Incorrectly translated views of headings without anchors {output}"
+
+    def test_Translator_translate_outline(self):
+        translator = Translator()
+        outline = [OutlineEntry(1, "A & B", "a--b", 0), OutlineEntry(2, "C", "c", 2), OutlineEntry(4, "D", "d", 4), OutlineEntry(3, "E", "e", 6),
+            OutlineEntry(1, "F", "f", 8)]
+        test_output = ('<nav class="toc"><ul><li><a href="#a--b">A &amp; B</a><ul><li><a href="#c">C</a><ul><li><a href="#d">D</a></li>'
+            '<li><a href="#e">E</a></li></ul></li></ul></li><li><a href="#f">F</a></li></ul></nav>')
+
+        output = translator.translate_outline(outline)
+        assert output == test_output, f"Incorrectly translated outline {output} expected: {test_output}"
+        assert translator.translate_outline([]) == "", "An empty outline should give no table of contents"
+
+    def test_Translator_translate__deep_nesting(self):
+        translator = Translator()
+        depth = 200
+
+        structure = Structure([Structure([Structure("%s & deep", Structure.Type.TEXT)], Structure.Type.PARAGRAPH)], Structure.Type.BLOCKQUOTE)
+        for i in range(depth - 1):
+            structure = Structure([structure], Structure.Type.BLOCKQUOTE)
+        test_output = "<blockquote>" * depth + "<p>%s &amp; deep</p>" + "</blockquote>" * depth
+
+        output = translator.translate([structure])
+
+        assert test_output == output, f"Incorrectly translated nested structures { output } expected: { test_output }"
+
+    def test_Translator_translate_to(self):
+        translator = Translator()
+        
+        test_structures = [Structure([Structure("Jim &amp; ", Structure.Type.TEXT), Structure([Structure("Carry", Structure.Type.TEXT)], Structure.Type.EMPHASIS)], Structure.Type.PARAGRAPH),
+            Structure(None, Structure.Type.HR), Structure([Structure("John > Doe", Structure.Type.TEXT)], Structure.Type.HEADING_3)]
+        test_output = translator.translate(test_structures)
+        output = io.StringIO()
+        
+        translator.translate_to(iter(test_structures), output)
+        
+        assert test_output == output.getvalue(), f"Incorrectly translated structures { output.getvalue() } expected: { test_output }"
+
+
+    def test_Translator_translate_to__beyond_recursion_limit(self):
+        translator = Translator()
+        depth = sys.getrecursionlimit() * 2
+
+        structure = Structure([Structure("Deep", Structure.Type.TEXT)], Structure.Type.PARAGRAPH)
+        for i in range(depth):
+            structure = Structure([structure, Structure(None, Structure.Type.HR)], Structure.Type.BLOCKQUOTE)
+        test_output = "<blockquote>" * depth + "<p>Deep</p>" + "<hr /></blockquote>" * depth
+        output = io.StringIO()
+
+        translator.translate_to([structure], output)
+
+        assert test_output == output.getvalue(), f"Incorrectly translated deeply nested structures"
+
 
 if __name__ == "__main__":
     unittest.main()
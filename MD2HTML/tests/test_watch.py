@@ -0,0 +1,90 @@
+import sys
+import os
+# Add parent directory to PATH because of imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+
+from watch import Watcher, print_results
+from tests.helpers import convert
+import unittest
+import tempfile
+import io
+import contextlib
+
+class WatcherTest(unittest.TestCase):
+
+    def write(self, path, text, mtime):
+        with open(path, "w") as file:
+            file.write(text)
+        # The modification time is set explicitly, so that a change is noticed even on file systems with a coarse time resolution
+        os.utime(path, ns=(mtime, mtime))
+
+    def read(self, path):
+        with open(path) as file:
+            return file.read()
+
+    def test_Watcher_check(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "src")
+            target = os.path.join(directory, "out")
+            os.makedirs(os.path.join(source, "sub"))
+            self.write(os.path.join(source, "a.md"), "# A\n\nSome *text*\n", 10**9)
+            self.write(os.path.join(source, "sub", "b.md"), "- item\n", 10**9)
+            watcher = Watcher(source, target, debounce=0)
+
+            results = watcher.check()
+            assert [os.path.relpath(result.target, target) for result in results] == ["a.html", os.path.join("sub", "b.html")], "All files should be converted at first"
+            assert all(result.error is None for result in results), "The conversion should succeed"
+            assert watcher.check() == [], "Unchanged files should not be converted again"
+
+            self.write(os.path.join(source, "a.md"), "# A\n\nSome *edited* text\n", 2 * 10**9)
+            results = watcher.check()
+            assert [result.source for result in results] == [os.path.join(source, "a.md")], f"Only the changed file should be converted: {results}"
+            output = self.read(os.path.join(target, "a.html"))
+            assert output == convert("# A\n\nSome *edited* text\n"), f"Incorrect output: {output}"
+
+    def test_Watcher_check__size(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "in.md")
+            with open(source, "wb") as file:
+                file.write("Žluťoučký *kůň*\r\n".encode("utf-8"))
+            watcher = Watcher(source, os.path.join(directory, "out.html"), debounce=0)
+
+            results = watcher.check()
+            assert len(results) == 1 and results[0].size == os.path.getsize(source), f"The size should be in bytes: {results}"
+
+    def test_Watcher_check__debounce(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "in.md")
+            target = os.path.join(directory, "out.html")
+            self.write(source, "text\n", 10**9)
+            watcher = Watcher(source, target, debounce=3600)
+
+            assert watcher.check() == [], "The file should not be converted before the debounce passes"
+            self.write(source, "more text\n", 2 * 10**9)
+            assert watcher.check() == [], "The file should not be converted while it keeps changing"
+            watcher.debounce = 0
+            results = watcher.check()
+            assert len(results) == 1 and self.read(target) == convert("more text\n"), "The burst of changes should be converted once"
+
+    def test_Watcher_check__removed_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "in.md")
+            target = os.path.join(directory, "out.html")
+            self.write(source, "Žluťoučký *kůň*\n", 10**9)
+            watcher = Watcher(source, target, debounce=0)
+
+            results = watcher.check()
+            with open(target, "rb") as file:
+                output = file.read()
+            assert output == convert("Žluťoučký *kůň*\n").encode("utf-8"), f"The output should be UTF-8 encoded: {output}"
+            # The file is gone before the results are reported
+            os.remove(source)
+            report = io.StringIO()
+            with contextlib.redirect_stdout(report):
+                print_results(results, watcher.states)
+            assert "ms after save" in report.getvalue(), f"The latency should be reported from the scanned state: {report.getvalue()}"
+            assert watcher.check() == [] and watcher.states == {}, "A removed file should be forgotten"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,6 @@
 from enum import Enum
+from array import array
+import re
 
 class Token:
     """
@@ -43,19 +45,29 @@ class Token:
         Type.LBRACKET, Type.RBRACKET, Type.LPAREN, Type.RPAREN, Type.HASH, Type.PLUS, Type.DASH,
         Type.PERIOD, Type.EXCLAMATION_MARK]
 
+    # The types of tokens that always represent a single character and therefore carry no value
+    single_character_types = [Type.BACKSLASH, Type.GT, Type.LT, Type.EXCLAMATION_MARK, Type.DASH, Type.PLUS, Type.EQUALS, Type.LPAREN, Type.RPAREN,
+        Type.LBRACE, Type.RBRACE, Type.LBRACKET, Type.RBRACKET, Type.DOUBLE_QUOTES, Type.SINGLE_QUOTES, Type.COLON, Type.PERIOD, Type.SEMICOLON]
+
+    # Tokens are created for almost every character of the source text, so they do not get a __dict__
+    __slots__ = ("value", "kind")
+
+    line = 0 # Deprecated, the line number is no longer stored
+    position = 0 # Deprecated, the position is no longer stored
+
     def __init__(self, value, kind, line=0, position=0):
         """
         @value is the text content of the token
         @kind specifies the type of the token
-        @line specifies the line number from where the token was extracted (for error feedback)
-        @position specifies the position on the line the token was extracted from (for error feedback)
+        @line is deprecated and ignored
+        @position is deprecated and ignored
         """
         self.value = value
         self.kind = kind
-        self.line = line # Deprecated
-        self.position = position # Deprecated
     
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, Token):
             return False
         if self.value != other.value:
@@ -82,6 +94,104 @@ class Token:
             return 4
         return 0
 
+    def get_length(self):
+        """
+        Returns the number of characters of the token as an integer.
+        """
+        return len(self.value)
+
+# The single-character tokens do not differ from each other, so the tokenizers share a single instance of each. These instances must not be modified!
+Token.shared = {kind: Token("", kind) for kind in Token.single_character_types}
+
+
+class SpanToken(Token):
+    """
+    A token that does not hold a copy of its text, it only points to the range <@start, @end) of the @source string instead. The text is only sliced
+    out of the source when the value is requested.
+    """
+    __slots__ = ("source", "start", "end")
+
+    def __init__(self, source, start, end, kind):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.kind = kind
+
+    @property
+    def value(self):
+        return self.source[self.start:self.end]
+
+    @value.setter
+    def value(self, value):
+        # The parser only ever cuts off the beginning of a token, which can be done by moving the start of the span
+        if self.source.endswith(value, self.start, self.end):
+            self.start = self.end - len(value)
+        else:
+            self.source = value
+            self.start = 0
+            self.end = len(value)
+
+    def get_length(self):
+        # Unlike len(self.value), this does not slice the text out of the source
+        return self.end - self.start
+
+
+class TokenColumns:
+    """
+    A compact, array-backed form of the tokens of a whole text. Instead of an object per token, the type, offset and length of every token are stored in
+    parallel arrays, the offsets point into the @source string. The tokens of the lines are stored one after another, the line boundaries are stored as
+    indices into the arrays.
+
+    Iterating the columns yields lists of tokens one line at a time, just like Tokenizer#tokenize_stream() does, so the result can be passed to the parser
+    directly. The multi-character tokens are created as {@link SpanToken}s, so no substrings of the source are copied.
+    """
+    # Token.Type by its value, for converting the codes in the kinds array back
+    types = {kind.value: kind for kind in Token.Type}
+
+    def __init__(self, source):
+        self.source = source
+        self.kinds = array("B") # The Token.Type value of each token, the TAB type marks a tab expanded to four spaces
+        self.offsets = array("q")
+        self.lengths = array("L")
+        self.lines = array("q", [0]) # Index of the first token of each line, the last item is the total number of tokens
+
+    def append(self, kind, start, end):
+        """
+        Adds a token of type @kind that spans the <@start, @end) range of the source to the current line.
+        """
+        self.kinds.append(kind.value)
+        self.offsets.append(start)
+        self.lengths.append(end - start)
+
+    def end_line(self):
+        """
+        Finishes the current line, the tokens appended afterwards will belong to the next line.
+        """
+        self.lines.append(len(self.kinds))
+
+    def line(self, index):
+        """
+        Creates the tokens of the line number @index.
+        Returns a list of tokens.
+        """
+        tokens = []
+        for i in range(self.lines[index], self.lines[index + 1]):
+            kind = self.types[self.kinds[i]]
+            if kind in Token.shared:
+                tokens.append(Token.shared[kind])
+            elif kind is Token.Type.TAB:
+                tokens.append(Token(" " * 4, Token.Type.SPACE))
+            else:
+                tokens.append(SpanToken(self.source, self.offsets[i], self.offsets[i] + self.lengths[i], kind))
+        return tokens
+
+    def __len__(self):
+        return len(self.lines) - 1
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.line(i)
+
 class Tokenizer:
     """
     This class is used to convert text into Markdown language tokens. The transition from text to language tokens is necessary for the parser.
@@ -98,10 +208,29 @@ class Tokenizer:
         tokens = []    
         lines = text.split("\n")
         for i in range(len(lines)):
-            position = self.__tokenize_line(lines[i], tokens)
+            position = self._tokenize_line(lines[i], tokens)
             
         #tokens[-1].append(Token("", Token.Type.EOF, len(lines) + 1, 0))
         return tokens
+
+    def tokenize_stream(self, lines):
+        """
+        Lazily converts an iterable of @lines (such as an opened text file) into lists of tokens, where each list represents a line of the source text.
+        Only a single line is held in memory at a time. The lines may keep their line terminators. The produced lists are the same as the ones returned by
+        tokenize() for the whole text.
+        Returns a generator of lists of tokens.
+        """
+        if lines is None:
+            raise ValueError("Can not tokenize None")
+        target = []
+        ends_with_newline = False
+        for line in lines:
+            ends_with_newline = line.endswith("\n")
+            self._tokenize_line(line, target)
+            yield target.pop()
+        # Splitting a text that ends with a line terminator produces one more (empty) line
+        if ends_with_newline:
+            yield []
         
         
     def __tokenize_line(self, line, target):
@@ -129,7 +258,7 @@ class Tokenizer:
                     
                 case "\\":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.BACKSLASH, i))
+                    tokens.append(Token.shared[Token.Type.BACKSLASH])
                 case "#":
                     if token_type is not Token.Type.HASH:
                         token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
@@ -137,13 +266,13 @@ class Tokenizer:
                         token_type = Token.Type.HASH
                 case "<":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.LT, i))
+                    tokens.append(Token.shared[Token.Type.LT])
                 case ">":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.GT, i))
+                    tokens.append(Token.shared[Token.Type.GT])
                 case "!":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.EXCLAMATION_MARK, i))
+                    tokens.append(Token.shared[Token.Type.EXCLAMATION_MARK])
                 case "*":
                     if token_type is not Token.Type.ASTERISK:
                         token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
@@ -151,7 +280,7 @@ class Tokenizer:
                         token_type = Token.Type.ASTERISK
                 case "-":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.DASH, i))
+                    tokens.append(Token.shared[Token.Type.DASH])
                 case "_":
                     if token_type is not Token.Type.UNDERSCORE:
                         token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
@@ -159,37 +288,37 @@ class Tokenizer:
                         token_type = Token.Type.UNDERSCORE
                 case "+":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.PLUS, i))
+                    tokens.append(Token.shared[Token.Type.PLUS])
                 case "=":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.EQUALS, i))
+                    tokens.append(Token.shared[Token.Type.EQUALS])
                 case "(":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.LPAREN, i))
+                    tokens.append(Token.shared[Token.Type.LPAREN])
                 case ")":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.RPAREN, i))
+                    tokens.append(Token.shared[Token.Type.RPAREN])
                 case "[":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.LBRACKET, i))
+                    tokens.append(Token.shared[Token.Type.LBRACKET])
                 case "]":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.RBRACKET, i))
+                    tokens.append(Token.shared[Token.Type.RBRACKET])
                 case "{":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.LBRACE, i))
+                    tokens.append(Token.shared[Token.Type.LBRACE])
                 case "}":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.RBRACE, i))
+                    tokens.append(Token.shared[Token.Type.RBRACE])
                 case ".":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.PERIOD, i))
+                    tokens.append(Token.shared[Token.Type.PERIOD])
                 case "'":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.SINGLE_QUOTES, i))
+                    tokens.append(Token.shared[Token.Type.SINGLE_QUOTES])
                 case "\"":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.DOUBLE_QUOTES, i))
+                    tokens.append(Token.shared[Token.Type.DOUBLE_QUOTES])
                 case "`":                
                     if token_type is not Token.Type.BACKTICK:
                         token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
@@ -197,10 +326,10 @@ class Tokenizer:
                         token_type = Token.Type.BACKTICK
                 case ":":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.COLON, i))
+                    tokens.append(Token.shared[Token.Type.COLON])
                 case ";":
                     token_start, token_type = self.__finish_open_token(line, tokens, token_start, token_type, i)
-                    tokens.append(Token("", Token.Type.SEMICOLON, i))
+                    tokens.append(Token.shared[Token.Type.SEMICOLON])
                 
                 case _:
                     if line[i].isdigit():
@@ -234,6 +363,250 @@ class Tokenizer:
             tokens.append(Token(line[token_start:i], token_type))
         return (-1, None)
 
+    # The line tokenization engine used by tokenize() and tokenize_stream(), subclasses may replace it
+    _tokenize_line = __tokenize_line
+
+
+class RegexTokenizer(Tokenizer):
+    """
+    A faster drop-in replacement of the Tokenizer. Instead of inspecting the line character by character, it scans whole runs of characters (such as
+    a word of text or a sequence of asterisks) with a single precompiled regular expression. The produced tokens are exactly the same as the ones produced
+    by the Tokenizer, which is kept available as the reference implementation.
+    """
+    # Characters that always make a token of their own
+    single_character_tokens = {"\\": Token.Type.BACKSLASH, "<": Token.Type.LT, ">": Token.Type.GT, "!": Token.Type.EXCLAMATION_MARK, "-": Token.Type.DASH,
+        "+": Token.Type.PLUS, "=": Token.Type.EQUALS, "(": Token.Type.LPAREN, ")": Token.Type.RPAREN, "[": Token.Type.LBRACKET, "]": Token.Type.RBRACKET,
+        "{": Token.Type.LBRACE, "}": Token.Type.RBRACE, ".": Token.Type.PERIOD, "'": Token.Type.SINGLE_QUOTES, "\"": Token.Type.DOUBLE_QUOTES,
+        ":": Token.Type.COLON, ";": Token.Type.SEMICOLON}
+    # Characters of which the repeating occurences are merged into a single token
+    multi_character_tokens = {" ": Token.Type.SPACE, "#": Token.Type.HASH, "*": Token.Type.ASTERISK, "_": Token.Type.UNDERSCORE, "`": Token.Type.BACKTICK}
+    # The token type of each group of the master regular expression (by group index), the first two groups (tabs and single characters) are special
+    group_kinds = [None, None, None] + list(multi_character_tokens.values()) + [Token.Type.NUMBER, Token.Type.TEXT]
+
+    # The same mapping for scanning the bytes of a file
+    single_character_bytes = {character.encode(): kind for character, kind in single_character_tokens.items()}
+
+    pattern = None # The master regular expression, it is compiled upon the creation of the first instance
+    bytes_pattern = None # The master regular expression for scanning the bytes of a file
+    non_ascii_pattern = re.compile(r"[^\x00-\x7f]+")
+    non_ascii_bytes_pattern = re.compile(rb"[\x80-\xff]+")
+    newline_bytes_pattern = re.compile(rb"\r\n?|\n") # The line terminators recognized when reading files in text mode
+    
+    def __init__(self):
+        if RegexTokenizer.pattern is None:
+            pattern = self.__compile_pattern()
+            # The expression only consists of ASCII characters and the non-ASCII bytes of UTF-8 are all TEXT, so it works for bytes as well
+            RegexTokenizer.bytes_pattern = re.compile(pattern.pattern.encode("ascii"))
+            # The pattern is set last, another thread that finds it set may rely on the bytes pattern being set too
+            RegexTokenizer.pattern = pattern
+    
+    def __compile_pattern(self):
+        """
+        Builds the master regular expression. Every match of the expression is a single token, which is determined by the index of the matched group.
+        The Tokenizer keeps a multi-character token open when it encounters a tab (it only emits 4 spaces for it), so the runs are allowed to contain tabs.
+        Returns a compiled pattern.
+        """
+        single = re.escape("".join(self.single_character_tokens))
+        groups = ["\t", f"[{single}]"]
+        for character in self.multi_character_tokens:
+            character = re.escape(character)
+            groups.append(f"{character}[{character}\t]*")
+        groups.append("[0-9][0-9\t]*")
+        special = single + re.escape("".join(self.multi_character_tokens)) + "0-9"
+        groups.append(f"[^{special}\t\n][^{special}\n]*")
+        return re.compile("|".join(f"({group})" for group in groups))
+
+    def tokenize(self, text):
+        """
+        Converts a string of text into lists of tokens, where each list represents a line of the source text. The multi-character tokens are
+        {@link SpanToken}s pointing into @text, so the text is not copied.
+        Returns a list of lists of tokens.
+        """
+        if text is None:
+            raise ValueError("Can not tokenize None")
+        if len(text) == 0:
+            return []
+        is_ascii = text.isascii()
+        tokens = []
+        start = 0
+        while True:
+            end = text.find("\n", start)
+            if end == -1:
+                end = len(text)
+            if not is_ascii and self.__has_unicode_digits(text, start, end):
+                Tokenizer._tokenize_line(self, text[start:end], tokens)
+            else:
+                tokens.append(self.__tokenize_range(text, text, start, end, self.pattern, self.single_character_tokens, "\t"))
+            if end == len(text):
+                break
+            start = end + 1
+        return tokens
+
+    def tokenize_mapped(self, source, start=0):
+        """
+        Lazily converts a {@link MappedSource} into lists of tokens, where each list represents a line of the source file. The raw bytes of the file are
+        scanned directly and the multi-character tokens are {@link SpanToken}s pointing into the @source, so only the text of the tokens that are actually
+        used gets decoded. The lines are split the same way reading the file in text mode does it. The pages of the file that were scanned are released
+        as the scanning goes on (see MappedSource#release()), keeping the last MappedSource.release_size bytes at hand for the parser. The scanning starts
+        at the byte offset @start, which has to be at the beginning of a line.
+        Returns a generator of lists of tokens.
+        """
+        if source is None:
+            raise ValueError("Can not tokenize None")
+        buffer = source.buffer
+        if len(buffer) <= start:
+            return
+        release_size = source.release_size
+        next_release = start + 2 * release_size
+        while True:
+            if start >= next_release:
+                source.release(start - release_size)
+                next_release = start + release_size
+            newline = self.newline_bytes_pattern.search(buffer, start)
+            end = newline.start() if newline is not None else len(buffer)
+            if self.__has_unicode_digits(buffer, start, end):
+                target = []
+                Tokenizer._tokenize_line(self, source[start:end], target)
+                yield target.pop()
+            else:
+                yield self.__tokenize_range(buffer, source, start, end, self.bytes_pattern, self.single_character_bytes, b"\t")
+            if newline is None:
+                break
+            start = newline.end()
+
+    def __tokenize_range(self, text, source, start, end, pattern, single_character_tokens, tab):
+        """
+        Converts the <@start, @end) range of @text (a string or bytes) into tokens using the master regular expression @pattern for the type of @text.
+        The multi-character tokens are created as {@link SpanToken}s pointing into @source, which is either @text itself or a {@link MappedSource} over it.
+        Returns a list of tokens.
+        """
+        kinds = self.group_kinds
+        tokens = []
+        for match in pattern.finditer(text, start, end):
+            group = match.lastindex
+            if group == 1:
+                tokens.append(Token(" " * 4, Token.Type.SPACE))
+            elif group == 2:
+                tokens.append(Token.shared[single_character_tokens[match.group()]])
+            else:
+                token_start, token_end = match.span()
+                # Tabs inside of a run are emitted as separate SPACE tokens before the run itself
+                tab_index = text.find(tab, token_start, token_end)
+                while tab_index != -1:
+                    tokens.append(Token(" " * 4, Token.Type.SPACE))
+                    tab_index = text.find(tab, tab_index + 1, token_end)
+                tokens.append(SpanToken(source, token_start, token_end, kinds[group]))
+        return tokens
+
+    def tokenize_columns(self, text):
+        """
+        Converts a string of text into the compact {@link TokenColumns} form. Iterating the result yields the same lists of tokens tokenize() returns.
+        Returns a TokenColumns object.
+        """
+        if text is None:
+            raise ValueError("Can not tokenize None")
+        columns = TokenColumns(text)
+        if len(text) == 0:
+            return columns
+        is_ascii = text.isascii()
+        start = 0
+        while True:
+            end = text.find("\n", start)
+            if end == -1:
+                end = len(text)
+            if not is_ascii and self.__has_unicode_digits(text, start, end):
+                self.__scan_characters(text, start, end, columns)
+            else:
+                self.__scan(text, start, end, columns)
+            columns.end_line()
+            if end == len(text):
+                break
+            start = end + 1
+        return columns
+
+    def __scan(self, text, start, end, columns):
+        """
+        Appends the tokens of the <@start, @end) range of @text to @columns.
+        """
+        kinds = self.group_kinds
+        for match in self.pattern.finditer(text, start, end):
+            group = match.lastindex
+            if group == 1:
+                columns.append(Token.Type.TAB, match.start(), match.end())
+            elif group == 2:
+                columns.append(self.single_character_tokens[match.group()], match.start(), match.end())
+            else:
+                token_start, token_end = match.span()
+                # Tabs inside of a run come before the run itself, just like in __tokenize_line()
+                tab = text.find("\t", token_start, token_end)
+                while tab != -1:
+                    columns.append(Token.Type.TAB, tab, tab + 1)
+                    tab = text.find("\t", tab + 1, token_end)
+                columns.append(kinds[group], token_start, token_end)
+
+    def __scan_characters(self, text, start, end, columns):
+        """
+        Appends the tokens of the <@start, @end) range of @text to @columns. The range is inspected character by character the same way the Tokenizer does it,
+        which is only needed for lines with digits other than 0-9.
+        """
+        token_start = -1
+        token_type = None
+        for i in range(start, end):
+            character = text[i]
+            if character == "\t":
+                # The open token is not finished by a tab
+                columns.append(Token.Type.TAB, i, i + 1)
+                continue
+            if character in self.single_character_tokens:
+                if token_start != -1:
+                    columns.append(token_type, token_start, i)
+                token_start, token_type = -1, None
+                columns.append(self.single_character_tokens[character], i, i + 1)
+                continue
+            if character in self.multi_character_tokens:
+                kind = self.multi_character_tokens[character]
+            elif character.isdigit():
+                kind = Token.Type.NUMBER
+            else:
+                kind = Token.Type.TEXT
+            if kind is not token_type:
+                if token_start != -1:
+                    columns.append(token_type, token_start, i)
+                token_start, token_type = i, kind
+        if token_start != -1:
+            columns.append(token_type, token_start, end)
+
+    def __has_unicode_digits(self, text, start, end):
+        """
+        Checks whether the <@start, @end) range of @text contains a character other than 0-9 that is considered a digit by str.isdigit(). Only the non-ASCII
+        parts of the text are inspected. The @text may also be the UTF-8 encoded bytes of a text.
+        Returns boolean.
+        """
+        pattern = self.non_ascii_pattern if isinstance(text, str) else self.non_ascii_bytes_pattern
+        for match in pattern.finditer(text, start, end):
+            characters = match.group()
+            if not isinstance(characters, str):
+                characters = characters.decode("utf-8")
+            for character in characters:
+                if character.isdigit():
+                    return True
+        return False
+
+    def __tokenize_line(self, line, target):
+        """
+        Goes through the string @line and converts it into tokens. These tokens will be appended as a list to @target.
+        """
+        # The Tokenizer stops at the end of the line
+        if "\n" in line:
+            line = line[:line.index("\n")]
+        # Digits such as "²" are NUMBER tokens for the Tokenizer, these lines are rare enough to be left to the reference implementation
+        if not line.isascii() and self.__has_unicode_digits(line, 0, len(line)):
+            Tokenizer._tokenize_line(self, line, target)
+            return
+        target.append(self.__tokenize_range(line, line, 0, len(line), self.pattern, self.single_character_tokens, "\t"))
+
+    _tokenize_line = __tokenize_line
+
 
 
 
@@ -1,4 +1,6 @@
 from parser import Structure
+from arena import StructureArena
+import re
 
 # TODO: images
 # TODO: email escaping
@@ -28,10 +30,19 @@ class Translator:
         Structure.Type.HR: "<hr />",
         Structure.Type.LINE_BREAK: "<br />",
     } 
+    # The opening and closing part of the markup of each of the structures, so that the content can be written in between them
+    tags = {kind: tuple(markup.split("%s")) for kind, markup in dictionary.items()}
+    # The headings get an id attribute with their anchor, if they have one (see Parser#parse())
+    headings = {Structure.Type.HEADING_1, Structure.Type.HEADING_2, Structure.Type.HEADING_3, Structure.Type.HEADING_4, Structure.Type.HEADING_5,
+        Structure.Type.HEADING_6}
             
     # HTML entities are characters they need to be escaped in a special manner, otherwise they will be rendered as a part of the markup
     # this dictionary maps each entity to its escaped form
     entities = {"&": "&amp;", ">": "&gt;", "<": "&lt;"}
+
+    # An ampersand that does not start a named HTML entity (such as &copy;). The lookahead is bounded by the length of the longest entity name, so every
+    # ampersand is only looked at once instead of searching for the next semicolon in the rest of the text.
+    ampersand_pattern = re.compile(r"&(?![^\W\d_]{1,32};)")
     
     def __auto_escape(self, text):
         """
@@ -40,8 +51,10 @@ class Translator:
         """
         if text is None:
             raise ValueError("cannot escape None")
+        # str.replace() runs in C and only the characters that are present are replaced, which beats str.translate() and re.sub() on entity-dense text
         for key, value in self.entities.items():
-            text = text.replace(key, value)
+            if key in text:
+                text = text.replace(key, value)
         return text
         
     def __escape(self, text):
@@ -51,23 +64,54 @@ class Translator:
         """
         if text is None:
             raise ValueError("cannot escape None")
-        
-        output = ""
-        for i in range(len(text)):
-            match text[i]:
-                case "&":
-                    index = text.find(";", i)
-                    if index != -1 and text[i+1:index].isalpha():
-                        output += text[i]
-                    else:
-                        output += self.entities["&"]
-                case "<":
-                    output += self.entities["<"]
-                case ">":
-                    output += self.entities[">"]
-                case _:
-                    output += text[i]
-        return output
+        if "&" in text:
+            text = self.ampersand_pattern.sub("&amp;", text)
+        if "<" in text:
+            text = text.replace("<", "&lt;")
+        if ">" in text:
+            text = text.replace(">", "&gt;")
+        return text
+
+    def __escape_attribute(self, text):
+        """
+        Escapes the @text to be used as the value of an attribute enclosed in double quotes.
+        Returns a string.
+        """
+        text = self.__auto_escape(text)
+        if '"' in text:
+            text = text.replace('"', "&quot;")
+        return text
+
+    def __open_heading(self, kind, anchor):
+        """
+        Returns the opening tag of a heading of the @kind with the id @anchor.
+        """
+        return f'{self.tags[kind][0][:-1]} id="{self.__escape_attribute(anchor)}">'
+
+    def translate_outline(self, outline):
+        """
+        Translates the @outline of a document (a list of {@link OutlineEntry}, see Parser#parse()) into a table of contents, a list of links to the
+        headings nested by their levels. A heading that is more than one level deeper than the previous one is nested only a single level deeper.
+        Returns a string, empty if there are no headings.
+        """
+        if outline is None:
+            raise ValueError("cannot translate None")
+        if len(outline) == 0:
+            return ""
+        output = ['<nav class="toc">']
+        levels = [] # The levels of the headings of the open lists
+        for entry in outline:
+            if len(levels) == 0 or entry.level > levels[-1]:
+                output.append("<ul>")
+                levels.append(entry.level)
+            else:
+                output.append("</li>")
+                while len(levels) > 1 and entry.level <= levels[-2]:
+                    output.append("</ul></li>")
+                    levels.pop()
+            output.append(f'<li><a href="#{self.__escape_attribute(entry.slug)}">{self.__auto_escape(entry.text)}</a>')
+        output.append("</li>" + "</ul></li>" * (len(levels) - 1) + "</ul></nav>")
+        return "".join(output)
 
     def __escape_email(self, text):
         """ TODO """
@@ -81,43 +125,149 @@ class Translator:
         """
         if structures is None:
             raise ValueError("cannot translate None")
-        text = ""
-        for structure in structures:
-            text += self.__translate_structure(structure)
-        return text
+        output = []
+        if isinstance(structures, StructureArena):
+            self.__write_arena(structures, output.append)
+        else:
+            self.__write_structures(structures, output.append)
+        return "".join(output)
+
+    def translate_to(self, structures, fp):
+        """
+        Translates an iterable of structures into HTML and writes it to the file-like object @fp. The opening and closing tags are written as soon as the
+        structure tree walk reaches them, so neither the HTML nor the translation of any structure is ever held in memory as a whole. The @structures may as
+        well be a generator (see Parser#parse_stream()).
+        """
+        if structures is None:
+            raise ValueError("cannot translate None")
+        if isinstance(structures, StructureArena):
+            self.__write_arena(structures, fp.write)
+        else:
+            self.__write_structures(structures, fp.write)
     
          
     def __translate_structure(self, structure):
         """
-        Translates a single @structure into HTML string. The structure is translated recursively, if it contains other structures. The result string is escaped if necessary
+        Translates a single @structure into HTML string. The structure is translated along with all the structures inside it. The result string is escaped if necessary
         to ensure correct display when the HTML is rendered.
         Returns a string.
         """
-        if structure.kind is Structure.Type.SUPER:
-            raise ValueError("Unsupported structure type!")
-        # These structures do not hold any content
-        if structure.kind is Structure.Type.HR or structure.kind is Structure.Type.LINE_BREAK:
-            return self.dictionary[structure.kind]
-        if structure.content is None:
-            raise ValueError("Structure content is None. Unexpected!")
-        # HTML structures only ever contain a single TEXT structure with formatted HTML code
-        if structure.kind is Structure.Type.HTML:
-            return structure.content[0].content
-        # Code structures only ever contain a single TEXT structure which needs to be specially escaped to not be potentially displayed as markup
-        if structure.kind is Structure.Type.CODE or structure.kind is Structure.Type.CODEBLOCK:
-            return self.dictionary[structure.kind].replace("%s", self.__auto_escape(structure.content[0].content))
-        if structure.kind is Structure.Type.LINK:
-            if structure.address is None or len(structure.address) == 0:
-                structure.address = ""
-            title = " title=" + structure.title + '"' if hasattr(structure, 'title') else ""
-            text = f'<a href="{structure.address}"{title}>{self.__auto_escape(structure.content[0].content)}</a>'
-            return text
-        
-        if structure.kind is Structure.Type.TEXT:
-            return self.__escape(structure.content)
-        # Structure contains other general structures
-        text = ""
-        for node in structure.content:
-            text += self.__translate_structure(node)
-        return self.dictionary[structure.kind].replace("%s", text)
+        output = []
+        self.__write_structures([structure], output.append)
+        return "".join(output)
 
+    def __write_structures(self, structures, write):
+        """
+        Translates the @structures into HTML and passes the pieces of the markup to the @write function in order. The structure trees are walked using an explicit
+        stack instead of recursion, so there is no limit on how deeply the structures may be nested. The stack holds the structures that are yet to be translated
+        and the closing tags of the structures that are open.
+        """
+        stack = []
+        for structure in structures:
+            stack.append(structure)
+            while len(stack) != 0:
+                structure = stack.pop()
+                # Closing tags are the only strings on the stack
+                if isinstance(structure, str):
+                    write(structure)
+                    continue
+                if structure.kind is Structure.Type.SUPER:
+                    raise ValueError("Unsupported structure type!")
+                # These structures do not hold any content
+                if structure.kind is Structure.Type.HR or structure.kind is Structure.Type.LINE_BREAK:
+                    write(self.dictionary[structure.kind])
+                    continue
+                if structure.content is None:
+                    raise ValueError("Structure content is None. Unexpected!")
+                # HTML structures only ever contain a single TEXT structure with formatted HTML code
+                if structure.kind is Structure.Type.HTML:
+                    write(structure.content[0].content)
+                    continue
+                # Code structures only ever contain a single TEXT structure which needs to be specially escaped to not be potentially displayed as markup
+                if structure.kind is Structure.Type.CODE or structure.kind is Structure.Type.CODEBLOCK:
+                    opening, closing = self.tags[structure.kind]
+                    write(opening)
+                    write(self.__auto_escape(structure.content[0].content))
+                    write(closing)
+                    continue
+                if structure.kind is Structure.Type.LINK:
+                    # The structures may be shared with other threads, so the missing address is not stored back into the structure
+                    address = structure.address if structure.address is not None else ""
+                    title = ' title="' + self.__escape_attribute(structure.title) + '"' if hasattr(structure, 'title') else ""
+                    write(f'<a href="{address}"{title}>{self.__auto_escape(structure.content[0].content)}</a>')
+                    continue
+                if structure.kind is Structure.Type.TEXT:
+                    write(self.__escape(structure.content))
+                    continue
+                # Structure contains other general structures, they are translated before the closing tag
+                opening, closing = self.tags[structure.kind]
+                if structure.kind in self.headings and getattr(structure, "address", None) is not None:
+                    opening = self.__open_heading(structure.kind, structure.address)
+                write(opening)
+                stack.append(closing)
+                stack.extend(reversed(structure.content))
+
+    def __write_arena(self, arena, write):
+        """
+        Translates the structures stored in the @arena (see {@link StructureArena}) into HTML and passes the pieces of the markup to the @write function in order.
+        This does the same as __write_structures(), but it walks the arrays of the arena directly instead of creating a view of every structure.
+        """
+        kinds = arena.kinds
+        first_children = arena.first_children
+        next_siblings = arena.next_siblings
+        text_offsets = arena.text_offsets
+        text_lengths = arena.text_lengths
+        text = arena.text
+        types = StructureArena.types
+        stack = []
+        for root in reversed(arena.roots):
+            stack.append(root)
+        while len(stack) != 0:
+            index = stack.pop()
+            # Closing tags are the only strings on the stack
+            if isinstance(index, str):
+                write(index)
+                continue
+            kind = types[kinds[index]]
+            if kind is Structure.Type.SUPER:
+                raise ValueError("Unsupported structure type!")
+            # These structures do not hold any content
+            if kind is Structure.Type.HR or kind is Structure.Type.LINE_BREAK:
+                write(self.dictionary[kind])
+                continue
+            if text_lengths[index] == -1:
+                raise ValueError("Structure content is None. Unexpected!")
+            if kind is Structure.Type.TEXT:
+                offset = text_offsets[index]
+                write(self.__escape(text[offset:offset + text_lengths[index]]))
+                continue
+            child = first_children[index]
+            if kind is Structure.Type.HTML or kind is Structure.Type.CODE or kind is Structure.Type.CODEBLOCK or kind is Structure.Type.LINK:
+                # These structures only ever contain a single TEXT structure
+                if child == -1:
+                    raise IndexError("list index out of range")
+                offset = text_offsets[child]
+                content = text[offset:offset + text_lengths[child]]
+                if kind is Structure.Type.HTML:
+                    write(content)
+                elif kind is Structure.Type.LINK:
+                    address = arena.addresses.get(index)
+                    title = ' title="' + self.__escape_attribute(arena.titles[index]) + '"' if index in arena.titles else ""
+                    write(f'<a href="{address or ""}"{title}>{self.__auto_escape(content)}</a>')
+                else:
+                    opening, closing = self.tags[kind]
+                    write(opening)
+                    write(self.__auto_escape(content))
+                    write(closing)
+                continue
+            # Structure contains other general structures, they are translated before the closing tag
+            opening, closing = self.tags[kind]
+            if kind in self.headings and index in arena.addresses:
+                opening = self.__open_heading(kind, arena.addresses[index])
+            write(opening)
+            stack.append(closing)
+            children = []
+            while child != -1:
+                children.append(child)
+                child = next_siblings[child]
+            stack.extend(reversed(children))
@@ -0,0 +1,147 @@
+import os
+import time
+from batch import find_sources, FileResult
+from incremental import IncrementalRenderer
+"""
+Watch mode for authoring. The Markdown files are checked for changes in a loop and the changed files are converted again right away by the same
+long-running process, so a saved file is reflected in the HTML within milliseconds instead of paying for the interpreter startup every time.
+
+Every watched file keeps its own {@link IncrementalRenderer}, so only the blocks of the file that were edited are parsed again. A burst of saves (such as
+an editor writing several files at once) is debounced into a single rebuild. The files are checked by polling their size and modification time, which
+works on every platform and file system without any dependencies.
+
+Example usage:
+
+    python main.py --watch documents/ out/
+    python main.py --watch documents/in.md documents/out.html
+"""
+
+class Watcher:
+    """
+    This class watches a single Markdown file or a directory tree of Markdown files (see batch.find_sources()) and keeps the HTML files up to date.
+    """
+    def __init__(self, source, target, interval=0.1, debounce=0.05):
+        """
+        @source is the path of a Markdown file or of a directory
+        @target is the path of the HTML file or of the output directory
+        @interval is the time between two checks for changes in seconds
+        @debounce is how long the files have to stay unchanged before they are converted, in seconds
+        """
+        self.source = source
+        self.target = target
+        self.interval = interval
+        self.debounce = debounce
+        self.states = {} # Maps the path of a source file to its (size, modification time) when it was last seen
+        self.renderers = {} # Maps the path of a source file to its IncrementalRenderer
+        self.pending = set() # The source files that changed and wait for the debounce to pass
+        self.last_change = 0.0 # When a change was last seen, by time.perf_counter()
+
+    def find_sources(self):
+        """
+        Returns a dictionary that maps the path of every watched source file to the path of its HTML file.
+        """
+        if os.path.isdir(self.source):
+            return dict(find_sources(self.source, self.target))
+        return {self.source: self.target}
+
+    def scan(self):
+        """
+        Compares the watched files to their state from the previous scan. New and changed files are added to the pending files, the state of removed
+        files is forgotten.
+        Returns a dictionary that maps the path of every watched source file to the path of its HTML file.
+        """
+        sources = self.find_sources()
+        for source in list(self.states):
+            if source not in sources:
+                del self.states[source]
+                self.renderers.pop(source, None)
+                self.pending.discard(source)
+        for source in sources:
+            try:
+                stat = os.stat(source)
+            except OSError:
+                # The file is gone (a watched single file is still listed by find_sources()), it is converted again once it reappears
+                self.states.pop(source, None)
+                self.renderers.pop(source, None)
+                self.pending.discard(source)
+                continue
+            state = (stat.st_size, stat.st_mtime_ns)
+            if self.states.get(source) != state:
+                self.states[source] = state
+                self.pending.add(source)
+                self.last_change = time.perf_counter()
+        return sources
+
+    def check(self):
+        """
+        Scans the watched files and converts the pending files once the debounce has passed since the last change.
+        Returns a list of {@link FileResult}, empty if nothing was converted.
+        """
+        sources = self.scan()
+        if len(self.pending) == 0 or time.perf_counter() - self.last_change < self.debounce:
+            return []
+        results = [self.convert(source, sources[source]) for source in sorted(self.pending)]
+        self.pending.clear()
+        return results
+
+    def convert(self, source, target):
+        """
+        Converts the file at @source to the file at @target with the warm renderer of the file.
+        Returns a {@link FileResult}.
+        """
+        start = time.perf_counter()
+        try:
+            with open(source, encoding="utf-8") as file:
+                text = file.read()
+                size = os.fstat(file.fileno()).st_size # In bytes, the text has fewer characters than that when it is not ASCII
+            renderer = self.renderers.get(source)
+            if renderer is None:
+                renderer = self.renderers[source] = IncrementalRenderer()
+            html = renderer.render(text)
+            directory = os.path.dirname(os.path.abspath(target))
+            os.makedirs(directory, exist_ok=True)
+            # Written as UTF-8 without translating the line terminators, like main.convert() does
+            with open(target, "wb") as file:
+                file.write(html.encode("utf-8"))
+        except Exception as exception:
+            return FileResult(source, target, time.perf_counter() - start, 0, f"{type(exception).__name__}: {exception}")
+        return FileResult(source, target, time.perf_counter() - start, size)
+
+    def run(self):
+        """
+        Watches the files until interrupted and prints the outcome of every rebuild.
+        """
+        print(f"Watching {self.source}, press Ctrl+C to stop")
+        while True:
+            results = self.check()
+            if len(results) != 0:
+                print_results(results, self.states)
+            time.sleep(self.interval)
+
+def print_results(results, states):
+    """
+    Prints the outcome of a rebuild. The latency is the time from the saving of the file to the end of its conversion, it is taken from the modification
+    time in the @states (see Watcher#states) recorded when the file was scanned, since the file may be gone by now.
+    """
+    for result in results:
+        if result.error is not None:
+            print(f"{result.source}: FAILED {result.error}")
+            continue
+        message = f"{result.source} -> {result.target}: converted in {result.seconds * 1000:.1f} ms"
+        if result.source in states:
+            latency = time.time() - states[result.source][1] / 1e9
+            message += f", {latency * 1000:.0f} ms after save"
+        print(message)
+
+def main(source, target):
+    """
+    Watches @source and keeps @target up to date until interrupted.
+    """
+    if not os.path.exists(source):
+        print(f"{source} does not exist")
+        return False
+    try:
+        Watcher(source, target).run()
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    return True